@@ -0,0 +1,95 @@
+"""Débit d'achats concurrents sur une offre à capacité limitée, selon le nombre de workers.
+
+Chaque worker (thread avec sa propre connexion) enchaîne des transactions
+« prélèvement du stock + insertion d'un ticket », comme l'achat réel. À
+lancer sur PostgreSQL : SQLite sérialise toutes les écritures.
+
+Usage (depuis backend/) :
+    python benchmarks/bench_offer_stock.py --workers 1 2 4 8 16 --purchases 200
+    python benchmarks/bench_offer_stock.py --shards 1   # ligne de stock unique, pour comparer
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django
+
+django.setup()
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from tickets.models import Ticket, TicketOffer, User
+from tickets.stock import SoldOut, provision, remaining_stock, reserve
+
+
+def worker(offer, user, purchases, results):
+    sold = sold_out = 0
+    try:
+        for _ in range(purchases):
+            try:
+                with transaction.atomic():
+                    reserve(offer)
+                    Ticket.objects.create(user=user, offer=offer)
+                sold += 1
+            except SoldOut:
+                sold_out += 1
+    finally:
+        connection.close()
+    results.append((sold, sold_out))
+
+
+def run(offer, user, workers, purchases, capacity):
+    offer.capacity = capacity
+    offer.save()
+    Ticket.objects.filter(offer=offer).delete()
+    provision(offer)
+
+    results = []
+    threads = [threading.Thread(target=worker, args=(offer, user, purchases, results)) for _ in range(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    sold = sum(r[0] for r in results)
+    # Contrôle de non-survente : vendus + restant == capacité
+    assert sold == Ticket.objects.filter(offer=offer).count()
+    assert sold + remaining_stock(offer) == capacity, "survente détectée"
+    return sold, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--purchases', type=int, default=200, help="Achats tentés par worker")
+    parser.add_argument('--shards', type=int, help="Surcharge OFFER_STOCK_SHARDS")
+    args = parser.parse_args()
+
+    if args.shards:
+        settings.OFFER_STOCK_SHARDS = args.shards
+
+    user, _ = User.objects.get_or_create(email='bench-stock@example.com', defaults={'username': 'bench-stock'})
+    offer = TicketOffer.objects.create(name="Benchmark stock", price=1, offer_type='SOLO', description='', available=False)
+    try:
+        print(f"parts : {settings.OFFER_STOCK_SHARDS}")
+        print(f"{'workers':>8} {'achats/s':>10} {'vendus':>8}")
+        for workers in args.workers:
+            # Capacité sous le nombre de tentatives : la fin de vente est aussi mesurée
+            capacity = workers * args.purchases * 9 // 10
+            sold, elapsed = run(offer, user, workers, args.purchases, capacity)
+            print(f"{workers:>8} {sold / elapsed:>10.0f} {sold:>8}")
+    finally:
+        Ticket.objects.filter(offer=offer).delete()
+        offer.delete()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""Micro-benchmark des formats de QR code : temps CPU et taille par format.
+
+Usage (depuis backend/) :
+    python benchmarks/bench_qr_formats.py -n 200
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django
+
+django.setup()
+
+from tickets import qr
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', type=int, default=200, help="Nombre de clés rendues par format")
+    args = parser.parse_args()
+
+    # Clés au format de Ticket.save : account_key + purchase_key
+    keys = [f"{uuid.uuid4()}{uuid.uuid4()}" for _ in range(args.n)]
+
+    print(f"{'format':<8} {'CPU ms/op':>10} {'octets moy.':>12}")
+    for fmt, render in qr.RENDERERS.items():
+        start = time.process_time()
+        sizes = [len(render(key)) for key in keys]
+        elapsed = time.process_time() - start
+        print(f"{fmt:<8} {elapsed / args.n * 1000:>10.3f} {sum(sizes) / len(sizes):>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
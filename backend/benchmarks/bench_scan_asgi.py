@@ -0,0 +1,165 @@
+"""Scans par seconde d'un seul worker : gunicorn synchrone contre uvicorn (vues asynchrones).
+
+Lance tour à tour un worker gunicorn synchrone (config.wsgi) et un worker
+uvicorn (config.asgi, vues de tickets.async_views), puis envoie des
+vérifications de tickets (POST /api/admin/verify-ticket/) ou des QR codes
+(GET /api/tickets/<id>/qr-code/) à plusieurs niveaux de concurrence.
+
+Le gain de l'ASGI vient des attentes de la base : à mesurer contre la base
+de production (Postgres distant), ou avec --db-latency-ms qui ajoute une
+attente à chaque requête SQL (benchmarks/gunicorn_db_latency.py). Les
+tickets de test sont créés puis supprimés dans la base configurée.
+
+Usage (depuis backend/) :
+    python benchmarks/bench_scan_asgi.py --concurrency 1 8 32 -n 500
+    python benchmarks/bench_scan_asgi.py --db-latency-ms 5
+    python benchmarks/bench_scan_asgi.py --endpoint qr --modes async
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django
+
+django.setup()
+
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tickets.models import Ticket, TicketOffer, User
+
+SERVERS = {
+    'sync': ['gunicorn', 'config.wsgi:application', '--workers', '1'],
+    'async': ['gunicorn', 'config.asgi:application', '--workers', '1', '--worker-class', 'uvicorn_worker.UvicornWorker'],
+}
+
+
+def start_server(mode, port, db_latency_ms):
+    env = dict(os.environ, BENCH_DB_LATENCY_MS=str(db_latency_ms))
+    # Le worker synchrone garde les vues DRF, l'ASGI sélectionne config.asgi_urls
+    if mode == 'sync':
+        env['DJANGO_ROOT_URLCONF'] = 'config.urls'
+    else:
+        env.pop('DJANGO_ROOT_URLCONF', None)
+    process = subprocess.Popen(
+        SERVERS[mode] + [
+            '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', '--graceful-timeout', '2',
+            '--config', os.path.join(BACKEND_DIR, 'benchmarks', 'gunicorn_db_latency.py'),
+        ],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Le serveur {mode} n'a pas démarré")
+
+
+def make_request(endpoint, ticket, token):
+    if endpoint == 'verify':
+        body = json.dumps({'final_key': ticket.final_key})
+        headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
+        return 'POST', '/api/admin/verify-ticket/', body, headers
+    return 'GET', f'/api/tickets/{ticket.id}/qr-code/?format=svg', None, {}
+
+
+def load(port, requests, concurrency):
+    """Envoie les requêtes sur concurrency connexions keep-alive ; retourne (durée, latences, erreurs)."""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    index = iter(range(len(requests)))
+
+    def client():
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        while True:
+            with lock:
+                i = next(index, None)
+            if i is None:
+                break
+            method, path, body, headers = requests[i]
+            start = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                ok = False
+            with lock:
+                (latencies if ok else errors).append(time.perf_counter() - start)
+        connection.close()
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, sorted(latencies), errors
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000 if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--endpoint', choices=['verify', 'qr'], default='verify')
+    parser.add_argument('--modes', nargs='+', choices=list(SERVERS), default=list(SERVERS))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('-n', type=int, default=500, help="Requêtes par niveau de concurrence")
+    parser.add_argument('--tickets', type=int, default=200)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--db-latency-ms', type=float, default=0, help="Attente ajoutée à chaque requête SQL")
+    args = parser.parse_args()
+
+    admin, _ = User.objects.get_or_create(
+        email='bench-scan@example.com', defaults={'username': 'bench-scan', 'is_staff': True},
+    )
+    offer = TicketOffer.objects.create(name="Benchmark scan", price=1, offer_type='SOLO', description='', available=False)
+    try:
+        tickets = [Ticket.objects.create(user=admin, offer=offer) for _ in range(args.tickets)]
+        token = str(AccessToken.for_user(admin))
+        requests = [make_request(args.endpoint, tickets[i % len(tickets)], token) for i in range(args.n)]
+
+        print(f"endpoint : {args.endpoint}, {args.n} requêtes par niveau, 1 worker, latence SQL {args.db_latency_ms} ms")
+        print(f"{'mode':>6} {'conc.':>6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'erreurs':>8}")
+        for mode in args.modes:
+            process = start_server(mode, args.port, args.db_latency_ms)
+            try:
+                load(args.port, requests[:min(50, len(requests))], 4)  # chauffe : caches, connexions
+                for concurrency in args.concurrency:
+                    elapsed, latencies, errors = load(args.port, requests, concurrency)
+                    print(
+                        f"{mode:>6} {concurrency:>6} {len(latencies) / elapsed:>8.0f} "
+                        f"{percentile(latencies, 0.5):>8.1f} {percentile(latencies, 0.99):>8.1f} {len(errors):>8}"
+                    )
+            finally:
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+    finally:
+        Ticket.objects.filter(offer=offer).delete()
+        offer.delete()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Benchmark de la vérification hors ligne des clés signées, sur un cœur.
+
+N'utilise que tickets.signing (sans Django), comme un client de portique.
+
+Usage (depuis backend/) :
+    python benchmarks/bench_signed_keys.py -n 200000
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tickets'))
+
+from signing import sign_ticket_key, verify_ticket_key, SIGNED_KEY_LENGTH
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', type=int, default=200000, help="Nombre de vérifications")
+    args = parser.parse_args()
+
+    secret = os.urandom(32)
+    now = time.time()
+    keys = [
+        sign_ticket_key(secret, uuid.uuid4(), offer_id % 50, now - 60, now + 86400)
+        for offer_id in range(1000)
+    ]
+
+    start = time.perf_counter()
+    for i in range(args.n):
+        verify_ticket_key(secret, keys[i % len(keys)], now)
+    elapsed = time.perf_counter() - start
+
+    print(f"longueur de clé : {SIGNED_KEY_LENGTH} caractères")
+    print(f"{args.n / elapsed:,.0f} vérifications/s sur un cœur ({elapsed / args.n * 1e6:.2f} µs/vérification)")
+
+
+if __name__ == '__main__':
+    main()
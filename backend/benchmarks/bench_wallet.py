@@ -0,0 +1,82 @@
+"""Liste /api/tickets/ contre portefeuille /api/tickets/wallet/, à 10, 100 et 1000 tickets par utilisateur.
+
+Mesure le temps moyen par requête et le nombre de requêtes SQL, pour la
+liste historique (serializer imbriqué), le portefeuille à froid (cache
+vidé à chaque appel) et le portefeuille en cache. Les données sont créées
+puis supprimées dans la base configurée.
+
+Usage (depuis backend/) :
+    python benchmarks/bench_wallet.py --sizes 10 100 1000 -n 20
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django
+
+django.setup()
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from tickets.models import Ticket, TicketOffer, User
+from tickets.wallet import cache_key
+
+
+def measure(client, url, n, before=None):
+    timings = []
+    for _ in range(n):
+        if before:
+            before()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.status_code
+    return sum(timings) / n * 1000, len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('-n', type=int, default=20, help="Requêtes mesurées par cas")
+    args = parser.parse_args()
+
+    if 'testserver' not in settings.ALLOWED_HOSTS:
+        settings.ALLOWED_HOSTS.append('testserver')
+
+    user = User.objects.create_user(email='bench-wallet@example.com', password=None)
+    offer = TicketOffer.objects.create(name="Benchmark wallet", price=1, offer_type='SOLO', description='', available=False)
+    client = APIClient()
+    client.force_authenticate(user)
+    try:
+        print(f"{'tickets':>8} {'cas':<18} {'ms/req':>8} {'SQL':>5}")
+        for size in args.sizes:
+            missing = size - Ticket.objects.filter(user=user).count()
+            Ticket.objects.bulk_create([
+                Ticket(user=user, offer=offer, final_key=f"bench-wallet-{user.id}-{size}-{i}") for i in range(missing)
+            ])
+            cases = [
+                ('liste', '/api/tickets/', None),
+                ('wallet à froid', '/api/tickets/wallet/', lambda: cache.delete(cache_key(user.id))),
+                ('wallet en cache', '/api/tickets/wallet/', None),
+            ]
+            for name, url, before in cases:
+                ms, queries = measure(client, url, args.n, before)
+                print(f"{size:>8} {name:<18} {ms:>8.2f} {queries:>5}")
+    finally:
+        cache.delete(cache_key(user.id))
+        Ticket.objects.filter(user=user).delete()
+        offer.delete()
+        user.delete()
+
+
+if __name__ == '__main__':
+    main()
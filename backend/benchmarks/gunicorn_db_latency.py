@@ -0,0 +1,26 @@
+"""Configuration gunicorn de bench_scan_asgi : latence ajoutée à chaque requête SQL.
+
+Simule l'aller-retour vers une base distante (BENCH_DB_LATENCY_MS) avec
+une base locale ; n'est jamais chargée en production.
+"""
+import os
+import time
+
+
+def post_worker_init(worker):
+    from django.db.backends.signals import connection_created
+
+    delay = float(os.environ.get('BENCH_DB_LATENCY_MS', '0')) / 1000
+    if not delay:
+        return
+
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(delay)
+        return execute(sql, params, many, context)
+
+    def add_latency(sender, connection, **kwargs):
+        # Le DatabaseWrapper survit aux connexions successives du thread : une seule fois
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
+
+    connection_created.connect(add_latency, weak=False)
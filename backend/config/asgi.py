@@ -13,5 +13,12 @@ from django.core.asgi import get_asgi_application
 
 settings_module = os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings')
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+# Sous ASGI, connexion, scan et QR codes passent par les vues asynchrones (tickets/async_views.py)
+os.environ.setdefault('DJANGO_ROOT_URLCONF', 'config.asgi_urls')
 
 application = get_asgi_application()
+
+# Filtre des final_key construit au démarrage du worker, rafraîchi en arrière-plan
+from tickets.bloom import ticket_key_filter  # noqa: E402
+
+ticket_key_filter.start()
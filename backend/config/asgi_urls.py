@@ -0,0 +1,19 @@
+"""
+URLs servies sous ASGI (voir config/asgi.py).
+
+Les chemins chauds pointent vers les vues asynchrones de tickets.async_views ;
+tout le reste est identique à config.urls.
+"""
+from django.urls import path
+
+from tickets import async_views
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/auth/register/', async_views.register, name='register'),
+    path('api/auth/login/', async_views.login, name='login'),
+    path('api/tickets/<int:ticket_id>/qr-code/', async_views.ticket_qr_code, name='ticket-qr-code'),
+    path('api/admin/tickets/<int:pk>/validate/', async_views.validate_ticket, name='admin-validate-ticket'),
+    path('api/admin/verify-ticket/', async_views.admin_verify_ticket, name='admin-verify-ticket'),
+] + sync_urlpatterns
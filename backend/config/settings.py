@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 import dj_database_url
 import sys
+from django.core.exceptions import ImproperlyConfigured
 
 
 
@@ -59,7 +60,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'config.urls'
+# config/asgi.py sélectionne config.asgi_urls : vues asynchrones sur les chemins chauds
+ROOT_URLCONF = os.environ.get('DJANGO_ROOT_URLCONF', 'config.urls')
 
 TEMPLATES = [
     {
@@ -153,7 +155,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'tickets.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -166,11 +168,16 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
-    'UPDATE_LAST_LOGIN': True,
+    # last_login écrit par lots (tickets/writebehind.py, LastLoginBuffer)
+    'UPDATE_LAST_LOGIN': False,
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'USER_ID_FIELD': 'email',
     'AUTH_HEADER_TYPES': ('Bearer',),
+    # Rotation contrôlée par la liste des jetons consommés (tickets/denylist.py),
+    # sans l'application token_blacklist
+    'TOKEN_REFRESH_SERIALIZER': 'tickets.serializers.DenylistTokenRefreshSerializer',
+    'TOKEN_OBTAIN_SERIALIZER': 'tickets.serializers.BufferedLastLoginTokenObtainPairSerializer',
 }
 
 CORS_ALLOWED_ORIGINS = [
@@ -211,4 +218,125 @@ USE_X_FORWARDED_HOST = True
 USE_X_FORWARDED_PORT = True
 
 
-CORS_ALLOW_CREDENTIALS = True
\ No newline at end of file
+CORS_ALLOW_CREDENTIALS = True
+# Cache des QR codes : LRU mémoire par processus + stockage disque partagé
+QR_CACHE_MAX_ENTRIES = int(os.environ.get('QR_CACHE_MAX_ENTRIES', '2048'))
+QR_CACHE_DIR = os.environ.get('QR_CACHE_DIR', os.path.join(BASE_DIR, 'qr_cache'))
+# Processus dédiés au pré-rendu des QR codes après achat. 0 (défaut) : rendu à la
+# demande, dans la requête. Chaque worker gunicorn lance son propre pool de
+# processus Django complets : à n'activer qu'avec peu de workers et de la mémoire
+# disponible, par exemple pendant une ouverture de vente (sinon, préférer la
+# commande prerender_qr_codes)
+QR_RENDER_WORKERS = int(os.environ.get('QR_RENDER_WORKERS', '0'))
+# Sans pool de processus, pré-rendu après achat et rendus de ?include=qr dans un
+# pool borné de threads du worker ; 0 désactive (rendu à la demande, sur place)
+QR_RENDER_THREADS = int(os.environ.get('QR_RENDER_THREADS', '2'))
+
+# Filtre de Bloom des final_key : rejette les clés inconnues sans requête SQL. Rafraîchi
+# toutes les TICKET_KEY_FILTER_REFRESH_SECONDS : un ticket acheté via un autre worker
+# peut être refusé au scan pendant au plus cet intervalle
+TICKET_KEY_FILTER_ENABLED = os.environ.get('TICKET_KEY_FILTER_ENABLED', 'True').lower() == 'true'
+TICKET_KEY_FILTER_ERROR_RATE = float(os.environ.get('TICKET_KEY_FILTER_ERROR_RATE', '0.001'))
+TICKET_KEY_FILTER_REFRESH_SECONDS = float(os.environ.get('TICKET_KEY_FILTER_REFRESH_SECONDS', '1.0'))
+# Nombre maximal de clés par appel à /api/admin/verify-tickets/batch/
+TICKET_VERIFY_BATCH_MAX = int(os.environ.get('TICKET_VERIFY_BATCH_MAX', '200'))
+
+# Format des final_key : 'legacy' (account_key + purchase_key) ou 'signed' (HMAC, vérifiable hors ligne)
+TICKET_KEY_FORMAT = os.environ.get('TICKET_KEY_FORMAT', 'legacy')
+# Secret partagé avec les portiques : distinct de SECRET_KEY, qui signe les JWT et les jetons de file d'attente
+TICKET_SIGNING_KEY = os.environ.get('TICKET_SIGNING_KEY', '')
+if TICKET_SIGNING_KEY == SECRET_KEY:
+    raise ImproperlyConfigured("TICKET_SIGNING_KEY doit être distincte de SECRET_KEY")
+if TICKET_KEY_FORMAT == 'signed' and not TICKET_SIGNING_KEY:
+    raise ImproperlyConfigured("TICKET_SIGNING_KEY est requise avec TICKET_KEY_FORMAT='signed'")
+TICKET_SIGNED_KEY_VALIDITY = timedelta(days=int(os.environ.get('TICKET_SIGNED_KEY_VALIDITY_DAYS', '365')))
+
+# Synchronisation des portiques : marge de stabilisation du curseur et taille max d'un delta
+GATE_SYNC_SETTLE_SECONDS = int(os.environ.get('GATE_SYNC_SETTLE_SECONDS', '5'))
+GATE_SYNC_DELTA_LIMIT = int(os.environ.get('GATE_SYNC_DELTA_LIMIT', '5000'))
+
+# Liste admin des tickets : taille de page par défaut / maximale, taille des paquets d'export
+ADMIN_TICKETS_PAGE_SIZE = 100
+ADMIN_TICKETS_MAX_PAGE_SIZE = 1000
+ADMIN_TICKETS_EXPORT_CHUNK_SIZE = 2000
+
+# Série temporelle des ventes : rétention des tranches minute (heures) et heure (jours) avant compactage
+SALES_BUCKET_MINUTE_RETENTION_HOURS = int(os.environ.get('SALES_BUCKET_MINUTE_RETENTION_HOURS', '6'))
+SALES_BUCKET_HOUR_RETENTION_DAYS = int(os.environ.get('SALES_BUCKET_HOUR_RETENTION_DAYS', '7'))
+
+# Nombre de parts du stock d'une offre à capacité limitée (voir tickets/stock.py)
+OFFER_STOCK_SHARDS = 8
+
+# Salle d'attente devant l'achat (voir tickets/waiting_room.py). Le débit
+# d'admission se règle sur le débit d'achat mesuré (benchmarks/bench_offer_stock.py)
+WAITING_ROOM_ENABLED = os.environ.get('WAITING_ROOM_ENABLED', 'False').lower() == 'true'
+WAITING_ROOM_BACKEND = os.environ.get('WAITING_ROOM_BACKEND', 'tickets.waiting_room.SQLiteBackend')
+WAITING_ROOM_SQLITE_PATH = BASE_DIR / 'waiting_room.sqlite3'
+WAITING_ROOM_RATE = float(os.environ.get('WAITING_ROOM_RATE', 50))  # admissions par seconde
+WAITING_ROOM_BURST = None  # admissions maximales d'un coup (défaut : WAITING_ROOM_RATE)
+WAITING_ROOM_PASS_TTL = 120  # secondes d'admissions pendant lesquelles un laissez-passer reste valable
+WAITING_ROOM_TOKEN_MAX_AGE = 6 * 3600
+
+# Nombre maximal de tickets par commande groupée (api/tickets/purchase-batch/)
+PURCHASE_BATCH_MAX_TICKETS = 20
+
+# Rejeu des achats et validations portant un en-tête Idempotency-Key (voir tickets/idempotency.py)
+IDEMPOTENCY_STORE = 'tickets.idempotency.SQLiteStore'
+IDEMPOTENCY_SQLITE_PATH = BASE_DIR / 'idempotency.sqlite3'
+IDEMPOTENCY_TTL = 24 * 3600  # secondes de conservation d'une réponse
+IDEMPOTENCY_LOCK_TIMEOUT = 30  # au-delà, une exécution « en cours » est considérée abandonnée
+IDEMPOTENCY_WAIT_SECONDS = 10  # attente maximale d'un doublon concurrent
+IDEMPOTENCY_MAX_ENTRIES = 10000  # MemoryStore uniquement
+
+# Compteurs de ventes différés (voir tickets/writebehind.py) : vidés toutes les
+# SALES_COUNTER_FLUSH_MS ms ou tous les SALES_COUNTER_FLUSH_EVENTS achats.
+# SALES_COUNTER_STRICT=true écrit les compteurs dans la transaction de l'achat.
+SALES_COUNTER_STRICT = os.environ.get('SALES_COUNTER_STRICT', 'False').lower() == 'true'
+SALES_COUNTER_FLUSH_MS = 250
+SALES_COUNTER_FLUSH_EVENTS = 500
+
+# Cache partagé par les workers d'un nœud (catalogue des offres, voir tickets/catalog.py)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'django_cache',
+        # Portefeuilles et utilisateurs JWT : au-delà, un tiers des entrées est supprimé au hasard
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Catalogue et date de sa dernière invalidation, à l'abri des suppressions du cache par défaut
+    'catalog': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'django_cache' / 'catalog',
+    },
+}
+CATALOG_CACHE_ALIAS = 'catalog'
+CATALOG_CACHE_TIMEOUT = 3600  # secondes, filet de sécurité si une écriture contourne les signaux
+CATALOG_MAX_AGE = 10  # secondes de fraîcheur annoncées aux navigateurs et CDN
+WALLET_CACHE_TIMEOUT = 600  # secondes, portefeuille de tickets par utilisateur (voir tickets/wallet.py)
+WALLET_INLINE_QR_MAX = 20  # QR codes inclus au plus par ?include=qr
+QR_RENDER_TIMEOUT = 10  # secondes d'attente d'un rendu dans le pool avant rendu sur place
+
+# Résolution de l'utilisateur JWT depuis un cache (voir tickets/authentication.py)
+JWT_USER_CACHE_TTL = 30  # secondes, cache local à chaque worker
+JWT_USER_CACHE_MAX_ENTRIES = 10000
+JWT_USER_CACHE_ALIAS = None  # alias de cache Django partagé en second niveau (None : désactivé)
+JWT_USER_SHARED_CACHE_TTL = 300
+JWT_SCANNER_CLAIMS_ONLY = True  # jetons de portique acceptés sur leurs seuls claims
+SCANNER_TOKEN_LIFETIME = timedelta(hours=12)
+
+# Jetons de rafraîchissement consommés (voir tickets/denylist.py)
+JWT_DENYLIST_BACKEND = os.environ.get('JWT_DENYLIST_BACKEND', 'tickets.denylist.SQLiteDenylist')
+JWT_DENYLIST_SQLITE_PATH = BASE_DIR / 'jwt_denylist.sqlite3'
+# Pour CacheDenylist : cache partagé à add() atomique et sans éviction (Redis, Memcached)
+JWT_DENYLIST_CACHE_ALIAS = 'default'
+
+# Dates de dernière connexion différées : vidées toutes les LAST_LOGIN_FLUSH_SECONDS
+# secondes, au plus une écriture par utilisateur et par LAST_LOGIN_GRANULARITY secondes
+LAST_LOGIN_FLUSH_SECONDS = 60
+LAST_LOGIN_FLUSH_EVENTS = 1000
+LAST_LOGIN_GRANULARITY = 3600
+
+# Pool de hachage des mots de passe des vues asynchrones (voir tickets/hashing.py)
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '0'))  # 0 : un thread par cœur
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '0'))  # 0 : 4 par thread
+PASSWORD_HASH_RETRY_AFTER = 1  # secondes annoncées dans le 503 quand le pool est plein
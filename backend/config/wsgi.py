@@ -13,4 +13,9 @@ from django.core.wsgi import get_wsgi_application
 settings_module = os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings')
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Filtre des final_key construit au démarrage du worker, rafraîchi en arrière-plan
+from tickets.bloom import ticket_key_filter  # noqa: E402
+
+ticket_key_filter.start()
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Ticket, TicketOffer
+from .stock import provision
 
 @admin.register(Ticket)
 class TicketAdmin(admin.ModelAdmin):
@@ -10,5 +11,10 @@ class TicketAdmin(admin.ModelAdmin):
 
 @admin.register(TicketOffer)
 class TicketOfferAdmin(admin.ModelAdmin):
-    list_display = ('name', 'offer_type', 'price', 'available')
-    list_editable = ('price', 'available')
\ No newline at end of file
+    list_display = ('name', 'offer_type', 'price', 'capacity', 'available')
+    list_editable = ('price', 'available')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change or 'capacity' in form.changed_data:
+            provision(obj)
\ No newline at end of file
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class TicketsConfig(AppConfig):
+    name = 'tickets'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,262 @@
+"""Vues asynchrones, servies sous ASGI (voir config/asgi_urls.py).
+
+Connexion et inscription : le hachage du mot de passe passe par le pool
+borné de tickets.hashing, et un pool plein répond par un 503 immédiat avec
+Retry-After.
+
+Scan et QR codes : lectures par l'ORM asynchrone, et rendu des QR codes
+hors de la boucle d'événements (tasks.aget_qr_image). Les écritures
+transactionnelles (validation) restent synchrones, dans un thread. Pendant
+ces attentes, le worker continue de servir les autres requêtes.
+
+Ces vues ne passent pas par DRF, qui n'a pas de vues asynchrones :
+l'authentification JWT, IsAdminUser et Idempotency-Key y sont reproduits
+avec les mêmes réponses.
+"""
+import json
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated, NotFound, PermissionDenied
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import hashing, idempotency
+from .authentication import CachedJWTAuthentication
+from .bloom import ticket_key_filter
+from .models import Ticket, User
+from .qr import CONTENT_TYPES as QR_CONTENT_TYPES, QR_CACHE_CONTROL, etag_matches, negotiate_format, qr_etag
+from .serializers import UserSerializer
+from .signing import InvalidTicketKey, is_signed_key, settings_secret, verify_ticket_key
+from .tasks import aget_qr_image
+from .views import check_in_ticket, ticket_verification_data
+from .writebehind import last_logins
+
+jwt_authentication = CachedJWTAuthentication()
+
+
+def request_data(request):
+    """Corps JSON ou formulaire ; None si le JSON est invalide."""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+def staff_required(view_func):
+    """Jeton JWT d'un membre du staff, comme JWTAuthentication + IsAdminUser."""
+    @wraps(view_func)
+    async def _wrapped_view(request, *args, **kwargs):
+        try:
+            result = await sync_to_async(jwt_authentication.authenticate)(request)
+        except AuthenticationFailed as e:
+            detail = e.detail if isinstance(e.detail, dict) else {'detail': e.detail}
+            response = JsonResponse(detail, status=e.status_code)
+            response['WWW-Authenticate'] = jwt_authentication.authenticate_header(request)
+            return response
+        if result is None:
+            response = JsonResponse({'detail': str(NotAuthenticated.default_detail)}, status=401)
+            response['WWW-Authenticate'] = jwt_authentication.authenticate_header(request)
+            return response
+
+        request.user = result[0]
+        if not request.user.is_staff:
+            return JsonResponse({'detail': str(PermissionDenied.default_detail)}, status=403)
+        return await view_func(request, *args, **kwargs)
+
+    return _wrapped_view
+
+
+def idempotent(view_func):
+    """decorators.idempotent pour les vues asynchrones : même magasin, mêmes réponses."""
+    @wraps(view_func)
+    async def _wrapped_view(request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return await view_func(request, *args, **kwargs)
+        if len(key) > 255:
+            return JsonResponse({'error': 'Idempotency-Key trop longue'}, status=400)
+
+        store = idempotency.get_store()
+        key = idempotency.scoped_key(request, key)
+        fingerprint = idempotency.data_fingerprint(request_data(request))
+
+        state, stored = await sync_to_async(store.begin, thread_sensitive=False)(key, fingerprint, time.time())
+        if state == idempotency.PENDING:
+            state, stored = await sync_to_async(store.wait, thread_sensitive=False)(
+                key, fingerprint, settings.IDEMPOTENCY_WAIT_SECONDS,
+            )
+            if state == idempotency.PENDING:
+                return JsonResponse({'error': 'Requête identique en cours de traitement'}, status=409)
+
+        if state == idempotency.DONE:
+            if stored.fingerprint != fingerprint:
+                return JsonResponse({'error': 'Idempotency-Key déjà utilisée pour une autre requête'}, status=422)
+            response = JsonResponse(json.loads(stored.body), status=stored.status, safe=False)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        try:
+            response = await view_func(request, *args, **kwargs)
+        except BaseException:
+            await sync_to_async(store.abandon, thread_sensitive=False)(key)
+            raise
+
+        if idempotency.should_store(response):
+            await sync_to_async(store.complete, thread_sensitive=False)(
+                key, fingerprint, response.status_code, response.content.decode(),
+                time.time() + settings.IDEMPOTENCY_TTL,
+            )
+        else:
+            await sync_to_async(store.abandon, thread_sensitive=False)(key)
+        return response
+
+    return _wrapped_view
+
+
+def saturated_response():
+    response = JsonResponse({'error': 'Serveur saturé, réessayez dans un instant'}, status=503)
+    response['Retry-After'] = str(settings.PASSWORD_HASH_RETRY_AFTER)
+    return response
+
+
+@csrf_exempt
+@require_POST
+async def login(request):
+    data = request_data(request)
+    if data is None:
+        return JsonResponse({'error': 'JSON invalide'}, status=400)
+    email = data.get('email')
+    password = data.get('password')
+    if not email or not password:
+        return JsonResponse({'error': 'Identifiants invalides'}, status=401)
+
+    user = await User.objects.filter(email=email).afirst()
+    try:
+        if user is None:
+            # Même coût qu'un mauvais mot de passe (comme ModelBackend)
+            await hashing.make_password(password)
+            valid = False
+        else:
+            valid = await hashing.check_password(user, password)
+    except hashing.HashPoolSaturated:
+        return saturated_response()
+
+    if not valid or not user.is_active:
+        return JsonResponse({'error': 'Identifiants invalides'}, status=401)
+
+    last_logins.record(user)
+    refresh = RefreshToken.for_user(user)
+    return JsonResponse({
+        'access': str(refresh.access_token),
+        'refresh': str(refresh),
+    })
+
+
+@csrf_exempt
+@require_POST
+async def register(request):
+    data = request_data(request)
+    if data is None:
+        return JsonResponse({'error': 'JSON invalide'}, status=400)
+
+    serializer = UserSerializer(data=data)
+    # Validateurs d'unicité : requêtes synchrones
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=400)
+
+    try:
+        password_hash = await hashing.make_password(serializer.validated_data['password'])
+    except hashing.HashPoolSaturated:
+        return saturated_response()
+
+    user = await sync_to_async(serializer.save)(password_hash=password_hash)
+    return JsonResponse({
+        'user': UserSerializer(user).data,
+        'message': 'User created successfully',
+    }, status=201)
+
+
+@csrf_exempt
+@require_POST
+@staff_required
+async def admin_verify_ticket(request):
+    """Vérifier un ticket via QR code (pour le scanning), comme views.admin_verify_ticket"""
+    data = request_data(request)
+    final_key = data.get('final_key') if data is not None else None
+    if not final_key:
+        return JsonResponse({'error': 'Clé finale requise'}, status=400)
+
+    if settings.TICKET_SIGNING_KEY and is_signed_key(final_key):
+        try:
+            verify_ticket_key(settings_secret(), final_key)
+        except InvalidTicketKey as e:
+            return JsonResponse({'valid': False, 'error': str(e)}, status=404)
+
+    if not ticket_key_filter.might_contain(final_key):
+        return JsonResponse({'valid': False, 'error': 'Ticket non trouvé'}, status=404)
+
+    ticket = await Ticket.objects.select_related('user', 'offer').filter(final_key=final_key).afirst()
+    if ticket is None:
+        return JsonResponse({'valid': False, 'error': 'Ticket non trouvé'}, status=404)
+    return JsonResponse(ticket_verification_data(ticket))
+
+
+@csrf_exempt
+@require_POST
+@staff_required
+@idempotent
+async def validate_ticket(request, pk):
+    """Valider un ticket (marquer comme utilisé), comme TicketViewSet.validate_ticket"""
+    # Transaction : synchrone, dans le thread de la requête
+    checked_in = await sync_to_async(check_in_ticket)(pk)
+    if checked_in is None:
+        if not await Ticket.objects.filter(pk=pk).aexists():
+            return JsonResponse({'detail': str(NotFound.default_detail)}, status=404)
+        return JsonResponse({'error': 'Ticket déjà utilisé'}, status=400)
+
+    return JsonResponse({
+        'message': 'Ticket validé avec succès',
+        'ticket_id': checked_in.ticket_id,
+        'user': f"{checked_in.first_name} {checked_in.last_name}",
+        'offer': checked_in.offer_name,
+    })
+
+
+@require_GET
+async def ticket_qr_code(request, ticket_id):
+    """QR code du ticket en PNG, SVG ou matrice compacte (?format= ou en-tête Accept)"""
+    qr_format = negotiate_format(request.GET.get('format'), request.headers.get('Accept'))
+    if qr_format is None:
+        status = 404 if request.GET.get('format') else 406
+        return JsonResponse({'detail': 'Format de QR code non disponible'}, status=status)
+
+    try:
+        final_key = await Ticket.objects.filter(id=ticket_id).values_list('final_key', flat=True).afirst()
+
+        if final_key is None:
+            return HttpResponse('Ticket non trouvé', status=404)
+        if not final_key:
+            return HttpResponse('Pas de final_key', status=500)
+
+        etag = qr_etag(final_key, qr_format)
+        if etag_matches(request.META.get('HTTP_IF_NONE_MATCH'), etag):
+            response = HttpResponse(status=304)
+        else:
+            response = HttpResponse(await aget_qr_image(final_key, qr_format), content_type=QR_CONTENT_TYPES[qr_format])
+
+        response['ETag'] = etag
+        response['Cache-Control'] = QR_CACHE_CONTROL
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+    except Exception as e:
+        return HttpResponse(f'Erreur: {str(e)}', status=500)
@@ -0,0 +1,137 @@
+"""Authentification JWT sans SELECT de l'utilisateur à chaque requête.
+
+JWTAuthentication charge la ligne tickets_user (par email) avant chaque vue.
+CachedJWTAuthentication garde les champs de l'utilisateur dans un cache
+local borné à courte durée de vie (JWT_USER_CACHE_TTL), avec en option un
+second niveau partagé entre workers (cache Django JWT_USER_CACHE_ALIAS).
+Les entrées sont supprimées à l'enregistrement ou à la suppression de
+l'utilisateur (signal) ; les caches locaux des autres workers expirent au
+plus JWT_USER_CACHE_TTL secondes plus tard.
+
+Les jetons de portique (claim « scanner », voir la commande
+issue_scanner_token) portent is_staff : en mode claims-only
+(JWT_SCANNER_CLAIMS_ONLY), ils ne touchent jamais la base. Leur durée de
+vie courte tient lieu de révocation.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+SCANNER_CLAIM = 'scanner'
+
+
+class TTLCache:
+    """Cache LRU borné dont les entrées expirent après ttl secondes."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_users = TTLCache(
+    getattr(settings, 'JWT_USER_CACHE_MAX_ENTRIES', 10000),
+    getattr(settings, 'JWT_USER_CACHE_TTL', 30),
+)
+
+
+def shared_cache():
+    alias = getattr(settings, 'JWT_USER_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def shared_key(user_id):
+    return f'tickets:jwt-user:{user_id}'
+
+
+def user_fields(user):
+    return tuple(getattr(user, field.attname) for field in user._meta.concrete_fields)
+
+
+def user_from_fields(values):
+    """Instance User reconstruite sans requête ; une nouvelle par requête HTTP."""
+    User = get_user_model()
+    return User.from_db('default', [field.attname for field in User._meta.concrete_fields], values)
+
+
+def invalidate_user(user_id):
+    local_users.delete(user_id)
+    shared = shared_cache()
+    if shared is not None:
+        shared.delete(shared_key(user_id))
+
+
+class ScannerUser(TokenUser):
+    """Utilisateur d'un jeton de portique, construit depuis les claims."""
+    is_admin = False
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if validated_token.get(SCANNER_CLAIM) and getattr(settings, 'JWT_SCANNER_CLAIMS_ONLY', True):
+            if api_settings.USER_ID_CLAIM not in validated_token:
+                raise InvalidToken("Le jeton ne contient pas d'identifiant utilisateur")
+            return ScannerUser(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Le jeton ne contient pas d'identifiant utilisateur")
+
+        values = local_users.get(user_id)
+        if values is None:
+            shared = shared_cache()
+            values = shared.get(shared_key(user_id)) if shared is not None else None
+            if values is None:
+                values = user_fields(super().get_user(validated_token))
+                if shared is not None:
+                    shared.set(shared_key(user_id), values, getattr(settings, 'JWT_USER_SHARED_CACHE_TTL', 300))
+            local_users.set(user_id, values)
+
+        user = user_from_fields(values)
+        # Mêmes contrôles que JWTAuthentication sur une entrée venant du cache
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("Utilisateur inactif", code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and (
+            validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password)
+        ):
+            raise AuthenticationFailed("Le mot de passe a été modifié", code='password_changed')
+        return user
@@ -0,0 +1,169 @@
+"""Filtre de Bloom des final_key connues, local au processus.
+
+Permet de rejeter une clé forgée ou illisible sans aller en base : un
+filtre de Bloom n'a jamais de faux négatif, seulement de rares faux
+positifs qui retombent sur la recherche indexée habituelle.
+
+Le filtre est construit au démarrage du worker (config/wsgi.py,
+config/asgi.py) puis rafraîchi par un thread toutes les
+TICKET_KEY_FILTER_REFRESH_SECONDS : un ticket acheté via un autre worker
+peut être refusé pendant au plus cet intervalle. Tant que le filtre n'est
+pas construit (commandes, tests, échec au démarrage), toute clé passe par
+la recherche indexée.
+"""
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key):
+        added = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        # Une clé déjà présente (relecture de la marge) ne compte pas deux fois
+        if added:
+            self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class TicketKeyFilter:
+    """Filtre des tickets existants, tenu à jour en arrière-plan.
+
+    Les achats faits par ce processus sont ajoutés directement. Ceux faits par
+    les autres workers sont rattrapés par un rafraîchissement incrémental le
+    long de l'index (updated_at, id), comme les deltas des portiques : le
+    curseur ne dépasse pas le filigrane de tickets.sync, une transaction
+    committée en retard est donc relue.
+    """
+
+    def __init__(self):
+        self._bloom = None
+        self._cursor = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'TICKET_KEY_FILTER_ENABLED', True)
+
+    @property
+    def refresh_interval(self):
+        return getattr(settings, 'TICKET_KEY_FILTER_REFRESH_SECONDS', 1.0)
+
+    def rebuild(self):
+        from .models import Ticket
+        from .sync import settled_watermark
+
+        watermark = settled_watermark()
+        count = Ticket.objects.count()
+        bloom = BloomFilter(
+            max(count * 2, 10000),
+            getattr(settings, 'TICKET_KEY_FILTER_ERROR_RATE', 0.001),
+        )
+        for final_key in Ticket.objects.values_list('final_key', flat=True).iterator(chunk_size=5000):
+            bloom.add(final_key)
+
+        with self._lock:
+            self._bloom = bloom
+            # Les lignes postérieures au filigrane seront relues au prochain rafraîchissement
+            self._cursor = (watermark, 0)
+
+    def refresh(self):
+        from .models import Ticket
+        from .sync import settled_watermark
+
+        if self._bloom is None:
+            self.rebuild()
+            return
+
+        watermark = settled_watermark()
+        since_at, since_id = self._cursor
+        rows = list(
+            Ticket.objects.filter(Q(updated_at__gt=since_at) | Q(updated_at=since_at, id__gt=since_id))
+            .order_by('updated_at', 'id')
+            .values_list('id', 'final_key', 'updated_at')
+        )
+        cursor = self._cursor
+        with self._lock:
+            for ticket_id, final_key, updated_at in rows:
+                self._bloom.add(final_key)
+                if updated_at <= watermark:
+                    cursor = (updated_at, ticket_id)
+            self._cursor = max(cursor, (watermark, 0))
+
+        # Au-delà de la capacité prévue, le taux de faux positifs se dégrade
+        if self._bloom.count > self._bloom.capacity:
+            self.rebuild()
+
+    def add(self, final_key):
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(final_key)
+
+    def start(self):
+        """Construit le filtre puis lance son rafraîchissement ; à appeler au démarrage du worker."""
+        if not self.enabled:
+            return
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception("Construction du filtre des tickets impossible, nouvel essai en arrière-plan")
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        # Un worker forké après start() (gunicorn --preload) relance son propre thread
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            close_old_connections()
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Échec du rafraîchissement du filtre des tickets")
+
+    def might_contain(self, final_key):
+        """False si la clé est absente du filtre : inconnue, au décalage du rafraîchissement près."""
+        if not self.enabled or self._bloom is None:
+            return True
+        if self._thread is not None:
+            self._ensure_thread()
+        return final_key in self._bloom
+
+
+ticket_key_filter = TicketKeyFilter()
@@ -0,0 +1,90 @@
+"""Catalogue public des offres, mis en cache sous forme de JSON déjà encodé.
+
+La liste des offres disponibles ne change que sur une modification admin :
+le corps de réponse est construit une fois puis servi depuis le cache
+Django (alias CATALOG_CACHE_ALIAS), avec un ETag (empreinte du corps) et un
+Last-Modified pour que navigateurs et CDN revalident sans retélécharger.
+
+Last-Modified est le plus récent de TicketOffer.updated_at sur toutes les
+offres et de la date de la dernière invalidation, conservée dans le même
+cache : désactiver ou supprimer une offre le fait donc avancer. Le cache est
+invalidé par les signaux de TicketOffer (voir tickets/signals.py), en
+changeant de génération (tickets.generations) ;
+CATALOG_CACHE_TIMEOUT borne la durée de vie d'une entrée si une écriture
+contourne les signaux (queryset.update()).
+"""
+import hashlib
+import math
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Max
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.renderers import JSONRenderer
+
+from . import generations
+from .qr import etag_matches
+
+CACHE_KEY = 'tickets:catalog'
+GENERATION_KEY = 'tickets:catalog:generation'
+INVALIDATED_KEY = 'tickets:catalog:invalidated'
+
+Catalog = namedtuple('Catalog', ['body', 'etag', 'last_modified'])
+
+
+def catalog_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def build_catalog(invalidated_at=None):
+    from .models import TicketOffer
+    from .serializers import TicketOfferSerializer
+
+    offers = TicketOffer.objects.filter(available=True)
+    body = JSONRenderer().render(TicketOfferSerializer(offers, many=True).data)
+    # Toutes les offres : une offre désactivée compte aussi
+    updated_at = TicketOffer.objects.aggregate(last=Max('updated_at'))['last']
+    last_modified = max(int(updated_at.timestamp()) if updated_at else 0, invalidated_at or 0)
+    return Catalog(
+        body,
+        '"%s"' % hashlib.sha256(body).hexdigest()[:32],
+        last_modified or None,
+    )
+
+
+def get_catalog():
+    cache = catalog_cache()
+    # Génération lue avant les offres : un corps construit avant un commit
+    # est rangé sous l'ancienne génération
+    key = f'{CACHE_KEY}:{generations.current(cache, GENERATION_KEY)}'
+    catalog = cache.get(key)
+    if catalog is None:
+        catalog = build_catalog(cache.get(INVALIDATED_KEY))
+        cache.set(key, catalog, settings.CATALOG_CACHE_TIMEOUT)
+    return catalog
+
+
+def invalidate_catalog():
+    # Arrondi à la seconde supérieure : strictement après le Last-Modified déjà servi
+    transaction.on_commit(lambda: generations.bump(
+        catalog_cache(), [GENERATION_KEY], **{INVALIDATED_KEY: math.ceil(time.time())},
+    ))
+
+
+def not_modified(request, catalog):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        return etag_matches(if_none_match, catalog.etag)
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+    return bool(catalog.last_modified and if_modified_since and catalog.last_modified <= if_modified_since)
+
+
+def apply_headers(response, catalog):
+    response['ETag'] = catalog.etag
+    if catalog.last_modified:
+        response['Last-Modified'] = http_date(catalog.last_modified)
+    response['Cache-Control'] = f'public, max-age={settings.CATALOG_MAX_AGE}, must-revalidate'
+    return response
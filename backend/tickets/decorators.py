@@ -1,6 +1,11 @@
+import json
+import time
 from functools import wraps
+from django.conf import settings
 from rest_framework.response import Response
 from rest_framework import status
+from . import idempotency
+from .waiting_room import InvalidQueueToken, claim_pass, queue_status, release_pass
 
 
 def admin_required(view_func):
@@ -28,4 +33,97 @@ def admin_required_function(view_func):
 
         return view_func(request, *args, **kwargs)
 
-    return _wrapped_view
\ No newline at end of file
+    return _wrapped_view
+
+def waiting_room_required(view_func):
+    """Exige un jeton de salle d'attente admis (en-tête X-Queue-Token) si WAITING_ROOM_ENABLED.
+
+    Le laissez-passer est réservé pendant l'appel et rendu si la vue échoue :
+    chaque jeton admis permet un seul achat réussi. Les refus de la file ne
+    sont pas mémorisés par idempotent : une fois admis, le client rejoue sa clé.
+    """
+    @wraps(view_func)
+    def _wrapped_view(self, request, *args, **kwargs):
+        if not settings.WAITING_ROOM_ENABLED:
+            return view_func(self, request, *args, **kwargs)
+
+        def forbidden(error):
+            return idempotency.exempt(Response({'error': error}, status=status.HTTP_403_FORBIDDEN))
+
+        token = request.headers.get('X-Queue-Token')
+        if not token:
+            return forbidden("Jeton de file d'attente requis")
+        try:
+            queue = queue_status(token)
+        except InvalidQueueToken as e:
+            return forbidden(str(e))
+
+        if queue.expired:
+            return forbidden("Passage expiré, rejoignez à nouveau la file")
+        if not queue.admitted:
+            response = Response({
+                'error': "Pas encore admis",
+                'ahead': queue.ahead,
+            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+            response['Retry-After'] = str(max(1, round(queue.estimated_wait or 1)))
+            return idempotency.exempt(response)
+
+        if not claim_pass(queue.queue, queue.position):
+            return forbidden("Passage déjà utilisé, rejoignez à nouveau la file")
+        try:
+            response = view_func(self, request, *args, **kwargs)
+        except BaseException:
+            release_pass(queue.queue, queue.position)
+            raise
+        if response.status_code >= 400:
+            release_pass(queue.queue, queue.position)
+        return response
+
+    return _wrapped_view
+
+
+def idempotent(view_func):
+    """Honore l'en-tête Idempotency-Key : une requête rejouée reçoit la réponse déjà produite."""
+    @wraps(view_func)
+    def _wrapped_view(self, request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view_func(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({'error': 'Idempotency-Key trop longue'}, status=status.HTTP_400_BAD_REQUEST)
+
+        store = idempotency.get_store()
+        key = idempotency.scoped_key(request, key)
+        fingerprint = idempotency.request_fingerprint(request)
+
+        state, stored = store.begin(key, fingerprint, time.time())
+        if state == idempotency.PENDING:
+            # Doublon concurrent : on attend la première exécution plutôt que de la relancer
+            state, stored = store.wait(key, fingerprint, settings.IDEMPOTENCY_WAIT_SECONDS)
+            if state == idempotency.PENDING:
+                return Response({'error': 'Requête identique en cours de traitement'}, status=status.HTTP_409_CONFLICT)
+
+        if state == idempotency.DONE:
+            if stored.fingerprint != fingerprint:
+                return Response(
+                    {'error': 'Idempotency-Key déjà utilisée pour une autre requête'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            response = Response(json.loads(stored.body), status=stored.status)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        try:
+            response = view_func(self, request, *args, **kwargs)
+        except BaseException:
+            store.abandon(key)
+            raise
+
+        if idempotency.should_store(response):
+            body = json.dumps(response.data, separators=(',', ':'), default=str)
+            store.complete(key, fingerprint, response.status_code, body, time.time() + settings.IDEMPOTENCY_TTL)
+        else:
+            store.abandon(key)
+        return response
+
+    return _wrapped_view
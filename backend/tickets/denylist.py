@@ -0,0 +1,147 @@
+"""Liste des jetons de rafraîchissement déjà utilisés (jti -> expiration).
+
+Avec ROTATE_REFRESH_TOKENS, un refresh token ne sert qu'une fois : à la
+rotation, son jti est inscrit ici jusqu'à son expiration, au-delà de
+laquelle il serait de toute façon refusé. Rien ne s'accumule : les
+entrées s'évincent d'elles-mêmes, sans la table de token_blacklist ni
+écriture en base à chaque rafraîchissement.
+
+- MemoryDenylist : propre au processus (tas des expirations), pour les tests
+  et un serveur à un worker ;
+- SQLiteDenylist : fichier local partagé par les workers d'un même nœud
+  (défaut) ; un INSERT sur la clé primaire jti tranche entre rafraîchissements
+  concurrents, et seules les entrées expirées sont purgées ;
+- CacheDenylist : cache Django (JWT_DENYLIST_CACHE_ALIAS), dont le timeout
+  porte l'expiration. Réservé à un cache partagé à add() atomique et sans
+  éviction avant expiration (Redis, Memcached dimensionné) : un jti évincé
+  rendrait son jeton rejouable.
+"""
+import heapq
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+
+class MemoryDenylist:
+    def __init__(self):
+        self._expires = {}
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        while self._heap and self._heap[0][0] <= now:
+            expires, jti = heapq.heappop(self._heap)
+            if self._expires.get(jti) == expires:
+                del self._expires[jti]
+
+    def consume(self, jti, expires):
+        """Inscrit jti ; retourne False s'il y était déjà (jeton rejoué)."""
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            if jti in self._expires:
+                return False
+            if expires > now:
+                self._expires[jti] = expires
+                heapq.heappush(self._heap, (expires, jti))
+            return True
+
+    def __contains__(self, jti):
+        with self._lock:
+            self._evict(time.time())
+            return jti in self._expires
+
+    def __len__(self):
+        return len(self._expires)
+
+
+class SQLiteDenylist:
+    """jti consommés dans un fichier SQLite local (JWT_DENYLIST_SQLITE_PATH)."""
+
+    # Purge des entrées expirées tous les N appels à consume()
+    PURGE_EVERY = 500
+
+    def __init__(self, path=None):
+        self.path = str(path or settings.JWT_DENYLIST_SQLITE_PATH)
+        self._local = threading.local()
+        self._calls = 0
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS jwt_denylist (jti TEXT PRIMARY KEY, expires REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS jwt_denylist_expires ON jwt_denylist (expires)')
+            self._local.connection = connection
+        return connection
+
+    def consume(self, jti, expires):
+        now = time.time()
+        if expires <= now:
+            return True
+        connection = self._connection()
+        self._calls += 1
+        if self._calls % self.PURGE_EVERY == 0:
+            connection.execute('DELETE FROM jwt_denylist WHERE expires <= ?', (now,))
+
+        # BEGIN IMMEDIATE : une entrée expirée restante est remplacée sans course
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute('DELETE FROM jwt_denylist WHERE jti = ? AND expires <= ?', (jti, now))
+            inserted = connection.execute(
+                'INSERT OR IGNORE INTO jwt_denylist (jti, expires) VALUES (?, ?)', (jti, expires),
+            ).rowcount == 1
+            connection.execute('COMMIT')
+            return inserted
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def __contains__(self, jti):
+        return self._connection().execute(
+            'SELECT 1 FROM jwt_denylist WHERE jti = ? AND expires > ?', (jti, time.time()),
+        ).fetchone() is not None
+
+
+class CacheDenylist:
+    def __init__(self, alias=None):
+        self.cache = caches[alias or getattr(settings, 'JWT_DENYLIST_CACHE_ALIAS', 'default')]
+
+    @staticmethod
+    def key(jti):
+        return f'tickets:denylist:{jti}'
+
+    def consume(self, jti, expires):
+        timeout = expires - time.time()
+        if timeout <= 0:
+            return True
+        # add() n'écrit que si la clé est absente : un seul des rafraîchissements concurrents passe
+        return self.cache.add(self.key(jti), 1, timeout)
+
+    def __contains__(self, jti):
+        return self.cache.get(self.key(jti)) is not None
+
+
+_denylist = None
+_denylist_lock = threading.Lock()
+
+
+def get_denylist():
+    global _denylist
+    if _denylist is None:
+        with _denylist_lock:
+            if _denylist is None:
+                _denylist = import_string(settings.JWT_DENYLIST_BACKEND)()
+    return _denylist
+
+
+def reset_denylist():
+    global _denylist
+    _denylist = None
@@ -0,0 +1,24 @@
+"""Générations de cache : invalidation sans course avec les lecteurs.
+
+Une entrée est rangée sous une clé qui porte la génération courante, lue
+avant la base. L'invalidation, au commit, remplace la génération : un
+lecteur qui a lu l'état d'avant le commit range son résultat sous
+l'ancienne génération, que plus personne ne lit, au lieu d'écraser
+l'entrée fraîche. Les générations sont aléatoires : une clé de génération
+évincée du cache n'en ressuscite jamais une ancienne.
+"""
+import uuid
+
+
+def current(cache, key):
+    generation = cache.get(key)
+    if generation is None:
+        # add() : deux lecteurs concurrents retiennent la même génération
+        cache.add(key, uuid.uuid4().hex, None)
+        generation = cache.get(key) or uuid.uuid4().hex
+    return generation
+
+
+def bump(cache, keys, **extra):
+    """Nouvelle génération pour chaque clé ; extra : valeurs écrites avec elles."""
+    cache.set_many({**{key: uuid.uuid4().hex for key in keys}, **extra}, None)
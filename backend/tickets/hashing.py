@@ -0,0 +1,162 @@
+"""Hachage des mots de passe dans un pool de threads borné.
+
+PBKDF2 (hashlib.pbkdf2_hmac) libère le GIL : un pool de
+PASSWORD_HASH_WORKERS threads (par défaut un par cœur) occupe les cœurs
+sans bloquer la boucle d'événements des vues asynchrones
+(tickets/async_views.py).
+
+Au-delà de PASSWORD_HASH_MAX_PENDING hachages en cours ou en attente, la
+demande est refusée immédiatement (HashPoolSaturated, servi en 503 avec
+Retry-After) au lieu de s'empiler sans limite pendant une vague de
+connexions. Les temps d'attente dans le pool et de hachage sont cumulés
+par processus (HashingPool.metrics).
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class HashPoolSaturated(Exception):
+    pass
+
+
+class HashMetrics:
+    """Compteurs du pool : demandes acceptées, refusées, attente et durée des hachages."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.completed = 0
+            self.rejected = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.hash_total = 0.0
+            self.hash_max = 0.0
+
+    def record(self, wait, duration):
+        with self._lock:
+            self.completed += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.hash_total += duration
+            self.hash_max = max(self.hash_max, duration)
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self):
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'wait_avg_ms': round(self.wait_total / completed * 1000, 2),
+                'wait_max_ms': round(self.wait_max * 1000, 2),
+                'hash_avg_ms': round(self.hash_total / completed * 1000, 2),
+                'hash_max_ms': round(self.hash_max * 1000, 2),
+            }
+
+
+class HashingPool:
+    def __init__(self, workers=None, max_pending=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 4
+        self.metrics = HashMetrics()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def submit(self, fn, *args):
+        """Planifie fn(*args) ; lève HashPoolSaturated si toutes les places sont prises."""
+        if not self._slots.acquire(blocking=False):
+            self.metrics.reject()
+            raise HashPoolSaturated("Pool de hachage saturé")
+        with self._lock:
+            self._pending += 1
+        queued = time.monotonic()
+
+        def run():
+            started = time.monotonic()
+            try:
+                return fn(*args)
+            finally:
+                self.metrics.record(started - queued, time.monotonic() - started)
+                self._release()
+
+        try:
+            return self._executor.submit(run)
+        except RuntimeError:
+            self._release()
+            raise
+
+    async def run(self, fn, *args):
+        # Un client qui abandonne n'interrompt pas le hachage : sa place est rendue à la fin
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool(
+                    getattr(settings, 'PASSWORD_HASH_WORKERS', 0),
+                    getattr(settings, 'PASSWORD_HASH_MAX_PENDING', 0),
+                )
+    return _pool
+
+
+def reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = None
+
+
+async def make_password(raw_password):
+    return await get_pool().run(hashers.make_password, raw_password)
+
+
+async def check_password(user, raw_password):
+    """Équivalent asynchrone de user.check_password, hachage dans le pool.
+
+    Un hachage à mettre à niveau (itérations, algorithme) est réécrit comme
+    le fait Django ; si le pool est plein à ce moment-là, ce sera à la
+    prochaine connexion.
+    """
+    upgrade = []
+    valid = await get_pool().run(hashers.check_password, raw_password, user.password, upgrade.append)
+    if valid and upgrade:
+        try:
+            user.password = await make_password(raw_password)
+        except HashPoolSaturated:
+            return valid
+        await user.asave(update_fields=['password'])
+    return valid
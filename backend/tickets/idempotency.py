@@ -0,0 +1,210 @@
+"""Rejeu des requêtes portant un en-tête Idempotency-Key.
+
+Un client mobile qui renvoie un achat ou une validation après un timeout
+reçoit la réponse de la première exécution au lieu de relancer la
+transaction. La clé est propre à l'utilisateur et à l'URL ; réutilisée
+avec un autre corps de requête, elle est refusée.
+
+Chaque clé passe par deux états dans le magasin (IDEMPOTENCY_STORE) :
+« en cours » tant que la première exécution tourne, puis la réponse
+compacte (statut + JSON) jusqu'à expiration (IDEMPOTENCY_TTL). Un doublon
+concurrent attend la fin de la première exécution. Une entrée « en cours »
+abandonnée (worker tué) est reprise après IDEMPOTENCY_LOCK_TIMEOUT.
+
+- MemoryStore : propre au processus, pour les tests et un serveur à un worker ;
+- SQLiteStore : fichier local partagé par les workers d'un même nœud.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+STARTED = 'started'
+PENDING = 'pending'
+DONE = 'done'
+
+StoredResponse = namedtuple('StoredResponse', ['fingerprint', 'status', 'body'])
+
+
+def request_fingerprint(request):
+    return data_fingerprint(request.data)
+
+
+def data_fingerprint(data):
+    payload = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def scoped_key(request, key):
+    user_id = request.user.pk if request.user.is_authenticated else ''
+    return hashlib.sha256(f"{user_id}:{request.method}:{request.path}:{key}".encode()).hexdigest()
+
+
+class BaseStore:
+    poll_interval = 0.05
+
+    def begin(self, key, fingerprint, now):
+        """Réserve la clé. Retourne (STARTED, None), (PENDING, None) ou (DONE, StoredResponse)."""
+        raise NotImplementedError
+
+    def complete(self, key, fingerprint, status, body, expires):
+        raise NotImplementedError
+
+    def abandon(self, key):
+        raise NotImplementedError
+
+    def wait(self, key, fingerprint, timeout):
+        """Attend la fin de l'exécution en cours ; retourne le dernier état vu."""
+        deadline = time.monotonic() + timeout
+        while True:
+            state, stored = self.begin(key, fingerprint, time.time())
+            if state != PENDING or time.monotonic() >= deadline:
+                return state, stored
+            time.sleep(self.poll_interval)
+
+
+class MemoryStore(BaseStore):
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or getattr(settings, 'IDEMPOTENCY_MAX_ENTRIES', 10000)
+        self._entries = OrderedDict()
+        self._condition = threading.Condition()
+
+    def begin(self, key, fingerprint, now):
+        with self._condition:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < now:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._entries[key] = (now + settings.IDEMPOTENCY_LOCK_TIMEOUT, None)
+                self._evict()
+                return STARTED, None
+            if entry[1] is None:
+                return PENDING, None
+            return DONE, entry[1]
+
+    def complete(self, key, fingerprint, status, body, expires):
+        with self._condition:
+            self._entries[key] = (expires, StoredResponse(fingerprint, status, body))
+            self._entries.move_to_end(key)
+            self._evict()
+            self._condition.notify_all()
+
+    def abandon(self, key):
+        with self._condition:
+            self._entries.pop(key, None)
+            self._condition.notify_all()
+
+    def wait(self, key, fingerprint, timeout):
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                state, stored = self.begin(key, fingerprint, time.time())
+                remaining = deadline - time.monotonic()
+                if state != PENDING or remaining <= 0:
+                    return state, stored
+                self._condition.wait(remaining)
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class SQLiteStore(BaseStore):
+    """Réponses dans un fichier SQLite local (IDEMPOTENCY_SQLITE_PATH)."""
+
+    # Purge des entrées expirées tous les N appels à begin()
+    PURGE_EVERY = 500
+
+    def __init__(self, path=None):
+        self.path = str(path or settings.IDEMPOTENCY_SQLITE_PATH)
+        self._local = threading.local()
+        self._calls = 0
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS idempotency ('
+                ' key TEXT PRIMARY KEY, expires REAL NOT NULL,'
+                ' fingerprint TEXT, status INTEGER, body TEXT)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS idempotency_expires ON idempotency (expires)')
+            self._local.connection = connection
+        return connection
+
+    def begin(self, key, fingerprint, now):
+        connection = self._connection()
+        self._calls += 1
+        if self._calls % self.PURGE_EVERY == 0:
+            connection.execute('DELETE FROM idempotency WHERE expires < ?', (now,))
+
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT expires, fingerprint, status, body FROM idempotency WHERE key = ?', (key,),
+            ).fetchone()
+            if row is None or row[0] < now:
+                connection.execute(
+                    'INSERT OR REPLACE INTO idempotency (key, expires, fingerprint, status, body)'
+                    ' VALUES (?, ?, NULL, NULL, NULL)',
+                    (key, now + settings.IDEMPOTENCY_LOCK_TIMEOUT),
+                )
+                result = STARTED, None
+            elif row[2] is None:
+                result = PENDING, None
+            else:
+                result = DONE, StoredResponse(row[1], row[2], row[3])
+            connection.execute('COMMIT')
+            return result
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def complete(self, key, fingerprint, status, body, expires):
+        self._connection().execute(
+            'UPDATE idempotency SET expires = ?, fingerprint = ?, status = ?, body = ? WHERE key = ?',
+            (expires, fingerprint, status, body, key),
+        )
+
+    def abandon(self, key):
+        self._connection().execute('DELETE FROM idempotency WHERE key = ? AND status IS NULL', (key,))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = import_string(settings.IDEMPOTENCY_STORE)()
+    return _store
+
+
+def reset_store():
+    global _store
+    _store = None
+
+
+def exempt(response):
+    """Marque une réponse à ne pas mémoriser : le client pourra rejouer sa clé."""
+    response.idempotency_exempt = True
+    return response
+
+
+def should_store(response):
+    # Les erreurs serveur, les refus temporaires et ceux de la salle d'attente
+    # (exempt()) se rejouent : ils ne disent rien de l'issue de la requête
+    if getattr(response, 'idempotency_exempt', False):
+        return False
+    return response.status_code < 500 and response.status_code != 429
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from tickets.timeseries import compact
+
+
+class Command(BaseCommand):
+    help = "Replie les tranches de ventes minute en heures et heure en jours, au-delà de leur rétention"
+
+    def handle(self, *args, **options):
+        compacted = compact()
+        self.stdout.write(self.style.SUCCESS(f"{compacted} tranche(s) compactée(s)"))
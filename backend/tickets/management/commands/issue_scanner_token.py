@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tickets.authentication import SCANNER_CLAIM
+from tickets.models import User
+
+
+class Command(BaseCommand):
+    help = "Émet un jeton d'accès de portique (claims-only) pour un compte admin"
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help="Email du compte admin du portique")
+        parser.add_argument('--hours', type=float, help="Durée de validité (défaut : SCANNER_TOKEN_LIFETIME)")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['email'], is_active=True)
+        except User.DoesNotExist:
+            raise CommandError("Utilisateur introuvable ou inactif")
+        if not user.is_staff:
+            raise CommandError("Seul un compte admin peut recevoir un jeton de portique")
+
+        lifetime = timedelta(hours=options['hours']) if options['hours'] else settings.SCANNER_TOKEN_LIFETIME
+        token = AccessToken.for_user(user)
+        token.set_exp(lifetime=lifetime)
+        token[SCANNER_CLAIM] = True
+        token['is_staff'] = True
+        self.stdout.write(str(token))
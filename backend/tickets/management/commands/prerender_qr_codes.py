@@ -0,0 +1,53 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+
+from tickets.models import Ticket
+from tickets.tasks import create_pool, prerender_qr
+
+
+class Command(BaseCommand):
+    help = "Pré-rend les QR codes de tous les tickets existants, par lots, sur tous les cœurs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--force', action='store_true', help="Re-rendre même les QR codes déjà stockés")
+
+    def handle(self, *args, **options):
+        if not settings.QR_CACHE_DIR:
+            raise CommandError("QR_CACHE_DIR n'est pas configuré")
+
+        batch_size = options['batch_size']
+        keys = (
+            Ticket.objects.exclude(final_key='')
+            .order_by('id')
+            .values_list('final_key', flat=True)
+            .iterator(chunk_size=batch_size)
+        )
+
+        def batches():
+            batch = []
+            for final_key in keys:
+                batch.append(final_key)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+        workers = max(options['workers'], 1)
+        total = 0
+        with create_pool(workers) as pool:
+            # Nombre de lots en vol borné : la mémoire reste constante
+            pending = set()
+            for batch in batches():
+                pending.add(pool.submit(prerender_qr, batch, options['force']))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    total += sum(future.result() for future in done)
+            total += sum(future.result() for future in pending)
+
+        self.stdout.write(self.style.SUCCESS(f"{total} QR code(s) rendu(s)"))
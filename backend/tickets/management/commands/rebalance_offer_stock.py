@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from tickets.models import TicketOffer
+from tickets.stock import provision, rebalance
+
+
+class Command(BaseCommand):
+    help = "Répartit à nouveau le stock restant des offres à capacité limitée entre leurs parts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--offer', type=int, help="Limiter à une offre")
+        parser.add_argument(
+            '--reprovision', action='store_true',
+            help="Recalculer le stock depuis la capacité et les tickets vendus",
+        )
+
+    def handle(self, *args, **options):
+        offers = TicketOffer.objects.filter(capacity__isnull=False)
+        if options['offer']:
+            offers = offers.filter(id=options['offer'])
+
+        for offer in offers:
+            remaining = provision(offer) if options['reprovision'] else rebalance(offer)
+            self.stdout.write(f"{offer.name} : {remaining} place(s) restante(s)")
+        self.stdout.write(self.style.SUCCESS("Stock réparti"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from tickets.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs de ventes (SalesRollup) depuis les tickets et affiche la dérive"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Afficher la dérive sans rien corriger")
+
+    def handle(self, *args, **options):
+        drift = rebuild_rollups(dry_run=options['check'])
+
+        for item in drift:
+            self.stdout.write(f"Offre {item['offer_id']}: stocké {item['stored']} / attendu {item['expected']}")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Aucune dérive"))
+        elif options['check']:
+            self.stdout.write(self.style.WARNING(f"{len(drift)} offre(s) en dérive"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(drift)} offre(s) corrigée(s)"))
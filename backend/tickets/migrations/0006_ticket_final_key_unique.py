@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0005_remove_ticket_qr_code'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ticket',
+            name='final_key',
+            field=models.CharField(editable=False, max_length=256, unique=True),
+        ),
+    ]
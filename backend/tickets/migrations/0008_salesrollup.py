@@ -0,0 +1,48 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_rollups(apps, schema_editor):
+    Ticket = apps.get_model('tickets', 'Ticket')
+    SalesRollup = apps.get_model('tickets', 'SalesRollup')
+    rows = Ticket.objects.values('offer_id').annotate(
+        sales_count=Count('id'),
+        revenue=Sum('offer__price'),
+        used_count=Count('id', filter=Q(is_used=True)),
+    )
+    SalesRollup.objects.bulk_create([
+        SalesRollup(
+            offer_id=row['offer_id'],
+            sales_count=row['sales_count'],
+            revenue=row['revenue'] or 0,
+            used_count=row['used_count'],
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0007_ticket_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('offer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sales_rollup', serialize=False, to='tickets.ticketoffer')),
+                ('sales_count', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('used_count', models.PositiveIntegerField(default=0)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='AdminStats',
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0008_salesrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Heure'), ('day', 'Jour')], max_length=6)),
+                ('bucket_start', models.DateTimeField()),
+                ('sales_count', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('offer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_buckets', to='tickets.ticketoffer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['granularity', 'bucket_start'], name='sales_bucket_range_idx')],
+                'constraints': [models.UniqueConstraint(fields=('offer', 'granularity', 'bucket_start'), name='sales_bucket_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0009_salesbucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticketoffer',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='OfferStockShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('remaining', models.PositiveIntegerField(default=0)),
+                ('offer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_shards', to='tickets.ticketoffer')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('offer', 'shard'), name='offer_stock_shard_unique')],
+            },
+        ),
+    ]
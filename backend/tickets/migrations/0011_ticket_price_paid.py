@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:05
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_price_paid(apps, schema_editor):
+    # Prix historique inconnu : les tickets existants prennent le prix courant de
+    # leur offre, celui déjà retenu par SalesRollup (0008)
+    Ticket = apps.get_model('tickets', 'Ticket')
+    TicketOffer = apps.get_model('tickets', 'TicketOffer')
+    Ticket.objects.update(
+        price_paid=Subquery(TicketOffer.objects.filter(pk=OuterRef('offer_id')).values('price')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0010_offer_capacity_stock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='price_paid',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(populate_price_paid, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='ticket',
+            name='price_paid',
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+    ]
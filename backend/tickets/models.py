@@ -1,11 +1,14 @@
-from django.db import models
+from collections import namedtuple
+from django.db import models, connections, router
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+import time
 import uuid
-import qrcode
-from io import BytesIO
-from django.core.files import File
+from django.conf import settings
+from django.utils import timezone
 from django.core.validators import MinLengthValidator
 from django.core.exceptions import ValidationError
+from .bloom import ticket_key_filter
+from .signing import sign_ticket_key, settings_secret
 
 
 class CustomUserManager(BaseUserManager):
@@ -71,6 +74,8 @@ class TicketOffer(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     available = models.BooleanField(default=True)
+    # Nombre maximal de tickets vendus (vide = illimité), réparti dans OfferStockShard
+    capacity = models.PositiveIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -78,38 +83,98 @@ class TicketOffer(models.Model):
         return f"{self.name} ({self.get_offer_type_display()})"
 
 
+CheckIn = namedtuple('CheckIn', ['ticket_id', 'user_id', 'first_name', 'last_name', 'offer_id', 'offer_name'])
+
+
+class TicketManager(models.Manager):
+    def check_in(self, ticket_id):
+        """Marque le ticket comme utilisé en un seul aller-retour.
+
+        UPDATE ... WHERE is_used = false RETURNING, avec les champs affichés
+        lus par sous-requêtes sur les clés primaires de user et offer.
+        Retourne un CheckIn, ou None si le ticket n'existe pas ou est déjà utilisé.
+        """
+        connection = connections[router.db_for_write(self.model)]
+        qn = connection.ops.quote_name
+        ticket = qn(self.model._meta.db_table)
+        user = qn(User._meta.db_table)
+        offer = qn(TicketOffer._meta.db_table)
+
+        sql = (
+            f"UPDATE {ticket} SET is_used = %s, updated_at = %s "
+            f"WHERE id = %s AND is_used = %s "
+            f"RETURNING id, user_id, "
+            f"(SELECT first_name FROM {user} WHERE {user}.id = {ticket}.user_id), "
+            f"(SELECT last_name FROM {user} WHERE {user}.id = {ticket}.user_id), "
+            f"offer_id, "
+            f"(SELECT name FROM {offer} WHERE {offer}.id = {ticket}.offer_id)"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [True, connection.ops.adapt_datetimefield_value(timezone.now()), ticket_id, False])
+            row = cursor.fetchone()
+        return CheckIn(*row) if row else None
+
+
+class OfferStockShard(models.Model):
+    """Une part du stock restant d'une offre.
+
+    Le stock est réparti sur plusieurs lignes pour que les achats simultanés
+    ne se sérialisent pas tous sur le même verrou (voir tickets.stock).
+    """
+    offer = models.ForeignKey(TicketOffer, on_delete=models.CASCADE, related_name='stock_shards')
+    shard = models.PositiveSmallIntegerField()
+    remaining = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['offer', 'shard'], name='offer_stock_shard_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.offer.name} #{self.shard}: {self.remaining}"
+
+
 class Ticket(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     offer = models.ForeignKey(TicketOffer, on_delete=models.PROTECT)
     purchase_key = models.UUIDField(default=uuid.uuid4, editable=False)
-    final_key = models.CharField(max_length=256, editable=False)
+    final_key = models.CharField(max_length=256, editable=False, unique=True)
     #qr_code = models.ImageField(upload_to='qr_codes/', blank=True)
     purchase_date = models.DateTimeField(auto_now_add=True)
     is_used = models.BooleanField(default=False)
+    # Prix de l'offre au moment de l'achat : base du chiffre d'affaires (SalesRollup)
+    price_paid = models.DecimalField(max_digits=10, decimal_places=2)
+    # Date de dernière modification : sert de curseur à la synchronisation des portiques
+    updated_at = models.DateTimeField(auto_now=True)
 
-    def save(self, *args, **kwargs):
-        if not self.final_key:
-            self.final_key = f"{self.user.account_key}{self.purchase_key}"[:256]
-
-        '''# Old Génération du QR code
-        if not self.qr_code:
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(self.final_key)
-            qr.make(fit=True)
+    objects = TicketManager()
 
-            img = qr.make_image(fill_color="black", back_color="white")
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='ticket_updated_at_id_idx'),
+        ]
+
+    def build_final_key(self):
+        if settings.TICKET_KEY_FORMAT == 'signed':
+            # Clé compacte signée, vérifiable hors ligne (voir tickets.signing)
+            now = time.time()
+            return sign_ticket_key(
+                settings_secret(),
+                self.purchase_key,
+                self.offer_id,
+                now,
+                now + settings.TICKET_SIGNED_KEY_VALIDITY.total_seconds(),
+            )
+        return f"{self.user.account_key}{self.purchase_key}"[:256]
 
-            buffer = BytesIO()
-            img.save(buffer, format="PNG")
-            filename = f"ticket_{self.user.username}_{self.purchase_key}.png"
-            self.qr_code.save(filename, File(buffer), save=False)'''
+    def save(self, *args, **kwargs):
+        if not self.final_key:
+            self.final_key = self.build_final_key()
+        if self.price_paid is None:
+            self.price_paid = self.offer.price
 
         super().save(*args, **kwargs)
+        ticket_key_filter.add(self.final_key)
 
     def get_qr_code_url(self):
         return f"/api/tickets/{self.id}/qr-code/"
@@ -118,15 +183,55 @@ class Ticket(models.Model):
         return f"Ticket {self.id} - {self.user.username}"
 
 
-class AdminStats(models.Model):
-    offer = models.OneToOneField(TicketOffer, on_delete=models.CASCADE, primary_key=True)
+class SalesRollup(models.Model):
+    """Compteurs de ventes d'une offre, tenus à jour à l'achat et à la validation.
+
+    Les statistiques admin se lisent ici plutôt que par agrégation sur Ticket ;
+    la commande rebuild_sales_rollups les recalcule pour vérifier la dérive.
+    """
+    offer = models.OneToOneField(TicketOffer, on_delete=models.CASCADE, primary_key=True, related_name='sales_rollup')
     sales_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    used_count = models.PositiveIntegerField(default=0)
     last_updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Stats for {self.offer.name}: {self.sales_count} sales"
 
 
+class SalesBucket(models.Model):
+    """Ventes agrégées par tranche de temps, pour les courbes de vitesse de vente.
+
+    Les achats alimentent les tranches à la minute ; la commande
+    compact_sales_buckets les replie ensuite en heures puis en jours.
+    """
+    MINUTE = 'minute'
+    HOUR = 'hour'
+    DAY = 'day'
+    GRANULARITIES = [
+        (MINUTE, 'Minute'),
+        (HOUR, 'Heure'),
+        (DAY, 'Jour'),
+    ]
+
+    offer = models.ForeignKey(TicketOffer, on_delete=models.CASCADE, related_name='sales_buckets')
+    granularity = models.CharField(max_length=6, choices=GRANULARITIES)
+    bucket_start = models.DateTimeField()
+    sales_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['offer', 'granularity', 'bucket_start'], name='sales_bucket_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['granularity', 'bucket_start'], name='sales_bucket_range_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.offer.name} {self.granularity} {self.bucket_start:%Y-%m-%d %H:%M}: {self.sales_count} sales"
+
+
 def validate_password_complexity(value):
     if len(value) < 8:
         raise ValidationError("Le mot de passe doit contenir au moins 8 caractères.")
@@ -0,0 +1,82 @@
+"""Achat de tickets : une transaction, une lecture des offres, une insertion groupée.
+
+Les clés sont générées en Python avant l'insertion (Ticket.build_final_key),
+ce qui permet un seul bulk_create pour tous les tickets d'une commande ; les
+compteurs de ventes sont incrémentés une fois par offre.
+"""
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .bloom import ticket_key_filter
+from .models import Ticket, TicketOffer
+from .rollups import record_sales
+from .stock import reserve
+from .tasks import queue_qr_render
+from .timeseries import record_sales_bucket
+from .wallet import invalidate_wallets
+
+
+class InvalidPurchase(ValueError):
+    pass
+
+
+class OfferNotFound(LookupError):
+    pass
+
+
+def parse_items(data):
+    """[{offer_id, quantity}] -> OrderedDict {offer_id: quantity}, lignes d'une même offre cumulées."""
+    if not isinstance(data, list) or not data:
+        raise InvalidPurchase("Liste d'articles [{offer_id, quantity}] attendue")
+
+    items = OrderedDict()
+    for item in data:
+        try:
+            offer_id = int(item['offer_id'])
+            quantity = int(item.get('quantity', 1))
+        except (TypeError, KeyError, ValueError, AttributeError):
+            raise InvalidPurchase("Article invalide")
+        if quantity < 1:
+            raise InvalidPurchase("Quantité invalide")
+        items[offer_id] = items.get(offer_id, 0) + quantity
+
+    if sum(items.values()) > settings.PURCHASE_BATCH_MAX_TICKETS:
+        raise InvalidPurchase(f"{settings.PURCHASE_BATCH_MAX_TICKETS} tickets maximum par commande")
+    return items
+
+
+def purchase_tickets(user, items):
+    """Achète les tickets demandés ({offer_id: quantity}) et retourne la liste des Ticket créés.
+
+    Lève OfferNotFound si une offre n'existe pas ou n'est plus disponible, et
+    stock.SoldOut si une offre à capacité limitée n'a plus assez de places :
+    dans les deux cas rien n'est acheté.
+    """
+    offers = TicketOffer.objects.filter(available=True).in_bulk(list(items))
+    if len(offers) != len(items):
+        raise OfferNotFound("Offre introuvable")
+
+    now = timezone.now()
+    tickets = []
+    for offer_id, quantity in items.items():
+        for _ in range(quantity):
+            ticket = Ticket(user=user, offer=offers[offer_id], price_paid=offers[offer_id].price)
+            ticket.final_key = ticket.build_final_key()
+            tickets.append(ticket)
+
+    with transaction.atomic():
+        for offer_id, quantity in items.items():
+            reserve(offers[offer_id], quantity)
+        Ticket.objects.bulk_create(tickets)
+        for offer_id, quantity in items.items():
+            record_sales(offers[offer_id], quantity)
+            record_sales_bucket(offers[offer_id], quantity, at=now)
+        invalidate_wallets([user.id])
+
+    for ticket in tickets:
+        ticket_key_filter.add(ticket.final_key)
+        queue_qr_render(ticket.id, ticket.final_key)
+    return tickets
@@ -0,0 +1,250 @@
+"""Rendu et cache des QR codes de tickets.
+
+La final_key d'un ticket ne change jamais après l'achat : l'image générée
+est donc mise en cache sur deux niveaux, un LRU en mémoire (par processus)
+et un stockage disque partagé entre les workers, indexés par la clé.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import qrcode
+from django.conf import settings
+from django.utils.http import parse_etags
+from rest_framework.utils.mediatypes import media_type_matches, order_by_precedence
+
+logger = logging.getLogger(__name__)
+
+QR_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+QR_BORDER = 4
+
+
+class LRUCache:
+    """Cache LRU borné et thread-safe."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return None
+            return self._data[key]
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+memory_cache = LRUCache(getattr(settings, 'QR_CACHE_MAX_ENTRIES', 2048))
+
+
+def _digest(final_key, fmt):
+    return hashlib.sha256(f"{fmt}:{final_key}".encode()).hexdigest()
+
+
+def qr_etag(final_key, fmt='png'):
+    """ETag fort : l'image ne dépend que de la clé et du format."""
+    return f'"{_digest(final_key, fmt)[:32]}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Comparaison faible d'un en-tête If-None-Match avec l'ETag courant."""
+    if not if_none_match:
+        return False
+    candidates = parse_etags(if_none_match)
+    if '*' in candidates:
+        return True
+    return any(candidate.removeprefix('W/') == etag for candidate in candidates)
+
+
+def _make_qr(final_key):
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=QR_BORDER,
+    )
+    qr.add_data(final_key)
+    qr.make(fit=True)
+    return qr
+
+
+def build_matrix(final_key):
+    """Matrice des modules (sans la marge), ligne par ligne."""
+    return _make_qr(final_key).modules
+
+
+def render_qr_png(final_key):
+    img = _make_qr(final_key).make_image(fill_color="black", back_color="white")
+
+    buffer = BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def render_qr_svg(final_key):
+    """SVG construit directement depuis la matrice, sans passer par Pillow."""
+    matrix = build_matrix(final_key)
+    size = len(matrix) + 2 * QR_BORDER
+    path = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < len(row):
+            if not row[x]:
+                x += 1
+                continue
+            # Une seule commande par suite de modules noirs consécutifs
+            start = x
+            while x < len(row) and row[x]:
+                x += 1
+            path.append(f"M{start + QR_BORDER} {y + QR_BORDER}h{x - start}v1h-{x - start}z")
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path d="{"".join(path)}" fill="#000"/>'
+        '</svg>'
+    ).encode()
+
+
+def pack_matrix(matrix):
+    """Compacte la matrice en bits (ligne par ligne, bit de poids fort en premier)."""
+    bits = bytearray((len(matrix) * len(matrix) + 7) // 8)
+    i = 0
+    for row in matrix:
+        for dark in row:
+            if dark:
+                bits[i >> 3] |= 0x80 >> (i & 7)
+            i += 1
+    return bytes(bits)
+
+
+def render_qr_matrix(final_key):
+    """Matrice compacte en base64, que le client dessine lui-même."""
+    matrix = build_matrix(final_key)
+    return json.dumps({
+        'size': len(matrix),
+        'border': QR_BORDER,
+        'data': base64.b64encode(pack_matrix(matrix)).decode(),
+    }, separators=(',', ':')).encode()
+
+
+RENDERERS = {
+    'png': render_qr_png,
+    'svg': render_qr_svg,
+    'matrix': render_qr_matrix,
+}
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'matrix': 'application/json',
+}
+
+
+def negotiate_format(requested, accept):
+    """Format demandé (?format=) ou tiré de l'en-tête Accept, PNG par défaut ; None si aucun ne convient.
+
+    Reprend DefaultContentNegotiation.select_renderer de DRF, pour la vue asynchrone :
+    les media types les plus spécifiques de l'en-tête l'emportent, puis l'ordre
+    des renderers de views.ticket_qr_code (celui de CONTENT_TYPES).
+    """
+    if requested:
+        return requested if requested in RENDERERS else None
+    accepts = [token.strip() for token in (accept or '*/*').split(',')]
+    for media_type_set in order_by_precedence(accepts):
+        for fmt, content_type in CONTENT_TYPES.items():
+            if any(media_type_matches(content_type, media_type) for media_type in media_type_set):
+                return fmt
+    return None
+
+
+def _disk_path(final_key, fmt):
+    cache_dir = getattr(settings, 'QR_CACHE_DIR', None)
+    if not cache_dir:
+        return None
+    digest = _digest(final_key, fmt)
+    return os.path.join(cache_dir, digest[:2], f"{digest}.{fmt}")
+
+
+def read_from_disk(final_key, fmt='png'):
+    path = _disk_path(final_key, fmt)
+    if path is None:
+        return None
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def write_to_disk(final_key, content, fmt='png'):
+    path = _disk_path(final_key, fmt)
+    if path is None:
+        return
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # Écriture atomique : un autre worker ne lit jamais un fichier partiel
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def cached_qr_image(final_key, fmt='png'):
+    """QR code déjà rendu (mémoire puis disque), ou None."""
+    cache_key = (fmt, final_key)
+    content = memory_cache.get(cache_key)
+    if content is None:
+        content = read_from_disk(final_key, fmt)
+        if content is not None:
+            memory_cache.set(cache_key, content)
+    return content
+
+
+def store_qr_image(final_key, content, fmt='png'):
+    try:
+        write_to_disk(final_key, content, fmt)
+    except OSError as e:
+        logger.warning("Écriture du cache QR impossible: %s", e)
+    memory_cache.set((fmt, final_key), content)
+
+
+def get_qr_image(final_key, fmt='png'):
+    """Retourne le QR code au format demandé : mémoire, puis disque, puis rendu."""
+    content = cached_qr_image(final_key, fmt)
+    if content is None:
+        content = RENDERERS[fmt](final_key)
+        store_qr_image(final_key, content, fmt)
+    return content
+
+
+def data_uri(content, fmt):
+    return f"data:{CONTENT_TYPES[fmt]};base64,{base64.b64encode(content).decode()}"
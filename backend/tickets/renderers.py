@@ -0,0 +1,32 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class QRCodeRenderer(BaseRenderer):
+    """Renvoie tel quel le contenu déjà rendu du QR code.
+
+    Sert à la négociation de contenu (Accept / ?format=) de ticket_qr_code ;
+    les réponses d'erreur DRF sont encodées en JSON.
+    """
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, bytes):
+            return data
+        return json.dumps(data).encode()
+
+
+class QRCodePNGRenderer(QRCodeRenderer):
+    media_type = 'image/png'
+    format = 'png'
+
+
+class QRCodeSVGRenderer(QRCodeRenderer):
+    media_type = 'image/svg+xml'
+    format = 'svg'
+
+
+class QRCodeMatrixRenderer(QRCodeRenderer):
+    media_type = 'application/json'
+    format = 'matrix'
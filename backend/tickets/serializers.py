@@ -1,5 +1,11 @@
 from rest_framework import serializers
-from .models import User, TicketOffer, Ticket, AdminStats
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .models import User, TicketOffer, Ticket
+from .denylist import get_denylist
+from .writebehind import last_logins
 from django.contrib.auth.password_validation import validate_password
 
 
@@ -20,13 +26,17 @@ class UserSerializer(serializers.ModelSerializer):
         }
 
     def create(self, validated_data):
-        user = User.objects.create(
+        user = User(
             username=validated_data['username'],
             email=validated_data['email'],
             first_name=validated_data['first_name'],
             last_name=validated_data['last_name']
         )
-        user.set_password(validated_data['password'])
+        # password_hash : déjà haché dans le pool (voir tickets.async_views)
+        if validated_data.get('password_hash'):
+            user.password = validated_data['password_hash']
+        else:
+            user.set_password(validated_data['password'])
         user.save()
         return user
 
@@ -86,9 +96,44 @@ class TicketSerializer(serializers.ModelSerializer):
         return ticket
 
 
-class AdminStatsSerializer(serializers.ModelSerializer):
-    offer = TicketOfferSerializer(read_only=True)
+class DenylistTokenRefreshSerializer(TokenRefreshSerializer):
+    """Rafraîchissement avec rotation : le refresh token présenté est consommé (voir tickets.denylist).
+
+    Remplace la rotation de simplejwt, qui passe par les modèles de
+    token_blacklist (outstand()) et échoue sans cette application.
+    """
+
+    def validate(self, attrs):
+        try:
+            refresh = RefreshToken(attrs['refresh'])
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+
+        jti = refresh[jwt_settings.JTI_CLAIM]
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            if not get_denylist().consume(jti, refresh['exp']):
+                raise InvalidToken("Jeton de rafraîchissement déjà utilisé")
+        elif jti in get_denylist():
+            raise InvalidToken("Jeton de rafraîchissement révoqué")
+
+        user_id = refresh.payload.get(jwt_settings.USER_ID_CLAIM)
+        user = User.objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).first()
+        if not jwt_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        data = {'access': str(refresh.access_token)}
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return data
 
-    class Meta:
-        model = AdminStats
-        fields = ['offer', 'sales_count', 'last_updated']
\ No newline at end of file
+
+class BufferedLastLoginTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """last_login différé (voir tickets.writebehind.LastLoginBuffer) au lieu d'un UPDATE par connexion"""
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        last_logins.record(self.user)
+        return data
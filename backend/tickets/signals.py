@@ -0,0 +1,26 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.settings import api_settings
+
+from .authentication import invalidate_user
+from .catalog import invalidate_catalog
+from .models import Ticket, TicketOffer, User
+from .wallet import invalidate_wallets
+
+
+@receiver(post_save, sender=TicketOffer)
+@receiver(post_delete, sender=TicketOffer)
+def offer_changed(sender, **kwargs):
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+def ticket_changed(sender, instance, **kwargs):
+    invalidate_wallets([instance.user_id])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    invalidate_user(getattr(instance, api_settings.USER_ID_FIELD))
@@ -0,0 +1,93 @@
+"""Clés de ticket signées (HMAC), vérifiables hors ligne par les portiques.
+
+Alternative compacte à ``f"{account_key}{purchase_key}"`` : la clé porte
+elle-même de quoi prouver son authenticité, sans requête au serveur.
+
+Format binaire (big-endian) ::
+
+    version      1 octet
+    purchase_key 16 octets   UUID d'achat du ticket
+    offer_id     4 octets
+    not_before   4 octets    secondes epoch
+    not_after    4 octets    secondes epoch
+    mac          10 octets   HMAC-SHA256 tronqué des champs précédents
+
+encodé en base32 sans padding : 63 caractères de l'alphabet alphanumérique
+des QR codes, donc une version de QR plus basse que la clé historique.
+
+Ce module ne dépend pas de Django : il peut être embarqué tel quel dans le
+client d'un portique, avec le secret partagé (TICKET_SIGNING_KEY).
+"""
+import base64
+import hashlib
+import hmac
+import struct
+import time
+import uuid
+from collections import namedtuple
+
+KEY_VERSION = 1
+MAC_SIZE = 10
+
+_PAYLOAD = struct.Struct('>B16sIII')
+_RAW_SIZE = _PAYLOAD.size + MAC_SIZE
+SIGNED_KEY_LENGTH = len(base64.b32encode(bytes(_RAW_SIZE)).rstrip(b'='))
+
+_BASE32_ALPHABET = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZ234567')
+
+SignedTicket = namedtuple('SignedTicket', ['purchase_key', 'offer_id', 'not_before', 'not_after'])
+
+
+class InvalidTicketKey(ValueError):
+    pass
+
+
+def _mac(secret, payload):
+    return hmac.new(secret, payload, hashlib.sha256).digest()[:MAC_SIZE]
+
+
+def sign_ticket_key(secret, purchase_key, offer_id, not_before, not_after):
+    payload = _PAYLOAD.pack(KEY_VERSION, purchase_key.bytes, offer_id, int(not_before), int(not_after))
+    return base64.b32encode(payload + _mac(secret, payload)).rstrip(b'=').decode()
+
+
+def settings_secret():
+    """Secret de signature configuré côté serveur (TICKET_SIGNING_KEY).
+
+    Lève ImproperlyConfigured s'il manque ou s'il reprend SECRET_KEY.
+    """
+    from django.conf import settings
+    from django.core.exceptions import ImproperlyConfigured
+
+    if not settings.TICKET_SIGNING_KEY or settings.TICKET_SIGNING_KEY == settings.SECRET_KEY:
+        raise ImproperlyConfigured("TICKET_SIGNING_KEY doit être définie et distincte de SECRET_KEY")
+    return settings.TICKET_SIGNING_KEY.encode()
+
+
+def is_signed_key(key):
+    return len(key) == SIGNED_KEY_LENGTH and set(key) <= _BASE32_ALPHABET
+
+
+def verify_ticket_key(secret, key, now=None):
+    """Vérifie la signature et la fenêtre de validité d'une clé signée.
+
+    Retourne un SignedTicket, ou lève InvalidTicketKey.
+    """
+    if not is_signed_key(key):
+        raise InvalidTicketKey("Format de clé invalide")
+
+    padding = '=' * (-len(key) % 8)
+    raw = base64.b32decode(key + padding)
+    payload, mac = raw[:_PAYLOAD.size], raw[_PAYLOAD.size:]
+    if not hmac.compare_digest(mac, _mac(secret, payload)):
+        raise InvalidTicketKey("Signature invalide")
+
+    version, purchase_key, offer_id, not_before, not_after = _PAYLOAD.unpack(payload)
+    if version != KEY_VERSION:
+        raise InvalidTicketKey("Version de clé non supportée")
+
+    now = time.time() if now is None else now
+    if not not_before <= now <= not_after:
+        raise InvalidTicketKey("Ticket hors de sa période de validité")
+
+    return SignedTicket(uuid.UUID(bytes=purchase_key), offer_id, not_before, not_after)
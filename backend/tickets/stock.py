@@ -0,0 +1,118 @@
+"""Stock des offres à capacité limitée, réparti sur plusieurs lignes.
+
+Une ligne de stock unique verrouillée à chaque achat sérialiserait tous les
+acheteurs d'une mise en vente. Le stock restant est donc découpé en
+OFFER_STOCK_SHARDS parts (OfferStockShard) : un achat décrémente une part
+tirée au hasard par un UPDATE conditionnel (``remaining >= quantité``), qui
+ne peut jamais passer sous zéro. La survente est donc impossible, et deux
+achats simultanés ne se bloquent que s'ils tombent sur la même part.
+
+Quand les parts tirées sont vides alors qu'il reste du stock ailleurs, le
+chemin lent verrouille toutes les parts de l'offre, prélève et rééquilibre.
+"""
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import OfferStockShard, Ticket
+
+
+class SoldOut(Exception):
+    pass
+
+
+def shard_count():
+    return max(1, getattr(settings, 'OFFER_STOCK_SHARDS', 8))
+
+
+def _split(total, shards):
+    base, extra = divmod(total, shards)
+    return [base + (1 if i < extra else 0) for i in range(shards)]
+
+
+def _write_shards(offer, total, shards=None):
+    if shards and len(shards) == shard_count():
+        # Parts déjà verrouillées par l'appelant : mise à jour sur place
+        for shard, remaining in zip(shards, _split(total, len(shards))):
+            shard.remaining = remaining
+        OfferStockShard.objects.bulk_update(shards, ['remaining'])
+        return
+    OfferStockShard.objects.filter(offer=offer).delete()
+    OfferStockShard.objects.bulk_create([
+        OfferStockShard(offer=offer, shard=i, remaining=remaining)
+        for i, remaining in enumerate(_split(total, shard_count()))
+    ])
+
+
+def provision(offer):
+    """(Re)crée les parts de stock d'après offer.capacity et les tickets déjà vendus.
+
+    À appeler après chaque modification de la capacité. Les parts existantes
+    sont verrouillées avant le comptage : un achat en cours termine (et son
+    ticket est compté) avant que le stock soit réécrit.
+    """
+    with transaction.atomic():
+        list(OfferStockShard.objects.filter(offer=offer).select_for_update())
+        if offer.capacity is None:
+            OfferStockShard.objects.filter(offer=offer).delete()
+            return None
+        remaining = max(offer.capacity - Ticket.objects.filter(offer=offer).count(), 0)
+        _write_shards(offer, remaining)
+        return remaining
+
+
+def rebalance(offer):
+    """Répartit à nouveau le stock restant à parts égales. Retourne le stock restant."""
+    with transaction.atomic():
+        shards = list(OfferStockShard.objects.filter(offer=offer).order_by('shard').select_for_update())
+        remaining = sum(shard.remaining for shard in shards)
+        if len(shards) != shard_count() or [s.remaining for s in shards] != _split(remaining, len(shards)):
+            _write_shards(offer, remaining, shards)
+        return remaining
+
+
+def remaining_stock(offer):
+    if offer.capacity is None:
+        return None
+    return OfferStockShard.objects.filter(offer=offer).aggregate(total=Sum('remaining'))['total'] or 0
+
+
+def _take_from_shard(offer, shard, quantity):
+    return OfferStockShard.objects.filter(
+        offer=offer, shard=shard, remaining__gte=quantity,
+    ).update(remaining=F('remaining') - quantity)
+
+
+def _take_locked(offer, quantity):
+    """Chemin lent : toutes les parts verrouillées, prélèvement puis rééquilibrage."""
+    shards = list(OfferStockShard.objects.filter(offer=offer).order_by('shard').select_for_update())
+    if not shards and offer.capacity is not None:
+        # Capacité posée sans provisionnement (admin Django, migration...)
+        provision(offer)
+        shards = list(OfferStockShard.objects.filter(offer=offer).order_by('shard').select_for_update())
+
+    remaining = sum(shard.remaining for shard in shards)
+    if remaining < quantity:
+        raise SoldOut("Offre épuisée")
+    _write_shards(offer, remaining - quantity, shards)
+
+
+def reserve(offer, quantity=1):
+    """Prélève quantity places, ou lève SoldOut. À appeler dans la transaction de l'achat.
+
+    Sans capacité (offer.capacity vide), ne fait rien.
+    """
+    if offer.capacity is None:
+        return
+
+    shards = list(range(shard_count()))
+    random.shuffle(shards)
+    # Deux essais suffisent tant que le stock est bien réparti ; au-delà,
+    # les parts sont probablement presque vides et on passe au chemin lent
+    for shard in shards[:2]:
+        if _take_from_shard(offer, shard, quantity):
+            return
+    with transaction.atomic():
+        _take_locked(offer, quantity)
@@ -0,0 +1,66 @@
+"""Encodage de l'état des tickets pour la synchronisation des portiques.
+
+Un portique précharge un instantané (empreinte de clé + drapeau « utilisé »)
+puis ne récupère que les deltas, repérés par un curseur (updated_at, id).
+
+Le curseur ne dépasse jamais un « filigrane » fixé à
+GATE_SYNC_SETTLE_SECONDS dans le passé : une transaction encore en cours
+peut committer une ligne avec un updated_at antérieur au dernier vu, elle
+sera donc relue au delta suivant. Les deltas sont idempotents côté portique.
+"""
+import hashlib
+import json
+import struct
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+DIGEST_SIZE = 16
+FLAG_USED = 0x01
+
+# Enregistrement binaire : empreinte de la clé puis un octet de drapeaux
+RECORD = struct.Struct(f'>{DIGEST_SIZE}sB')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def key_digest(final_key):
+    """Empreinte de taille fixe de la clé, calculée de la même façon par le portique."""
+    return hashlib.blake2b(final_key.encode(), digest_size=DIGEST_SIZE).digest()
+
+
+def encode_cursor(updated_at, ticket_id):
+    micros = int(updated_at.timestamp() * 1_000_000)
+    return f"{micros}-{ticket_id}"
+
+
+def decode_cursor(cursor):
+    try:
+        micros, ticket_id = cursor.split('-')
+        updated_at = datetime.fromtimestamp(int(micros) / 1_000_000, tz=dt_timezone.utc)
+        return updated_at, int(ticket_id)
+    except (AttributeError, ValueError, OverflowError, OSError):
+        raise InvalidCursor("Curseur invalide")
+
+
+def settled_watermark():
+    return timezone.now() - timedelta(seconds=settings.GATE_SYNC_SETTLE_SECONDS)
+
+
+def iter_ndjson(rows):
+    for final_key, is_used in rows:
+        yield json.dumps({'k': key_digest(final_key).hex(), 'u': int(is_used)}) + '\n'
+
+
+def iter_binary(rows, batch_size=1024):
+    buffer = bytearray()
+    for i, (final_key, is_used) in enumerate(rows, 1):
+        buffer += RECORD.pack(key_digest(final_key), FLAG_USED if is_used else 0)
+        if i % batch_size == 0:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
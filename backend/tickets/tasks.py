@@ -0,0 +1,177 @@
+"""Pré-rendu des QR codes hors du chemin de la requête.
+
+Les rendus sont confiés à un pool de processus si QR_RENDER_WORKERS le
+demande : le worker n'a besoin que de la final_key, il ne touche jamais à la
+base de données et dépose le PNG dans le cache disque partagé (voir
+``tickets.qr``). Sinon, un pool de QR_RENDER_THREADS threads du worker prend
+le relais : le rendu reste hors du chemin de la requête, sans processus
+supplémentaire.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_thread_executor = None
+_executor_lock = threading.Lock()
+
+
+def init_worker(qr_cache_dir):
+    """Initialise Django dans un processus du pool."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    django.setup()
+    settings.QR_CACHE_DIR = qr_cache_dir
+
+
+def prerender_qr(final_keys, force=False):
+    """Rend et stocke les QR codes manquants, dans tous les formats.
+
+    Retourne le nombre de tickets pour lesquels au moins un rendu a été fait.
+    """
+    from . import qr
+
+    rendered = 0
+    for final_key in final_keys:
+        missing = [
+            fmt for fmt in qr.RENDERERS
+            if force or qr.read_from_disk(final_key, fmt) is None
+        ]
+        for fmt in missing:
+            qr.write_to_disk(final_key, qr.RENDERERS[fmt](final_key), fmt)
+        if missing:
+            rendered += 1
+    return rendered
+
+
+def render_qr(final_key, fmt):
+    """Rendu d'un QR code dans un processus du pool ; le parent le met en cache."""
+    from . import qr
+
+    return qr.RENDERERS[fmt](final_key)
+
+
+def get_qr_images(final_keys, fmt):
+    """{final_key: QR code} pour plusieurs tickets.
+
+    Les QR déjà en cache sont lus directement ; les manquants sont rendus en
+    parallèle dans le pool de rendu (processus ou threads), sinon sur place.
+    """
+    from . import qr
+
+    images = {final_key: qr.cached_qr_image(final_key, fmt) for final_key in final_keys}
+    missing = [final_key for final_key, content in images.items() if content is None]
+
+    executor = get_executor() if len(missing) > 1 else None
+    futures = {}
+    if executor is not None:
+        try:
+            futures = {final_key: executor.submit(render_qr, final_key, fmt) for final_key in missing}
+        except RuntimeError as e:
+            logger.warning("Pool de rendu QR indisponible: %s", e)
+
+    for final_key in missing:
+        try:
+            content = futures[final_key].result(timeout=settings.QR_RENDER_TIMEOUT) if final_key in futures else None
+        except Exception as e:
+            logger.warning("Rendu QR en pool échoué, rendu sur place: %s", e)
+            content = None
+        if content is None:
+            content = qr.RENDERERS[fmt](final_key)
+        qr.store_qr_image(final_key, content, fmt)
+        images[final_key] = content
+    return images
+
+
+async def aget_qr_image(final_key, fmt):
+    """qr.get_qr_image pour les vues asynchrones : ni lecture disque ni rendu dans la boucle d'événements.
+
+    Le rendu part dans le pool de rendu s'il existe, sinon dans un thread.
+    """
+    from . import qr
+
+    content = await sync_to_async(qr.cached_qr_image, thread_sensitive=False)(final_key, fmt)
+    if content is not None:
+        return content
+
+    executor = get_executor()
+    if executor is not None:
+        try:
+            future = asyncio.wrap_future(executor.submit(render_qr, final_key, fmt))
+            content = await asyncio.wait_for(future, settings.QR_RENDER_TIMEOUT)
+        except Exception as e:
+            logger.warning("Rendu QR en pool échoué, rendu dans un thread: %s", e)
+    if content is None:
+        content = await sync_to_async(qr.RENDERERS[fmt], thread_sensitive=False)(final_key)
+    await sync_to_async(qr.store_qr_image, thread_sensitive=False)(final_key, content, fmt)
+    return content
+
+
+def create_pool(max_workers):
+    # spawn plutôt que fork : les workers gunicorn peuvent avoir des threads actifs
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_worker,
+        initargs=(settings.QR_CACHE_DIR,),
+    )
+
+
+def get_executor():
+    """Pool de rendu : processus si QR_RENDER_WORKERS > 0, sinon threads du worker.
+
+    Retourne None si aucun pool n'est configuré ou sans cache disque où
+    déposer les pré-rendus.
+    """
+    global _executor, _thread_executor
+    if not settings.QR_CACHE_DIR:
+        return None
+    workers = getattr(settings, 'QR_RENDER_WORKERS', 0)
+    threads = getattr(settings, 'QR_RENDER_THREADS', 0)
+    with _executor_lock:
+        if workers > 0:
+            if _executor is None:
+                _executor = create_pool(workers)
+            return _executor
+        if threads > 0:
+            if _thread_executor is None:
+                _thread_executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='qr-render')
+            return _thread_executor
+        return None
+
+
+def _log_failure(ticket_id):
+    def callback(future):
+        if future.exception() is not None:
+            logger.error("Pré-rendu du QR code du ticket %s échoué: %s", ticket_id, future.exception())
+    return callback
+
+
+def queue_qr_render(ticket_id, final_key):
+    """Planifie le rendu du QR code d'un ticket après le commit de l'achat.
+
+    Sans pool de rendu (QR_RENDER_WORKERS et QR_RENDER_THREADS à 0), le rendu
+    se fera à la demande lors du premier GET.
+    """
+    executor = get_executor()
+    if executor is None:
+        return
+
+    def submit():
+        try:
+            future = executor.submit(prerender_qr, [final_key])
+        except RuntimeError as e:
+            logger.warning("Pool de rendu QR indisponible: %s", e)
+            return
+        future.add_done_callback(_log_failure(ticket_id))
+
+    transaction.on_commit(submit)
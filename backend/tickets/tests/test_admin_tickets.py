@@ -0,0 +1,55 @@
+import csv
+import json
+from io import StringIO
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from tickets.models import Ticket, TicketOffer
+
+User = get_user_model()
+
+
+@override_settings(ADMIN_TICKETS_PAGE_SIZE=2)
+class AdminTicketsTest(TestCase):
+    url = '/api/admin/tickets/'
+
+    def setUp(self):
+        admin = User.objects.create_user(email='admin@example.com', password='testpass123', is_staff=True)
+        user = User.objects.create_user(email='user@example.com', password='testpass123')
+        self.offer = TicketOffer.objects.create(name="Test Offer", price=100.00, offer_type="SOLO")
+        other_offer = TicketOffer.objects.create(name="Other Offer", price=50.00, offer_type="DUO")
+        self.tickets = [Ticket.objects.create(user=user, offer=self.offer) for _ in range(3)]
+        self.other = Ticket.objects.create(user=user, offer=other_offer, is_used=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def test_cursor_pagination(self):
+        first = self.client.get(self.url).data
+        self.assertEqual([t['ticket_id'] for t in first['tickets']], [t.id for t in self.tickets[:2]])
+        self.assertEqual(first['tickets'][0]['qr_code_url'], self.tickets[0].get_qr_code_url())
+
+        second = self.client.get(self.url, {'cursor': first['next_cursor']}).data
+        self.assertEqual([t['ticket_id'] for t in second['tickets']], [self.tickets[2].id, self.other.id])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_filters(self):
+        data = self.client.get(self.url, {'is_used': 'true', 'limit': 10}).data
+        self.assertEqual([t['ticket_id'] for t in data['tickets']], [self.other.id])
+        data = self.client.get(self.url, {'offer': self.offer.id, 'limit': 10}).data
+        self.assertEqual(len(data['tickets']), 3)
+        response = self.client.get(self.url, {'purchased_after': 'hier'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_ndjson_export(self):
+        response = self.client.get(self.url, {'export': 'ndjson', 'offer': self.offer.id})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['ticket_id'] for line in lines], [t.id for t in self.tickets])
+
+    def test_csv_export(self):
+        response = self.client.get(self.url, {'export': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][0], 'ticket_id')
+        self.assertEqual(len(rows), 5)
@@ -0,0 +1,139 @@
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, Client, TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tickets import idempotency, qr
+from tickets.bloom import ticket_key_filter
+from tickets.models import Ticket, TicketOffer
+
+User = get_user_model()
+
+
+@override_settings(
+    ROOT_URLCONF='config.asgi_urls',
+    IDEMPOTENCY_STORE='tickets.idempotency.MemoryStore',
+    QR_RENDER_WORKERS=0,
+)
+class AsyncScanViewsTest(TestCase):
+    def setUp(self):
+        idempotency.reset_store()
+        self.addCleanup(idempotency.reset_store)
+        self.admin = User.objects.create_user(email='admin@example.com', password='testpass123', is_staff=True)
+        self.user = User.objects.create_user(
+            email='user@example.com', password='testpass123', first_name='Jean', last_name='Dupont'
+        )
+        offer = TicketOffer.objects.create(name="Test Offer", price=100.00, offer_type="SOLO")
+        ticket_key_filter.rebuild()
+        self.ticket = Ticket.objects.create(user=self.user, offer=offer)
+        self.client = Client(headers={'Authorization': f'Bearer {AccessToken.for_user(self.admin)}'})
+
+    def verify(self, final_key, client=None):
+        return (client or self.client).post(
+            '/api/admin/verify-ticket/', {'final_key': final_key}, content_type='application/json',
+        )
+
+    def validate(self, ticket_id, **headers):
+        return self.client.post(f'/api/admin/tickets/{ticket_id}/validate/', headers=headers)
+
+    def test_verify_ticket(self):
+        response = self.verify(self.ticket.final_key)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['ticket_id'], self.ticket.id)
+        self.assertEqual(response.json()['user']['last_name'], 'Dupont')
+
+        with self.assertNumQueries(0):
+            response = self.verify('forged-key')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.json()['valid'])
+
+    def test_verify_requires_staff(self):
+        self.assertEqual(self.verify(self.ticket.final_key, client=Client()).status_code, 401)
+        user_client = Client(headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'})
+        self.assertEqual(self.verify(self.ticket.final_key, client=user_client).status_code, 403)
+        invalid_client = Client(headers={'Authorization': 'Bearer not-a-token'})
+        self.assertEqual(self.verify(self.ticket.final_key, client=invalid_client).status_code, 401)
+
+    def test_validate_ticket(self):
+        response = self.validate(self.ticket.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user'], 'Jean Dupont')
+        self.ticket.refresh_from_db()
+        self.assertTrue(self.ticket.is_used)
+
+        self.assertEqual(self.validate(self.ticket.id).status_code, 400)
+        self.assertEqual(self.validate(999999).status_code, 404)
+
+    def test_validate_replays_idempotency_key(self):
+        first = self.validate(self.ticket.id, **{'Idempotency-Key': 'scan-1'})
+        replay = self.validate(self.ticket.id, **{'Idempotency-Key': 'scan-1'})
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(replay.status_code, 200)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.json(), first.json())
+
+
+@override_settings(ROOT_URLCONF='config.asgi_urls', QR_RENDER_WORKERS=0)
+class AsyncQRCodeViewTest(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        override = override_settings(QR_CACHE_DIR=self.cache_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        qr.memory_cache.clear()
+
+        user = User.objects.create_user(email='qr@example.com', password='testpass123')
+        offer = TicketOffer.objects.create(name="Test Offer", price=100.00, offer_type="SOLO")
+        self.ticket = Ticket.objects.create(user=user, offer=offer)
+        self.url = f'/api/tickets/{self.ticket.id}/qr-code/'
+
+    async def test_formats_and_revalidation(self):
+        client = AsyncClient()
+        response = await client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response.content, qr.get_qr_image(self.ticket.final_key, 'png'))
+
+        response = await client.get(self.url, headers={'Accept': 'image/svg+xml'})
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        response = await client.get(self.url, {'format': 'matrix'})
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+        etag = response['ETag']
+        response = await client.get(self.url, {'format': 'matrix'}, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_unknown_ticket_and_format(self):
+        client = AsyncClient()
+        self.assertEqual((await client.get('/api/tickets/999999/qr-code/')).status_code, 404)
+        self.assertEqual((await client.get(self.url, {'format': 'gif'})).status_code, 404)
+        self.assertEqual((await client.get(self.url, headers={'Accept': 'text/html'})).status_code, 406)
+
+
+class NegotiateFormatTest(TestCase):
+    def test_negotiation(self):
+        self.assertEqual(qr.negotiate_format(None, None), 'png')
+        self.assertEqual(qr.negotiate_format('svg', 'image/png'), 'svg')
+        self.assertEqual(qr.negotiate_format(None, 'application/json, */*'), 'matrix')
+        self.assertEqual(qr.negotiate_format(None, 'text/html, */*;q=0.8'), 'png')
+        self.assertIsNone(qr.negotiate_format(None, 'text/html'))
+
+    def test_most_specific_media_type_wins_as_in_drf(self):
+        user = User.objects.create_user(email='accept@example.com', password='testpass123')
+        offer = TicketOffer.objects.create(name="Test Offer", price=100.00, offer_type="SOLO")
+        ticket = Ticket.objects.create(user=user, offer=offer)
+        url = f'/api/tickets/{ticket.id}/qr-code/'
+        client = Client(headers={'Authorization': f'Bearer {AccessToken.for_user(user)}'})
+
+        for accept, fmt in [
+            ('image/*, image/svg+xml', 'svg'),
+            ('*/*, application/json', 'matrix'),
+            ('image/*;q=0.9, */*', 'png'),
+        ]:
+            with self.subTest(accept=accept):
+                self.assertEqual(qr.negotiate_format(None, accept), fmt)
+                with tempfile.TemporaryDirectory() as cache_dir, override_settings(QR_CACHE_DIR=cache_dir):
+                    response = client.get(url, headers={'Accept': accept})
+                self.assertEqual(response['Content-Type'], qr.CONTENT_TYPES[fmt])
@@ -0,0 +1,64 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tickets.authentication import local_users
+from tickets.models import Ticket, TicketOffer
+
+User = get_user_model()
+
+
+class CachedJWTAuthenticationTest(TestCase):
+    def setUp(self):
+        local_users.clear()
+        self.addCleanup(local_users.clear)
+        self.user = User.objects.create_user(email='user@example.com', password='testpass123', first_name='Ana')
+        self.admin = User.objects.create_user(email='admin@example.com', password='testpass123', is_staff=True)
+        self.client = APIClient()
+
+    def authenticate(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_user_is_resolved_from_cache(self):
+        self.authenticate(AccessToken.for_user(self.user))
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/user/me/').status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/user/me/')
+        self.assertEqual(response.data['email'], 'user@example.com')
+
+    def test_save_and_deactivation_invalidate_cache(self):
+        self.authenticate(AccessToken.for_user(self.user))
+        self.client.get('/api/user/me/')
+
+        self.user.first_name = 'Bea'
+        self.user.save()
+        self.assertEqual(self.client.get('/api/user/me/').data['first_name'], 'Bea')
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/user/me/').status_code, 401)
+
+    def test_scanner_token_is_claims_only(self):
+        offer = TicketOffer.objects.create(name="Solo", price=50.00, offer_type="SOLO", description="")
+        ticket = Ticket.objects.create(user=self.user, offer=offer)
+
+        out = StringIO()
+        call_command('issue_scanner_token', 'admin@example.com', '--hours', '1', stdout=out)
+        self.authenticate(out.getvalue().strip())
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'/api/admin/tickets/{ticket.id}/validate/')
+        self.assertEqual(response.status_code, 200)
+        # Aucune lecture de tickets_user pour authentifier le portique
+        self.assertFalse([q for q in queries if q['sql'].startswith('SELECT') and '"tickets_user"' in q['sql']])
+
+    def test_scanner_token_requires_admin(self):
+        with self.assertRaises(CommandError):
+            call_command('issue_scanner_token', 'user@example.com', stdout=StringIO())
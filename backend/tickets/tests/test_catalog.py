@@ -0,0 +1,91 @@
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils.http import parse_http_date
+from rest_framework.test import APIClient
+
+from tickets import catalog
+from tickets.models import TicketOffer
+
+User = get_user_model()
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'catalog': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'catalog'},
+})
+class CatalogTest(TestCase):
+    def setUp(self):
+        caches['catalog'].clear()
+        self.admin = User.objects.create_user(email='admin@example.com', password='testpass123', is_staff=True)
+        self.solo = TicketOffer.objects.create(name="Solo", price=50.00, offer_type="SOLO", description="")
+        TicketOffer.objects.create(name="Duo", price=85.00, offer_type="DUO", description="", available=False)
+        self.client = APIClient()
+
+    def test_catalog_is_served_from_cache(self):
+        response = self.client.get('/api/ticket-offers/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([offer['name'] for offer in json.loads(response.content)], ["Solo"])
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/ticket-offers/')
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+    def test_conditional_requests(self):
+        response = self.client.get('/api/ticket-offers/')
+        self.assertEqual(self.client.get('/api/ticket-offers/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(
+            self.client.get('/api/ticket-offers/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304,
+        )
+        self.assertEqual(self.client.get('/api/ticket-offers/', HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_admin_changes_invalidate_catalog(self):
+        etag = self.client.get('/api/ticket-offers/')['ETag']
+
+        self.client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(f'/api/admin/offers/{self.solo.id}/', {'price': 60}, format='json')
+        self.client.force_authenticate(None)
+
+        response = self.client.get('/api/ticket-offers/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)[0]['price'], 60.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.solo.delete()
+        self.assertEqual(json.loads(self.client.get('/api/ticket-offers/').content), [])
+
+    def assert_modified_after(self, change):
+        last_modified = self.client.get('/api/ticket-offers/')['Last-Modified']
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = self.client.get('/api/ticket-offers/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(parse_http_date(response['Last-Modified']), parse_http_date(last_modified))
+
+    def test_deactivated_offer_advances_last_modified(self):
+        self.solo.available = False
+        self.assert_modified_after(self.solo.save)
+
+    def test_deleted_offer_advances_last_modified(self):
+        self.assert_modified_after(self.solo.delete)
+
+    def test_catalog_built_before_a_commit_is_not_kept(self):
+        build_catalog = catalog.build_catalog
+
+        def build_then_commit(*args):
+            stale = build_catalog(*args)
+            # L'admin committe pendant que ce lecteur construit l'état d'avant
+            self.solo.price = 70
+            with self.captureOnCommitCallbacks(execute=True):
+                self.solo.save()
+            return stale
+
+        with mock.patch('tickets.catalog.build_catalog', side_effect=build_then_commit):
+            self.assertEqual(json.loads(self.client.get('/api/ticket-offers/').content)[0]['price'], 50.0)
+        self.assertEqual(json.loads(self.client.get('/api/ticket-offers/').content)[0]['price'], 70.0)
@@ -0,0 +1,55 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from tickets.models import Ticket, TicketOffer
+
+User = get_user_model()
+
+
+class TicketCheckInTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@example.com', password='testpass123', is_staff=True)
+        self.user = User.objects.create_user(
+            email='user@example.com', password='testpass123', first_name='Jean', last_name='Dupont'
+        )
+        self.offer = TicketOffer.objects.create(name="Test Offer", price=100.00, offer_type="SOLO")
+        self.ticket = Ticket.objects.create(user=self.user, offer=self.offer)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def url(self, ticket_id):
+        return f'/api/admin/tickets/{ticket_id}/validate/'
+
+    def test_check_in_returns_display_fields(self):
+        checked_in = Ticket.objects.check_in(self.ticket.id)
+        self.assertEqual(checked_in.ticket_id, self.ticket.id)
+        self.assertEqual(checked_in.user_id, self.user.id)
+        self.assertEqual(checked_in.offer_name, "Test Offer")
+        self.ticket.refresh_from_db()
+        self.assertTrue(self.ticket.is_used)
+
+    def test_second_check_in_fails(self):
+        self.assertIsNotNone(Ticket.objects.check_in(self.ticket.id))
+        self.assertIsNone(Ticket.objects.check_in(self.ticket.id))
+
+    def test_validate_ticket_single_ticket_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url(self.ticket.id))
+        ticket_queries = [q['sql'] for q in queries if 'tickets_ticket"' in q['sql'] or 'tickets_ticket ' in q['sql']]
+        self.assertEqual(len(ticket_queries), 1)
+        self.assertTrue(ticket_queries[0].startswith('UPDATE'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user'], 'Jean Dupont')
+        self.assertEqual(response.data['offer'], 'Test Offer')
+
+    def test_validate_used_ticket(self):
+        self.client.post(self.url(self.ticket.id))
+        response = self.client.post(self.url(self.ticket.id))
+        self.assertEqual(response.status_code, 400)
+
+    def test_validate_unknown_ticket(self):
+        response = self.client.post(self.url(999999))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,113 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from tickets import denylist
+from tickets.denylist import CacheDenylist, MemoryDenylist, SQLiteDenylist
+
+User = get_user_model()
+
+
+class DenylistStoreTest(TestCase):
+    def test_memory_denylist_evicts_expired(self):
+        store = MemoryDenylist()
+        now = time.time()
+        self.assertTrue(store.consume('a', now + 60))
+        self.assertFalse(store.consume('a', now + 60))
+        self.assertTrue(store.consume('b', now + 1))
+        self.assertIn('a', store)
+
+        with mock.patch('tickets.denylist.time.time', return_value=now + 30):
+            self.assertNotIn('b', store)
+            self.assertEqual(len(store), 1)
+
+    def test_sqlite_denylist(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = SQLiteDenylist(Path(directory) / 'denylist.sqlite3')
+            now = time.time()
+            self.assertTrue(store.consume('a', now + 60))
+            self.assertFalse(store.consume('a', now + 60))
+            self.assertIn('a', store)
+            self.assertTrue(store.consume('b', now - 1))
+            self.assertNotIn('b', store)
+
+            # Entrée restée après son expiration : le jti peut être réinscrit
+            self.assertTrue(store.consume('c', now + 1))
+            with mock.patch('tickets.denylist.time.time', return_value=now + 30):
+                self.assertNotIn('c', store)
+                self.assertTrue(store.consume('c', now + 60))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_cache_denylist(self):
+        store = CacheDenylist()
+        self.assertTrue(store.consume('a', time.time() + 60))
+        self.assertFalse(store.consume('a', time.time() + 60))
+        self.assertIn('a', store)
+        # Déjà expiré : inutile de l'inscrire
+        self.assertTrue(store.consume('b', time.time() - 1))
+        self.assertNotIn('b', store)
+
+
+class ConfiguredDenylistTestMixin:
+    """Backend configuré (settings.JWT_DENYLIST_BACKEND), sur un fichier temporaire."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path_override = override_settings(JWT_DENYLIST_SQLITE_PATH=Path(directory.name) / 'denylist.sqlite3')
+        path_override.enable()
+        self.addCleanup(path_override.disable)
+        denylist.reset_denylist()
+        self.addCleanup(denylist.reset_denylist)
+
+
+class ConcurrentConsumeTest(ConfiguredDenylistTestMixin, TestCase):
+    def test_concurrent_consume_accepts_one(self):
+        store = denylist.get_denylist()
+        # Autant d'instances que de workers : chacune sa connexion
+        stores = [store, type(store)()]
+        barrier = threading.Barrier(8)
+        results = []
+
+        def consume(i):
+            barrier.wait()
+            results.append(stores[i % 2].consume('jti', time.time() + 60))
+
+        threads = [threading.Thread(target=consume, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(results), [False] * 7 + [True])
+
+
+class TokenRefreshTest(ConfiguredDenylistTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(email='user@example.com', password='testpass123')
+        self.client = APIClient()
+
+    def refresh(self, token):
+        return self.client.post('/api/auth/refresh/', {'refresh': str(token)}, format='json')
+
+    def test_rotated_token_cannot_be_replayed(self):
+        token = RefreshToken.for_user(self.user)
+        response = self.refresh(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('refresh', response.data)
+
+        self.assertEqual(self.refresh(token).status_code, 401)
+        self.assertEqual(self.refresh(response.data['refresh']).status_code, 200)
+
+    def test_inactive_user_cannot_refresh(self):
+        token = RefreshToken.for_user(self.user)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.refresh(token).status_code, 401)
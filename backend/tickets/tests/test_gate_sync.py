@@ -0,0 +1,67 @@
+import json
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from tickets.models import Ticket, TicketOffer
+from tickets.sync import RECORD, FLAG_USED, key_digest
+
+User = get_user_model()
+
+
+@override_settings(GATE_SYNC_SETTLE_SECONDS=0, GATE_SYNC_DELTA_LIMIT=2)
+class GateSyncTest(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user(email='admin@example.com', password='testpass123', is_staff=True)
+        user = User.objects.create_user(email='user@example.com', password='testpass123')
+        self.offer = TicketOffer.objects.create(name="Test Offer", price=100.00, offer_type="SOLO")
+        other_offer = TicketOffer.objects.create(name="Other Offer", price=50.00, offer_type="DUO")
+        self.tickets = [Ticket.objects.create(user=user, offer=self.offer) for _ in range(3)]
+        Ticket.objects.create(user=user, offer=other_offer)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def snapshot(self, **params):
+        response = self.client.get('/api/admin/gate-sync/snapshot/', params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_ndjson_snapshot_for_offer(self):
+        Ticket.objects.check_in(self.tickets[0].id)
+        response, body = self.snapshot(offer=self.offer.id)
+        lines = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[0], {'k': key_digest(self.tickets[0].final_key).hex(), 'u': 1})
+        self.assertIn('X-Sync-Cursor', response)
+
+    def test_binary_snapshot(self):
+        _, body = self.snapshot(encoding='binary')
+        self.assertEqual(len(body), 4 * RECORD.size)
+        digest, flags = RECORD.unpack_from(body)
+        self.assertEqual(digest, key_digest(self.tickets[0].final_key))
+        self.assertFalse(flags & FLAG_USED)
+
+    def test_delta_returns_only_changes(self):
+        response, _ = self.snapshot(offer=self.offer.id)
+        cursor = response['X-Sync-Cursor']
+
+        Ticket.objects.check_in(self.tickets[1].id)
+        delta = self.client.get('/api/admin/gate-sync/delta/', {'cursor': cursor, 'offer': self.offer.id}).data
+        self.assertEqual(delta['changes'], [{'k': key_digest(self.tickets[1].final_key).hex(), 'u': 1}])
+        self.assertFalse(delta['has_more'])
+
+        delta = self.client.get('/api/admin/gate-sync/delta/', {'cursor': delta['cursor']}).data
+        self.assertEqual(delta['changes'], [])
+
+    def test_delta_pagination(self):
+        delta = self.client.get('/api/admin/gate-sync/delta/', {'cursor': '0-0'}).data
+        self.assertEqual(len(delta['changes']), 2)
+        self.assertTrue(delta['has_more'])
+        delta = self.client.get('/api/admin/gate-sync/delta/', {'cursor': delta['cursor']}).data
+        self.assertEqual(len(delta['changes']), 2)
+        self.assertFalse(delta['has_more'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/admin/gate-sync/delta/', {'cursor': 'nope'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,103 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from tickets import hashing
+from tickets.writebehind import last_logins
+
+User = get_user_model()
+
+
+class HashingPoolTest(TestCase):
+    def test_saturated_pool_rejects_immediately(self):
+        pool = hashing.HashingPool(workers=1, max_pending=2)
+        self.addCleanup(pool.shutdown)
+        release = threading.Event()
+        futures = [pool.submit(release.wait, 5) for _ in range(2)]
+
+        with self.assertRaises(hashing.HashPoolSaturated):
+            pool.submit(release.wait, 5)
+        self.assertEqual(pool.pending, 2)
+
+        release.set()
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(pool.pending, 0)
+        pool.submit(len, 'ok').result(timeout=5)
+
+        stats = pool.metrics.snapshot()
+        self.assertEqual(stats['completed'], 3)
+        self.assertEqual(stats['rejected'], 1)
+        self.assertGreater(stats['wait_max_ms'], 0)
+
+
+@override_settings(
+    ROOT_URLCONF='config.asgi_urls', LAST_LOGIN_FLUSH_SECONDS=0,
+    PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_PENDING=1, PASSWORD_HASH_RETRY_AFTER=2,
+)
+class AsyncAuthViewsTest(TestCase):
+    def setUp(self):
+        hashing.reset_pool()
+        self.addCleanup(hashing.reset_pool)
+        self.addCleanup(last_logins.flush)
+        self.user = User.objects.create_user(email='user@example.com', password='testpass123')
+        self.client = APIClient()
+
+    def login(self, password='testpass123'):
+        return self.client.post('/api/auth/login/', {'email': 'user@example.com', 'password': password}, format='json')
+
+    def test_login(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json())
+        self.assertEqual(self.login('wrongpass').status_code, 401)
+        self.assertEqual(
+            self.client.post('/api/auth/login/', {'email': 'nobody@example.com', 'password': 'x'}, format='json').status_code,
+            401,
+        )
+        self.assertEqual(hashing.get_pool().metrics.snapshot()['completed'], 3)
+
+    def test_outdated_hash_is_upgraded(self):
+        outdated = PBKDF2PasswordHasher().encode('testpass123', 'somesalt', iterations=1000)
+        User.objects.filter(pk=self.user.pk).update(password=outdated)
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertNotEqual(self.user.password, outdated)
+        self.assertTrue(self.user.check_password('testpass123'))
+
+    def test_register(self):
+        response = self.client.post('/api/auth/register/', {
+            'username': 'bea', 'email': 'bea@example.com', 'password': 'Str0ng-passw0rd',
+            'first_name': 'Bea', 'last_name': 'Martin',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['user']['email'], 'bea@example.com')
+        self.assertTrue(User.objects.get(email='bea@example.com').check_password('Str0ng-passw0rd'))
+
+        response = self.client.post('/api/auth/register/', {'email': 'bea@example.com'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json())
+
+    def test_saturated_pool_returns_503(self):
+        release = threading.Event()
+        blocked = hashing.get_pool().submit(release.wait, 5)
+        try:
+            response = self.login()
+        finally:
+            release.set()
+            blocked.result(timeout=5)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '2')
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_stats_endpoint(self):
+        admin = User.objects.create_user(email='admin@example.com', password='testpass123', is_staff=True)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/api/admin/hashing-stats/').status_code, 403)
+        self.client.force_authenticate(admin)
+        response = self.client.get('/api/admin/hashing-stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['workers'], 1)
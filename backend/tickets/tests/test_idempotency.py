@@ -0,0 +1,139 @@
+import tempfile
+import threading
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from tickets import idempotency, waiting_room
+from tickets.idempotency import DONE, PENDING, STARTED, MemoryStore, SQLiteStore
+from tickets.models import Ticket, TicketOffer
+
+User = get_user_model()
+
+
+@override_settings(IDEMPOTENCY_LOCK_TIMEOUT=30)
+class StoreTest(TestCase):
+    def check_store(self, store):
+        self.assertEqual(store.begin('k', 'f', now=100.0), (STARTED, None))
+        self.assertEqual(store.begin('k', 'f', now=101.0), (PENDING, None))
+        store.complete('k', 'f', 201, '{"ok":1}', expires=200.0)
+        state, stored = store.begin('k', 'f', now=150.0)
+        self.assertEqual(state, DONE)
+        self.assertEqual((stored.status, stored.body), (201, '{"ok":1}'))
+        # Expirée : la clé est à nouveau libre
+        self.assertEqual(store.begin('k', 'f', now=250.0), (STARTED, None))
+        # Exécution abandonnée (worker tué) : reprise après IDEMPOTENCY_LOCK_TIMEOUT
+        self.assertEqual(store.begin('k', 'f', now=300.0), (STARTED, None))
+        store.abandon('k')
+        self.assertEqual(store.begin('k', 'f', now=301.0), (STARTED, None))
+
+    def test_memory_store(self):
+        self.check_store(MemoryStore())
+
+    def test_sqlite_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.check_store(SQLiteStore(Path(directory) / 'idempotency.sqlite3'))
+
+    def test_memory_store_wakes_waiters(self):
+        store = MemoryStore()
+        store.begin('k', 'f', now=1e12 - 60)
+        threading.Timer(0.05, store.complete, ('k', 'f', 200, '{}', 1e12)).start()
+        state, stored = store.wait('k', 'f', timeout=5)
+        self.assertEqual(state, DONE)
+
+
+@override_settings(IDEMPOTENCY_STORE='tickets.idempotency.MemoryStore')
+class IdempotentViewTest(TestCase):
+    def setUp(self):
+        idempotency.reset_store()
+        self.addCleanup(idempotency.reset_store)
+        self.admin = User.objects.create_user(email='admin@example.com', password='testpass123', is_staff=True)
+        self.user = User.objects.create_user(email='user@example.com', password='testpass123')
+        self.offer = TicketOffer.objects.create(name="Solo", price=50.00, offer_type="SOLO", description="")
+        self.client = APIClient()
+
+    def purchase(self, key, offer_id=None):
+        self.client.force_authenticate(self.user)
+        return self.client.post(
+            '/api/tickets/purchase/', {'offer_id': offer_id or self.offer.id}, format='json',
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_replayed_purchase_returns_first_response(self):
+        first = self.purchase('abc')
+        with self.assertNumQueries(0):
+            replay = self.purchase('abc')
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay.data, first.data)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(Ticket.objects.count(), 1)
+
+        self.assertEqual(self.purchase('other').status_code, 201)
+        self.assertEqual(Ticket.objects.count(), 2)
+
+    @override_settings(
+        WAITING_ROOM_ENABLED=True,
+        WAITING_ROOM_BACKEND='tickets.waiting_room.MemoryBackend',
+        WAITING_ROOM_RATE=1,
+        WAITING_ROOM_BURST=1,
+    )
+    def test_queue_rejection_not_stored(self):
+        waiting_room.reset_backend()
+        self.addCleanup(waiting_room.reset_backend)
+        self.assertEqual(self.purchase('abc').status_code, 403)
+
+        # Réadmis avec un nouveau jeton, le client rejoue la même clé
+        token = self.client.post('/api/waiting-room/join/').data['token']
+        self.client.credentials(HTTP_X_QUEUE_TOKEN=token)
+        response = self.purchase('abc')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_key_reused_with_other_payload(self):
+        other = TicketOffer.objects.create(name="Duo", price=85.00, offer_type="DUO", description="")
+        self.purchase('abc')
+        self.assertEqual(self.purchase('abc', offer_id=other.id).status_code, 422)
+
+    def test_replayed_validation(self):
+        ticket = Ticket.objects.create(user=self.user, offer=self.offer)
+        self.client.force_authenticate(self.admin)
+        url = f'/api/admin/tickets/{ticket.id}/validate/'
+        first = self.client.post(url, HTTP_IDEMPOTENCY_KEY='gate-1')
+        replay = self.client.post(url, HTTP_IDEMPOTENCY_KEY='gate-1')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(replay.status_code, 200)
+        # Sans clé, la seconde validation est refusée comme avant
+        self.assertEqual(self.client.post(url).status_code, 400)
+
+
+@override_settings(IDEMPOTENCY_STORE='tickets.idempotency.MemoryStore', SALES_COUNTER_STRICT=True)
+class ConcurrentDuplicateTest(TransactionTestCase):
+    def setUp(self):
+        idempotency.reset_store()
+        self.addCleanup(idempotency.reset_store)
+        self.user = User.objects.create_user(email='user@example.com', password='testpass123')
+        self.offer = TicketOffer.objects.create(name="Solo", price=50.00, offer_type="SOLO", description="")
+
+    def test_concurrent_duplicates_run_once(self):
+        responses = []
+
+        def purchase():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            responses.append(client.post(
+                '/api/tickets/purchase/', {'offer_id': self.offer.id}, format='json',
+                HTTP_IDEMPOTENCY_KEY='same',
+            ))
+
+        threads = [threading.Thread(target=purchase) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([response.status_code for response in responses], [201] * 4)
+        self.assertEqual(len({response.data['ticket_id'] for response in responses}), 1)
+        self.assertEqual(Ticket.objects.count(), 1)
@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from tickets.writebehind import last_logins
+
+User = get_user_model()
+
+
+@override_settings(LAST_LOGIN_FLUSH_SECONDS=0, LAST_LOGIN_GRANULARITY=3600)
+class LastLoginBufferTest(TestCase):
+    def setUp(self):
+        last_logins.flush()
+        self.users = [
+            User.objects.create_user(email=f'user{i}@example.com', password='testpass123') for i in range(3)
+        ]
+        self.client = APIClient()
+
+    def login(self, email):
+        return self.client.post('/api/auth/login/', {'email': email, 'password': 'testpass123'}, format='json')
+
+    def test_logins_are_flushed_in_one_update(self):
+        for user in self.users:
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.login(user.email).status_code, 200)
+            self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE')])
+        self.assertFalse(User.objects.filter(last_login__isnull=False).exists())
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(last_logins.flush(), 3)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(User.objects.filter(last_login__isnull=False).count(), 3)
+
+    def test_recent_login_is_not_rewritten(self):
+        user = self.users[0]
+        user.last_login = timezone.now() - timedelta(minutes=10)
+        user.save()
+        self.login(user.email)
+        self.assertEqual(last_logins.flush(), 0)
+
+        User.objects.filter(pk=user.pk).update(last_login=timezone.now() - timedelta(hours=2))
+        self.login(user.email)
+        self.assertEqual(last_logins.flush(), 1)
+
+    def test_merge_keeps_latest(self):
+        now = timezone.now()
+        last_logins.add(self.users[0].pk, now)
+        last_logins.add(self.users[0].pk, now - timedelta(minutes=5))
+        last_logins.flush()
+        self.assertEqual(User.objects.get(pk=self.users[0].pk).last_login, now)
@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from tickets.models import OfferStockShard, Ticket, TicketOffer
+from tickets.stock import SoldOut, provision, rebalance, remaining_stock, reserve
+
+User = get_user_model()
+
+
+@override_settings(OFFER_STOCK_SHARDS=3)
+class OfferStockTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@example.com', password='testpass123', is_staff=True)
+        self.user = User.objects.create_user(email='user@example.com', password='testpass123')
+        self.offer = TicketOffer.objects.create(
+            name="Finale", price=120.00, offer_type="SOLO", description="", capacity=5,
+        )
+        provision(self.offer)
+        self.client = APIClient()
+
+    def shards(self):
+        return list(OfferStockShard.objects.filter(offer=self.offer).order_by('shard').values_list('remaining', flat=True))
+
+    def test_provision_splits_capacity(self):
+        self.assertEqual(self.shards(), [2, 2, 1])
+
+    def test_purchase_stops_at_capacity(self):
+        self.client.force_authenticate(self.user)
+        for _ in range(5):
+            response = self.client.post('/api/tickets/purchase/', {'offer_id': self.offer.id}, format='json')
+            self.assertEqual(response.status_code, 201)
+
+        response = self.client.post('/api/tickets/purchase/', {'offer_id': self.offer.id}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Ticket.objects.filter(offer=self.offer).count(), 5)
+        self.assertEqual(remaining_stock(self.offer), 0)
+
+    def test_empty_shards_fall_back_to_locked_take(self):
+        OfferStockShard.objects.filter(offer=self.offer).update(remaining=0)
+        OfferStockShard.objects.filter(offer=self.offer, shard=2).update(remaining=2)
+
+        reserve(self.offer, quantity=2)
+        self.assertEqual(remaining_stock(self.offer), 0)
+        with self.assertRaises(SoldOut):
+            reserve(self.offer)
+
+    def test_rebalance_evens_out_shards(self):
+        OfferStockShard.objects.filter(offer=self.offer, shard=0).update(remaining=0)
+        self.assertEqual(rebalance(self.offer), 3)
+        self.assertEqual(self.shards(), [1, 1, 1])
+
+    def test_capacity_change_reprovisions_from_sold_tickets(self):
+        Ticket.objects.create(user=self.user, offer=self.offer)
+        self.client.force_authenticate(self.admin)
+        response = self.client.put(f'/api/admin/offers/{self.offer.id}/', {'capacity': 10}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(remaining_stock(self.offer), 9)
+
+    def test_offer_without_capacity_is_unlimited(self):
+        self.offer.capacity = None
+        self.offer.save()
+        provision(self.offer)
+        self.assertFalse(OfferStockShard.objects.filter(offer=self.offer).exists())
+        reserve(self.offer, quantity=100)
@@ -0,0 +1,108 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from tickets.models import SalesBucket, SalesRollup, Ticket, TicketOffer
+from tickets.stock import provision
+from tickets.writebehind import sales_counters
+
+User = get_user_model()
+
+
+@override_settings(SALES_COUNTER_STRICT=True)
+class PurchaseBatchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user@example.com', password='testpass123')
+        self.solo = TicketOffer.objects.create(name="Solo", price=50.00, offer_type="SOLO", description="")
+        self.family = TicketOffer.objects.create(name="Famille", price=150.00, offer_type="FAMILY", description="")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def purchase(self, items):
+        return self.client.post('/api/tickets/purchase-batch/', items, format='json')
+
+    def test_batch_purchase_inserts_once(self):
+        items = [
+            {'offer_id': self.solo.id, 'quantity': 3},
+            {'offer_id': self.family.id, 'quantity': 2},
+            {'offer_id': self.solo.id},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.purchase(items)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['tickets']), 6)
+        self.assertEqual(response.data['total'], 500.0)
+
+        statements = [query['sql'] for query in queries]
+        self.assertEqual(sum(sql.startswith('INSERT INTO "tickets_ticket"') for sql in statements), 1)
+        self.assertEqual(sum('FROM "tickets_ticketoffer"' in sql for sql in statements), 1)
+
+        tickets = Ticket.objects.filter(user=self.user)
+        self.assertEqual(tickets.count(), 6)
+        self.assertEqual(len({ticket.final_key for ticket in tickets}), 6)
+        self.assertEqual(SalesRollup.objects.get(offer=self.solo).sales_count, 4)
+        self.assertEqual(SalesRollup.objects.get(offer=self.family).revenue, 300)
+        self.assertEqual(SalesBucket.objects.get(offer=self.family).sales_count, 2)
+
+    def test_batch_is_all_or_nothing(self):
+        self.family.capacity = 1
+        self.family.save()
+        provision(self.family)
+
+        response = self.purchase([{'offer_id': self.solo.id, 'quantity': 2}, {'offer_id': self.family.id, 'quantity': 2}])
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Ticket.objects.exists())
+        self.assertFalse(SalesRollup.objects.exists())
+
+    def test_invalid_batches(self):
+        self.assertEqual(self.purchase([]).status_code, 400)
+        self.assertEqual(self.purchase([{'offer_id': self.solo.id, 'quantity': 0}]).status_code, 400)
+        self.assertEqual(self.purchase([{'offer_id': self.solo.id, 'quantity': 1000}]).status_code, 400)
+        self.assertEqual(self.purchase({'items': [{'offer_id': 999}]}).status_code, 404)
+
+        self.solo.available = False
+        self.solo.save()
+        self.assertEqual(self.purchase([{'offer_id': self.solo.id}]).status_code, 404)
+
+
+@override_settings(SALES_COUNTER_STRICT=True)
+class SinglePurchaseTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user@example.com', password='testpass123')
+        self.offer = TicketOffer.objects.create(name="Solo", price=50.00, offer_type="SOLO", description="")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def purchase(self, offer_id):
+        return self.client.post('/api/tickets/purchase/', {'offer_id': offer_id}, format='json')
+
+    def test_purchase_round_trips(self):
+        # Premier achat : création des lignes de compteurs de l'offre
+        self.assertEqual(self.purchase(self.offer.id).status_code, 201)
+
+        # Offre, SAVEPOINT, INSERT ... RETURNING, compteur, tranche, RELEASE
+        with self.assertNumQueries(6):
+            response = self.purchase(self.offer.id)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['offer'], "Solo")
+        self.assertTrue(Ticket.objects.filter(id=response.data['ticket_id'], final_key=response.data['final_key']).exists())
+        self.assertEqual(SalesRollup.objects.get(offer=self.offer).sales_count, 2)
+
+    @override_settings(SALES_COUNTER_STRICT=False, SALES_COUNTER_FLUSH_MS=0)
+    def test_buffered_purchase_round_trips(self):
+        # Compteurs différés : offre, SAVEPOINT, INSERT ... RETURNING, RELEASE
+        with self.assertNumQueries(4):
+            self.assertEqual(self.purchase(self.offer.id).status_code, 201)
+        sales_counters.flush()
+
+    def test_purchase_errors(self):
+        self.assertEqual(self.purchase('abc').status_code, 400)
+        self.assertEqual(self.purchase(999).status_code, 404)
+
+    def test_create_uses_purchase_pipeline(self):
+        response = self.client.post('/api/tickets/', {'offer_id': self.offer.id}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['offer']['name'], "Solo")
+        self.assertEqual(SalesRollup.objects.get(offer=self.offer).sales_count, 1)
@@ -0,0 +1,135 @@
+import base64
+import json
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from tickets import qr, tasks
+from tickets.models import Ticket, TicketOffer
+
+User = get_user_model()
+
+
+class LRUCacheTest(TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = qr.LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+
+
+class TicketQRCodeCacheTest(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        override = override_settings(QR_CACHE_DIR=self.cache_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        qr.memory_cache.clear()
+
+        self.user = User.objects.create_user(email='qr@example.com', password='testpass123')
+        self.offer = TicketOffer.objects.create(name="Test Offer", price=100.00, offer_type="SOLO")
+        self.ticket = Ticket.objects.create(user=self.user, offer=self.offer)
+        self.client = APIClient()
+        self.url = f'/api/tickets/{self.ticket.id}/qr-code/'
+
+    def test_response_is_cacheable(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['ETag'], qr.qr_etag(self.ticket.final_key))
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_if_none_match_returns_304(self):
+        etag = qr.qr_etag(self.ticket.final_key)
+        render = mock.Mock()
+        with mock.patch.dict(qr.RENDERERS, png=render):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        render.assert_not_called()
+
+    def test_disk_tier_survives_memory_eviction(self):
+        self.client.get(self.url)
+        qr.memory_cache.clear()
+        render = mock.Mock()
+        with mock.patch.dict(qr.RENDERERS, png=render):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        render.assert_not_called()
+
+    def test_unknown_ticket(self):
+        response = self.client.get('/api/tickets/999999/qr-code/')
+        self.assertEqual(response.status_code, 404)
+
+
+class PrerenderQRCodesTest(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        override = override_settings(QR_CACHE_DIR=self.cache_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        user = User.objects.create_user(email='prerender@example.com', password='testpass123')
+        offer = TicketOffer.objects.create(name="Test Offer", price=100.00, offer_type="SOLO")
+        self.tickets = [Ticket.objects.create(user=user, offer=offer) for _ in range(3)]
+
+    def test_prerender_skips_stored_codes(self):
+        keys = [ticket.final_key for ticket in self.tickets]
+        self.assertEqual(tasks.prerender_qr(keys), 3)
+        self.assertEqual(tasks.prerender_qr(keys), 0)
+        self.assertIsNotNone(qr.read_from_disk(keys[0]))
+
+    def test_backfill_command(self):
+        out = StringIO()
+        call_command('prerender_qr_codes', workers=2, batch_size=2, stdout=out)
+        self.assertIn('3 QR code(s)', out.getvalue())
+        for ticket in self.tickets:
+            self.assertIsNotNone(qr.read_from_disk(ticket.final_key))
+
+
+class TicketQRCodeFormatTest(TestCase):
+    def setUp(self):
+        override = override_settings(QR_CACHE_DIR='')
+        override.enable()
+        self.addCleanup(override.disable)
+        qr.memory_cache.clear()
+
+        user = User.objects.create_user(email='formats@example.com', password='testpass123')
+        offer = TicketOffer.objects.create(name="Test Offer", price=100.00, offer_type="SOLO")
+        self.ticket = Ticket.objects.create(user=user, offer=offer)
+        self.client = APIClient()
+        self.url = f'/api/tickets/{self.ticket.id}/qr-code/'
+
+    def test_format_query_param(self):
+        response = self.client.get(self.url, {'format': 'svg'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertTrue(response.content.startswith(b'<svg'))
+        self.assertEqual(response['ETag'], qr.qr_etag(self.ticket.final_key, 'svg'))
+
+    def test_accept_header(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        payload = json.loads(response.content)
+        matrix = qr.build_matrix(self.ticket.final_key)
+        self.assertEqual(payload['size'], len(matrix))
+        self.assertEqual(base64.b64decode(payload['data']), qr.pack_matrix(matrix))
+        self.assertIn('Accept', response['Vary'])
+
+    def test_defaults_to_png(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='*/*')
+        self.assertEqual(response['Content-Type'], 'image/png')
+
+    def test_pack_matrix(self):
+        matrix = [[True, False, False], [False, False, False], [False, False, True]]
+        self.assertEqual(qr.pack_matrix(matrix), bytes([0b10000000, 0b10000000]))
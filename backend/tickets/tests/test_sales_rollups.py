@@ -0,0 +1,123 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from tickets.models import SalesBucket, SalesRollup, Ticket, TicketOffer
+from tickets.rollups import rebuild_rollups
+from tickets.writebehind import sales_counters
+
+User = get_user_model()
+
+
+@override_settings(SALES_COUNTER_STRICT=True)
+class SalesRollupTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@example.com', password='testpass123', is_staff=True)
+        self.user = User.objects.create_user(email='user@example.com', password='testpass123')
+        self.solo = TicketOffer.objects.create(name="Solo", price=50.00, offer_type="SOLO", description="")
+        self.duo = TicketOffer.objects.create(name="Duo", price=85.00, offer_type="DUO", description="")
+        self.client = APIClient()
+
+    def purchase(self, offer):
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/api/tickets/purchase/', {'offer_id': offer.id}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['ticket_id']
+
+    def test_purchase_and_validation_update_rollup(self):
+        ticket_id = self.purchase(self.solo)
+        self.purchase(self.solo)
+        self.client.force_authenticate(self.admin)
+        self.client.post(f'/api/admin/tickets/{ticket_id}/validate/')
+
+        rollup = SalesRollup.objects.get(offer=self.solo)
+        self.assertEqual(rollup.sales_count, 2)
+        self.assertEqual(rollup.revenue, 100)
+        self.assertEqual(rollup.used_count, 1)
+
+    def test_dashboard_reads_rollups(self):
+        self.purchase(self.solo)
+        self.purchase(self.duo)
+        self.purchase(self.duo)
+        self.client.force_authenticate(self.admin)
+
+        with self.assertNumQueries(2):
+            data = self.client.get('/api/admin/dashboard/').data
+        self.assertEqual(data['chart_data']['labels'], ['Duo', 'Solo'])
+        self.assertEqual(data['global_stats']['total_tickets'], 3)
+        self.assertEqual(data['global_stats']['total_revenue'], 220.0)
+
+        data = self.client.get('/api/admin/sales-stats/').data
+        self.assertEqual(data['type_stats']['DUO'], {'total_sales': 2, 'total_revenue': 170.0})
+        self.assertEqual(data['offers_details'][0]['average_revenue_per_sale'], 85.0)
+
+    def test_rebuild_detects_and_fixes_drift(self):
+        self.purchase(self.solo)
+        Ticket.objects.create(user=self.user, offer=self.solo)
+
+        out = StringIO()
+        call_command('rebuild_sales_rollups', check=True, stdout=out)
+        self.assertIn('1 offre(s) en dérive', out.getvalue())
+        self.assertEqual(SalesRollup.objects.get(offer=self.solo).sales_count, 1)
+
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+        self.assertEqual(SalesRollup.objects.get(offer=self.solo).sales_count, 2)
+        out = StringIO()
+        call_command('rebuild_sales_rollups', check=True, stdout=out)
+        self.assertIn('Aucune dérive', out.getvalue())
+
+    def test_price_change_is_not_drift(self):
+        self.purchase(self.solo)
+        self.solo.price = 60
+        self.solo.save()
+        self.purchase(self.solo)
+
+        self.assertEqual(SalesRollup.objects.get(offer=self.solo).revenue, 110)
+        self.assertEqual(rebuild_rollups(dry_run=True), [])
+
+
+@override_settings(SALES_COUNTER_STRICT=False, SALES_COUNTER_FLUSH_MS=0)
+class SalesCounterBufferTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user@example.com', password='testpass123')
+        self.solo = TicketOffer.objects.create(name="Solo", price=50.00, offer_type="SOLO", description="")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        sales_counters.flush()
+
+    def test_increments_are_coalesced_until_flush(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(3):
+                self.client.post('/api/tickets/purchase/', {'offer_id': self.solo.id}, format='json')
+        self.assertFalse(SalesRollup.objects.exists())
+
+        # Un UPDATE par ligne de compteur, quel que soit le nombre d'achats
+        with CaptureQueriesContext(connection) as queries:
+            sales_counters.flush()
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "tickets_salesrollup"')]
+        self.assertEqual(len(updates), 1)
+
+        rollup = SalesRollup.objects.get(offer=self.solo)
+        self.assertEqual((rollup.sales_count, rollup.revenue), (3, 150))
+        self.assertEqual(SalesBucket.objects.get(offer=self.solo).sales_count, 3)
+
+    def test_rolled_back_purchase_is_not_counted(self):
+        # Callbacks on_commit jamais exécutés : comme une transaction annulée
+        with self.captureOnCommitCallbacks(execute=False):
+            self.client.post('/api/tickets/purchase/', {'offer_id': self.solo.id}, format='json')
+        sales_counters.flush()
+        self.assertFalse(SalesRollup.objects.exists())
+
+    def test_failed_flush_keeps_increments(self):
+        sales_counters.add(('rollup', self.solo.id, 'sales_count'), 2)
+        with mock.patch('tickets.rollups._increment', side_effect=DatabaseError), \
+                self.assertLogs('tickets.writebehind', 'ERROR'):
+            self.assertEqual(sales_counters.flush(), 0)
+        self.assertEqual(sales_counters.flush(), 1)
+        self.assertEqual(SalesRollup.objects.get(offer=self.solo).sales_count, 2)
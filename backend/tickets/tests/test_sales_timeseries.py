@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from tickets.models import SalesBucket, TicketOffer
+from tickets.timeseries import compact, record_sales_bucket, series
+
+User = get_user_model()
+
+
+@override_settings(
+    SALES_BUCKET_MINUTE_RETENTION_HOURS=2, SALES_BUCKET_HOUR_RETENTION_DAYS=2, SALES_COUNTER_STRICT=True,
+)
+class SalesTimeseriesTest(TestCase):
+    def setUp(self):
+        self.offer = TicketOffer.objects.create(name="Solo", price=50.00, offer_type="SOLO", description="")
+        self.now = datetime(2026, 6, 10, 12, 30, tzinfo=dt_timezone.utc)
+
+    def sell(self, at, count=1):
+        record_sales_bucket(self.offer, count, at=at)
+
+    def test_purchases_accumulate_per_minute(self):
+        self.sell(self.now)
+        self.sell(self.now + timedelta(seconds=20), 2)
+        self.sell(self.now + timedelta(minutes=1))
+        points = series(SalesBucket.MINUTE, self.now, self.now + timedelta(minutes=5))
+        self.assertEqual([p[1] for p in points], [3, 1])
+        self.assertEqual(points[0][2], 150)
+
+    def test_compaction_preserves_totals(self):
+        for minutes in (0, 5, 61, 200):
+            self.sell(self.now - timedelta(days=3, minutes=minutes))
+        self.sell(self.now - timedelta(minutes=10))
+
+        self.assertEqual(compact(now=self.now), 4 + 3)
+        self.assertEqual(SalesBucket.objects.filter(granularity=SalesBucket.DAY).count(), 1)
+
+        points = series(SalesBucket.DAY, self.now - timedelta(days=5), self.now + timedelta(hours=1))
+        self.assertEqual(sum(p[1] for p in points), 5)
+        hourly = series(SalesBucket.HOUR, self.now - timedelta(hours=1), self.now + timedelta(hours=1))
+        self.assertEqual(hourly, [(self.now.replace(minute=0), 1, 50)])
+
+    def test_series_filters_on_indexed_granularity(self):
+        with CaptureQueriesContext(connection) as queries:
+            series(SalesBucket.HOUR, self.now - timedelta(hours=1), self.now)
+        self.assertIn('"granularity" IN', queries[0]['sql'])
+
+    def test_endpoint(self):
+        admin = User.objects.create_user(email='admin@example.com', password='testpass123', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        self.sell(self.now)
+
+        response = client.get('/api/admin/sales-timeseries/', {
+            'offer': self.offer.id,
+            'granularity': 'hour',
+            'from': (self.now - timedelta(hours=3)).isoformat(),
+            'to': self.now.isoformat().replace('12:30', '13:00'),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['points'], [{'t': '2026-06-10T12:00:00+00:00', 'sales': 1, 'revenue': 50.0}])
+
+        response = client.get('/api/admin/sales-timeseries/', {'granularity': 'week'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_endpoint_rejects_invalid_dates(self):
+        admin = User.objects.create_user(email='admin@example.com', password='testpass123', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        for params in (
+            {'to': 'garbage'},
+            {'from': 'garbage'},
+            {'from': '2024-02-30T00:00:00'},
+            {'to': '2024-02-30T00:00:00', 'from': '2024-02-01T00:00:00'},
+            {'from': '2024-03-02T00:00:00', 'to': '2024-03-01T00:00:00'},
+            {'from': '2024-03-01T00:00:00', 'to': '2024-03-01T00:00:00'},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(client.get('/api/admin/sales-timeseries/', params).status_code, 400)
@@ -0,0 +1,97 @@
+import runpy
+import time
+import uuid
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from tickets.models import Ticket, TicketOffer
+from tickets.signing import (
+    InvalidTicketKey, SIGNED_KEY_LENGTH, is_signed_key, settings_secret, sign_ticket_key, verify_ticket_key,
+)
+
+User = get_user_model()
+
+
+class SignedTicketKeyTest(TestCase):
+    secret = b'test-secret'
+
+    def sign(self, **kwargs):
+        now = time.time()
+        params = {'purchase_key': uuid.uuid4(), 'offer_id': 7, 'not_before': now - 10, 'not_after': now + 10}
+        params.update(kwargs)
+        return params, sign_ticket_key(self.secret, **params)
+
+    def test_round_trip(self):
+        params, key = self.sign()
+        self.assertEqual(len(key), SIGNED_KEY_LENGTH)
+        self.assertTrue(is_signed_key(key))
+        signed = verify_ticket_key(self.secret, key)
+        self.assertEqual(signed.purchase_key, params['purchase_key'])
+        self.assertEqual(signed.offer_id, 7)
+
+    def test_tampered_key(self):
+        _, key = self.sign()
+        tampered = ('B' if key[5] == 'A' else 'A').join([key[:5], key[6:]])
+        with self.assertRaises(InvalidTicketKey):
+            verify_ticket_key(self.secret, tampered)
+        with self.assertRaises(InvalidTicketKey):
+            verify_ticket_key(b'other-secret', key)
+
+    def test_outside_validity_window(self):
+        now = time.time()
+        _, key = self.sign(not_before=now - 20, not_after=now - 10)
+        with self.assertRaises(InvalidTicketKey):
+            verify_ticket_key(self.secret, key)
+
+
+class SigningKeyConfigurationTest(TestCase):
+    settings_path = Path(settings.BASE_DIR) / 'config' / 'settings.py'
+
+    def load_settings(self, **environ):
+        with mock.patch.dict('os.environ', environ):
+            return runpy.run_path(str(self.settings_path))
+
+    def test_signed_format_requires_signing_key(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.load_settings(TICKET_KEY_FORMAT='signed', TICKET_SIGNING_KEY='')
+        loaded = self.load_settings(TICKET_KEY_FORMAT='signed', TICKET_SIGNING_KEY='gate-secret')
+        self.assertEqual(loaded['TICKET_SIGNING_KEY'], 'gate-secret')
+
+    def test_signing_key_must_differ_from_secret_key(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.load_settings(TICKET_SIGNING_KEY=settings.SECRET_KEY)
+
+    def test_settings_secret_refuses_secret_key(self):
+        with override_settings(TICKET_SIGNING_KEY=''), self.assertRaises(ImproperlyConfigured):
+            settings_secret()
+        with override_settings(TICKET_SIGNING_KEY=settings.SECRET_KEY), self.assertRaises(ImproperlyConfigured):
+            settings_secret()
+
+
+@override_settings(TICKET_KEY_FORMAT='signed', TICKET_SIGNING_KEY='test-ticket-signing-key')
+class SignedTicketModelTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='signed@example.com', password='testpass123')
+        self.offer = TicketOffer.objects.create(name="Test Offer", price=100.00, offer_type="SOLO")
+
+    def test_ticket_gets_signed_key(self):
+        ticket = Ticket.objects.create(user=self.user, offer=self.offer)
+        signed = verify_ticket_key(settings_secret(), ticket.final_key)
+        self.assertEqual(signed.purchase_key, ticket.purchase_key)
+        self.assertEqual(signed.offer_id, self.offer.id)
+
+    def test_forged_key_rejected_without_query(self):
+        admin = User.objects.create_user(email='admin@example.com', password='testpass123', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        now = time.time()
+        forged = sign_ticket_key(b'wrong-secret', uuid.uuid4(), self.offer.id, now - 10, now + 10)
+        with self.assertNumQueries(0):
+            response = client.post('/api/admin/verify-ticket/', {'final_key': forged}, format='json')
+        self.assertEqual(response.status_code, 404)
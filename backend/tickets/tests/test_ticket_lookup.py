@@ -0,0 +1,104 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from tickets.bloom import BloomFilter, TicketKeyFilter, ticket_key_filter
+from tickets.models import Ticket, TicketOffer
+
+User = get_user_model()
+
+
+class BloomFilterTest(TestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        keys = [f"key-{i}" for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+        false_positives = sum(f"other-{i}" in bloom for i in range(1000))
+        self.assertLess(false_positives, 50)
+
+    def test_duplicate_keys_counted_once(self):
+        bloom = BloomFilter(10)
+        bloom.add('a')
+        bloom.add('a')
+        self.assertEqual(bloom.count, 1)
+
+
+class AdminVerifyTicketLookupTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@example.com', password='testpass123', is_staff=True)
+        user = User.objects.create_user(email='user@example.com', password='testpass123')
+        offer = TicketOffer.objects.create(name="Test Offer", price=100.00, offer_type="SOLO")
+        ticket_key_filter.rebuild()
+        self.ticket = Ticket.objects.create(user=user, offer=offer)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_new_ticket_is_found(self):
+        response = self.client.post('/api/admin/verify-ticket/', {'final_key': self.ticket.final_key}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['ticket_id'], self.ticket.id)
+
+    def test_unknown_key_rejected_without_query(self):
+        with self.assertNumQueries(0):
+            response = self.client.post('/api/admin/verify-ticket/', {'final_key': 'forged-key'}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.data['valid'])
+
+    def test_refresh_picks_up_tickets_from_other_workers(self):
+        # Ticket acheté via un autre worker : absent du filtre jusqu'au rafraîchissement
+        Ticket.objects.filter(pk=self.ticket.pk).update(final_key='other-worker-key', updated_at=timezone.now())
+        response = self.client.post('/api/admin/verify-ticket/', {'final_key': 'other-worker-key'}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+        ticket_key_filter.refresh()
+        response = self.client.post('/api/admin/verify-ticket/', {'final_key': 'other-worker-key'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['ticket_id'], self.ticket.id)
+
+    def test_filter_not_built_falls_back_to_lookup(self):
+        filter_ = TicketKeyFilter()
+        self.assertTrue(filter_.might_contain('forged-key'))
+        filter_.rebuild()
+        self.assertFalse(filter_.might_contain('forged-key'))
+        self.assertTrue(filter_.might_contain(self.ticket.final_key))
+
+
+@override_settings(TICKET_VERIFY_BATCH_MAX=5)
+class AdminVerifyTicketsBatchTest(TestCase):
+    url = '/api/admin/verify-tickets/batch/'
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@example.com', password='testpass123', is_staff=True)
+        user = User.objects.create_user(email='user@example.com', password='testpass123')
+        offer = TicketOffer.objects.create(name="Test Offer", price=100.00, offer_type="SOLO")
+        ticket_key_filter.rebuild()
+        self.tickets = [Ticket.objects.create(user=user, offer=offer) for _ in range(3)]
+        self.tickets[2].is_used = True
+        self.tickets[2].save()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_results_in_input_order(self):
+        keys = [self.tickets[1].final_key, 'forged-key', self.tickets[0].final_key]
+        with self.assertNumQueries(1):
+            response = self.client.post(self.url, {'final_keys': keys}, format='json')
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual([r['final_key'] for r in results], keys)
+        self.assertEqual([r['valid'] for r in results], [True, False, True])
+        self.assertEqual(results[0]['ticket_id'], self.tickets[1].id)
+
+    def test_validate_marks_unused_tickets(self):
+        keys = [ticket.final_key for ticket in self.tickets] + [self.tickets[0].final_key]
+        response = self.client.post(self.url, {'final_keys': keys, 'validate': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['validated'] for r in response.data['results']], [True, True, False, False])
+        self.assertEqual([r['is_used'] for r in response.data['results']], [True, True, True, True])
+        self.assertEqual(Ticket.objects.filter(is_used=True).count(), 3)
+
+    def test_batch_size_limit(self):
+        response = self.client.post(self.url, {'final_keys': ['k'] * 6}, format='json')
+        self.assertEqual(response.status_code, 400)
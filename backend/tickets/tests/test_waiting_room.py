@@ -0,0 +1,104 @@
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from tickets import waiting_room
+from tickets.models import TicketOffer
+from tickets.waiting_room import MemoryBackend, SQLiteBackend
+
+User = get_user_model()
+
+
+class BackendTest(TestCase):
+    def check_backend(self, backend):
+        for expected in (1, 2, 3, 4, 5):
+            self.assertEqual(backend.join('q'), expected)
+        # Premier passage : une rafale au plus
+        self.assertEqual(backend.admit('q', rate=2, burst=2, now=100.0), 2)
+        self.assertEqual(backend.admit('q', rate=2, burst=2, now=100.5), 3)
+        # Une longue pause ne laisse entrer qu'une rafale, jamais plus que les positions distribuées
+        self.assertEqual(backend.admit('q', rate=2, burst=2, now=200.0), 5)
+        self.assertEqual(backend.admit('q', rate=2, burst=2, now=300.0), 5)
+
+    def check_claims(self, backend):
+        self.assertTrue(backend.claim('q', 5, floor=0))
+        self.assertFalse(backend.claim('q', 5, floor=0))
+        backend.release('q', 5)
+        self.assertTrue(backend.claim('q', 5, floor=0))
+        # Les réservations expirées sont oubliées
+        self.assertTrue(backend.claim('q', 20, floor=10))
+        self.assertTrue(backend.claim('q', 5, floor=0))
+
+    def test_memory_backend(self):
+        self.check_backend(MemoryBackend())
+        self.check_claims(MemoryBackend())
+
+    def test_sqlite_backend(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.check_backend(SQLiteBackend(Path(directory) / 'queue.sqlite3'))
+            self.check_claims(SQLiteBackend(Path(directory) / 'passes.sqlite3'))
+
+
+@override_settings(
+    WAITING_ROOM_ENABLED=True,
+    WAITING_ROOM_BACKEND='tickets.waiting_room.MemoryBackend',
+    WAITING_ROOM_RATE=1,
+    WAITING_ROOM_BURST=1,
+)
+class WaitingRoomViewTest(TestCase):
+    def setUp(self):
+        waiting_room.reset_backend()
+        self.addCleanup(waiting_room.reset_backend)
+        self.user = User.objects.create_user(email='user@example.com', password='testpass123')
+        self.offer = TicketOffer.objects.create(name="Solo", price=50.00, offer_type="SOLO", description="")
+        self.client = APIClient()
+
+    def purchase(self, token=None):
+        self.client.force_authenticate(self.user)
+        headers = {'HTTP_X_QUEUE_TOKEN': token} if token else {}
+        return self.client.post('/api/tickets/purchase/', {'offer_id': self.offer.id}, format='json', **headers)
+
+    def test_status_never_touches_database(self):
+        token = self.client.post('/api/waiting-room/join/').data['token']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/waiting-room/status/', HTTP_X_QUEUE_TOKEN=token)
+        self.assertEqual(response.status_code, 200)
+
+    def test_purchase_requires_admitted_token(self):
+        self.assertEqual(self.purchase().status_code, 403)
+        self.assertEqual(self.purchase('forged').status_code, 403)
+
+        first = self.client.post('/api/waiting-room/join/').data
+        second = self.client.post('/api/waiting-room/join/').data
+        self.assertTrue(first['admitted'])
+        self.assertFalse(second['admitted'])
+        self.assertEqual(second['ahead'], 1)
+
+        response = self.purchase(second['token'])
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(self.purchase(first['token']).status_code, 201)
+
+    def test_pass_allows_a_single_purchase(self):
+        token = self.client.post('/api/waiting-room/join/').data['token']
+        self.assertEqual(self.purchase(token).status_code, 201)
+        response = self.purchase(token)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data['error'], "Passage déjà utilisé, rejoignez à nouveau la file")
+
+    def test_failed_purchase_keeps_pass(self):
+        token = self.client.post('/api/waiting-room/join/').data['token']
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            '/api/tickets/purchase/', {'offer_id': 'x'}, format='json', HTTP_X_QUEUE_TOKEN=token,
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.purchase(token).status_code, 201)
+
+    @override_settings(WAITING_ROOM_ENABLED=False)
+    def test_disabled_room_lets_purchases_through(self):
+        self.assertEqual(self.purchase().status_code, 201)
+        self.assertFalse(self.client.post('/api/waiting-room/join/').data['enabled'])
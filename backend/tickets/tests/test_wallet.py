@@ -0,0 +1,148 @@
+import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from tickets import qr, tasks, wallet
+from tickets.models import Ticket, TicketOffer
+
+User = get_user_model()
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    SALES_COUNTER_STRICT=True,
+)
+class WalletTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(email='admin@example.com', password='testpass123', is_staff=True)
+        self.user = User.objects.create_user(email='user@example.com', password='testpass123')
+        self.other = User.objects.create_user(email='other@example.com', password='testpass123')
+        self.offer = TicketOffer.objects.create(name="Solo", price=50.00, offer_type="SOLO", description="")
+        self.tickets = [Ticket.objects.create(user=self.user, offer=self.offer) for _ in range(3)]
+        Ticket.objects.create(user=self.other, offer=self.offer)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def wallet(self, **headers):
+        return self.client.get('/api/tickets/wallet/', **headers)
+
+    def test_wallet_is_one_query_then_cached(self):
+        with self.assertNumQueries(1):
+            response = self.wallet()
+        data = json.loads(response.content)
+        self.assertEqual([item['id'] for item in data], [ticket.id for ticket in reversed(self.tickets)])
+        self.assertEqual(data[0]['offer']['name'], "Solo")
+        self.assertEqual(data[0]['qr_code_url'], f'http://testserver/api/tickets/{self.tickets[-1].id}/qr-code/')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.wallet(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_purchase_and_validation_invalidate_wallet(self):
+        self.assertEqual(len(json.loads(self.wallet().content)), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/tickets/purchase/', {'offer_id': self.offer.id}, format='json')
+        self.assertEqual(len(json.loads(self.wallet().content)), 4)
+
+        self.client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/admin/tickets/{self.tickets[0].id}/validate/')
+        self.client.force_authenticate(self.user)
+        data = json.loads(self.wallet().content)
+        self.assertTrue(next(item for item in data if item['id'] == self.tickets[0].id)['is_used'])
+
+    def test_wallet_built_before_a_commit_is_not_kept(self):
+        wallet_data = wallet.wallet_data
+
+        def build_then_commit(*args):
+            stale = wallet_data(*args)
+            # Achat committé pendant que ce lecteur construit l'état d'avant
+            with self.captureOnCommitCallbacks(execute=True):
+                Ticket.objects.create(user=self.user, offer=self.offer)
+            return stale
+
+        with mock.patch('tickets.wallet.wallet_data', side_effect=build_then_commit):
+            self.assertEqual(len(json.loads(self.wallet().content)), 3)
+        self.assertEqual(len(json.loads(self.wallet().content)), 4)
+
+    def test_ticket_list_does_not_query_per_ticket(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/tickets/')
+        self.assertEqual(len(response.data), 3)
+
+    @override_settings(QR_RENDER_WORKERS=0)
+    def test_include_qr_inlines_codes(self):
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(QR_CACHE_DIR=cache_dir):
+            qr.memory_cache.clear()
+            data = json.loads(self.client.get('/api/tickets/wallet/?include=qr').content)
+            self.assertEqual(len(data), 3)
+            self.assertTrue(all(item['qr_code'].startswith('data:image/svg+xml;base64,') for item in data))
+
+            data = json.loads(self.client.get('/api/tickets/wallet/?include=qr&qr=png').content)
+            self.assertTrue(data[0]['qr_code'].startswith('data:image/png;base64,'))
+            # La variante sans QR reste servie séparément
+            self.assertNotIn('qr_code', json.loads(self.wallet().content)[0])
+
+        self.assertEqual(self.client.get('/api/tickets/wallet/?include=qr&qr=bmp').status_code, 400)
+
+
+class QRImagesTest(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        override = override_settings(QR_CACHE_DIR=self.cache_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        qr.memory_cache.clear()
+
+    def test_misses_are_rendered_in_pool_and_cached(self):
+        keys = [f'key-{i}' for i in range(4)]
+        qr.get_qr_image(keys[0], 'svg')
+
+        with ThreadPoolExecutor(2) as executor, \
+                mock.patch.object(tasks, 'get_executor', return_value=executor), \
+                mock.patch.object(executor, 'submit', wraps=executor.submit) as submit:
+            images = tasks.get_qr_images(keys, 'svg')
+
+        self.assertEqual(submit.call_count, 3)
+        self.assertEqual(images, {key: qr.render_qr_svg(key) for key in keys})
+        self.assertEqual(qr.cached_qr_image(keys[3], 'svg'), images[keys[3]])
+
+    @override_settings(QR_RENDER_WORKERS=0, QR_RENDER_THREADS=2)
+    def test_thread_pool_without_process_pool(self):
+        executor = tasks.get_executor()
+        self.assertIsInstance(executor, ThreadPoolExecutor)
+
+        keys = [f'key-{i}' for i in range(3)]
+        with mock.patch.object(executor, 'submit', wraps=executor.submit) as submit:
+            images = tasks.get_qr_images(keys, 'svg')
+        self.assertEqual(submit.call_count, 3)
+        self.assertEqual(images, {key: qr.render_qr_svg(key) for key in keys})
+
+    @override_settings(QR_RENDER_WORKERS=0, QR_RENDER_THREADS=2)
+    def test_purchase_prerenders_in_thread_pool(self):
+        executor = tasks.get_executor()
+        futures = []
+
+        def submit(*args):
+            futures.append(ThreadPoolExecutor.submit(executor, *args))
+            return futures[-1]
+
+        with mock.patch.object(executor, 'submit', side_effect=submit):
+            with self.captureOnCommitCallbacks(execute=True):
+                tasks.queue_qr_render(1, 'purchased-key')
+        self.assertEqual(len(futures), 1)
+        self.assertEqual(futures[0].result(timeout=10), 1)
+        self.assertIsNotNone(qr.read_from_disk('purchased-key', 'png'))
+
+    @override_settings(QR_RENDER_WORKERS=0, QR_RENDER_THREADS=0)
+    def test_no_pool_renders_in_place(self):
+        self.assertIsNone(tasks.get_executor())
+        self.assertEqual(tasks.get_qr_images(['a', 'b'], 'svg'), {'a': qr.render_qr_svg('a'), 'b': qr.render_qr_svg('b')})
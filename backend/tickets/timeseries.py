@@ -0,0 +1,113 @@
+"""Série temporelle des ventes, pré-agrégée par tranches (SalesBucket).
+
+Les achats incrémentent la tranche de la minute courante. Les minutes
+anciennes sont repliées en heures, puis les heures anciennes en jours :
+une plage se lit donc en O(tranches), jamais en O(tickets).
+"""
+from collections import OrderedDict
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import SalesBucket
+from .writebehind import sales_counters
+
+# Chaque granularité et celle dans laquelle elle est repliée
+COMPACTION = [
+    (SalesBucket.MINUTE, SalesBucket.HOUR),
+    (SalesBucket.HOUR, SalesBucket.DAY),
+]
+
+
+def truncate(moment, granularity):
+    moment = moment.astimezone(dt_timezone.utc).replace(second=0, microsecond=0)
+    if granularity in (SalesBucket.HOUR, SalesBucket.DAY):
+        moment = moment.replace(minute=0)
+    if granularity == SalesBucket.DAY:
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def add_to_bucket(offer_id, granularity, bucket_start, sales_count, revenue):
+    bucket = SalesBucket.objects.filter(offer_id=offer_id, granularity=granularity, bucket_start=bucket_start)
+    updates = {'sales_count': F('sales_count') + sales_count, 'revenue': F('revenue') + revenue}
+    if bucket.update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            SalesBucket.objects.create(
+                offer_id=offer_id, granularity=granularity, bucket_start=bucket_start,
+                sales_count=sales_count, revenue=revenue,
+            )
+    except IntegrityError:
+        bucket.update(**updates)
+
+
+def record_sales_bucket(offer, count=1, at=None):
+    """À appeler dans la transaction de l'achat (différé au commit, voir tickets.writebehind)."""
+    bucket_start = truncate(at or timezone.now(), SalesBucket.MINUTE)
+    if sales_counters.strict:
+        add_to_bucket(offer.id, SalesBucket.MINUTE, bucket_start, count, offer.price * count)
+        return
+    sales_counters.record([
+        (('bucket', offer.id, bucket_start, 'sales_count'), count),
+        (('bucket', offer.id, bucket_start, 'revenue'), offer.price * count),
+    ])
+
+
+def retention(granularity):
+    if granularity == SalesBucket.MINUTE:
+        return timedelta(hours=settings.SALES_BUCKET_MINUTE_RETENTION_HOURS)
+    return timedelta(days=settings.SALES_BUCKET_HOUR_RETENTION_DAYS)
+
+
+def compact(now=None):
+    """Replie les tranches plus anciennes que leur rétention. Retourne le nombre de tranches repliées."""
+    now = now or timezone.now()
+    compacted = 0
+    for source, target in COMPACTION:
+        # La coupure est alignée sur la granularité cible : une tranche cible
+        # n'est jamais alimentée à moitié
+        cutoff = truncate(now - retention(source), target)
+        with transaction.atomic():
+            expired = SalesBucket.objects.filter(granularity=source, bucket_start__lt=cutoff)
+            buckets = list(expired.select_for_update().order_by('offer_id', 'bucket_start'))
+            totals = OrderedDict()
+            for bucket in buckets:
+                key = (bucket.offer_id, truncate(bucket.bucket_start, target))
+                sales_count, revenue = totals.get(key, (0, 0))
+                totals[key] = (sales_count + bucket.sales_count, revenue + bucket.revenue)
+            for (offer_id, bucket_start), (sales_count, revenue) in totals.items():
+                add_to_bucket(offer_id, target, bucket_start, sales_count, revenue)
+            expired.delete()
+        compacted += len(buckets)
+    return compacted
+
+
+def series(granularity, start, end, offer_id=None):
+    """Points [(début de tranche, ventes, revenu)] entre start (inclus) et end (exclu).
+
+    Les tranches plus fines sont regroupées à la granularité demandée ; les
+    périodes déjà compactées n'existent qu'à leur granularité plus grossière
+    et apparaissent au début de leur tranche.
+    """
+    # Toutes les granularités lues : condition explicite sur la première colonne
+    # de sales_bucket_range_idx, sinon l'index (granularity, bucket_start) est ignoré
+    buckets = SalesBucket.objects.filter(
+        granularity__in=[value for value, _ in SalesBucket.GRANULARITIES],
+        bucket_start__gte=truncate(start, granularity),
+        bucket_start__lt=end,
+    )
+    if offer_id is not None:
+        buckets = buckets.filter(offer_id=offer_id)
+
+    points = {}
+    for bucket_start, sales_count, revenue in buckets.values_list('bucket_start', 'sales_count', 'revenue'):
+        key = truncate(bucket_start, granularity)
+        total_sales, total_revenue = points.get(key, (0, 0))
+        points[key] = (total_sales + sales_count, total_revenue + revenue)
+
+    return [(key, sales_count, revenue) for key, (sales_count, revenue) in sorted(points.items())]
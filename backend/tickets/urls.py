@@ -21,8 +21,15 @@ from .views import (
     ticket_qr_code,
     admin_dashboard,
     admin_sales_stats,
+    admin_sales_timeseries,
     AdminTicketOfferViewSet,
     admin_verify_ticket,
+    admin_verify_tickets_batch,
+    gate_sync_snapshot,
+    gate_sync_delta,
+    waiting_room_join,
+    waiting_room_status,
+    admin_hashing_stats,
 )
 
 
@@ -132,6 +139,15 @@ urlpatterns = [
     path('api/admin/tickets/',TicketViewSet.as_view({'get': 'admin_tickets'}), name='admin-tickets-list'),
     path('api/admin/tickets/<int:pk>/validate/',TicketViewSet.as_view({'post': 'validate_ticket'}),name='admin-validate-ticket'),
     path('api/admin/verify-ticket/', admin_verify_ticket, name='admin-verify-ticket'),
+    path('api/admin/verify-tickets/batch/', admin_verify_tickets_batch, name='admin-verify-tickets-batch'),
+
+    # Synchronisation des portiques hors ligne
+    path('api/admin/gate-sync/snapshot/', gate_sync_snapshot, name='gate-sync-snapshot'),
+    path('api/admin/gate-sync/delta/', gate_sync_delta, name='gate-sync-delta'),
+
+    # Salle d'attente devant l'achat
+    path('api/waiting-room/join/', waiting_room_join, name='waiting-room-join'),
+    path('api/waiting-room/status/', waiting_room_status, name='waiting-room-status'),
 
     # Routes pour la gestion admin des offres
     path('api/admin/offers/',AdminTicketOfferViewSet.as_view({'get': 'list', 'post': 'create'}),name='admin-offers-list'),
@@ -142,6 +158,8 @@ urlpatterns = [
     # Routes ADMIN pour le dashboard
     path('api/admin/dashboard/', admin_dashboard, name='admin-dashboard'),
     path('api/admin/sales-stats/', admin_sales_stats, name='admin-sales-stats'),
+    path('api/admin/sales-timeseries/', admin_sales_timeseries, name='admin-sales-timeseries'),
+    path('api/admin/hashing-stats/', admin_hashing_stats, name='admin-hashing-stats'),
 
 
     #route pour outrepasser le shell
@@ -2,54 +2,72 @@ from rest_framework.generics import RetrieveAPIView
 from rest_framework import viewsets, permissions, status, generics
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from .models import User, TicketOffer, Ticket, AdminStats
-from .serializers import UserSerializer, TicketOfferSerializer, TicketSerializer, AdminStatsSerializer, CurrentUserSerializer
+from rest_framework.exceptions import APIException, NotFound
+from .models import User, TicketOffer, Ticket, SalesRollup, SalesBucket
+from .serializers import UserSerializer, TicketOfferSerializer, TicketSerializer, CurrentUserSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Sum
-from django.db import models
-from rest_framework.decorators import api_view, permission_classes
-from io import BytesIO
-import qrcode
-from django.http import HttpResponse
+from django.db.models import Sum
+from django.db import models, transaction
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.decorators import api_view, permission_classes, renderer_classes, authentication_classes
+from django.http import HttpResponse, Http404, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
 from django.views.decorators.csrf import csrf_exempt
+import csv
+from datetime import timedelta
+import json
 import logging
+from .qr import get_qr_image, qr_etag, etag_matches, QR_CACHE_CONTROL, CONTENT_TYPES as QR_CONTENT_TYPES
+from .renderers import QRCodePNGRenderer, QRCodeSVGRenderer, QRCodeMatrixRenderer
+from .rollups import record_check_ins
+from .timeseries import series as sales_series
+from .bloom import ticket_key_filter
+from .sync import InvalidCursor, decode_cursor, encode_cursor, iter_binary, iter_ndjson, key_digest, settled_watermark
+from .signing import is_signed_key, verify_ticket_key, settings_secret, InvalidTicketKey
+from .stock import SoldOut, provision as provision_stock
+from .decorators import idempotent, waiting_room_required
+from .waiting_room import InvalidQueueToken, issue_token, queue_status
+from .purchasing import InvalidPurchase, OfferNotFound, parse_items, purchase_tickets
+from . import catalog as offer_catalog
+from .wallet import get_wallet, invalidate_wallets
+from .writebehind import last_logins
+from .hashing import get_pool as get_hashing_pool
 
 logger = logging.getLogger(__name__)
 
 @api_view(['GET'])
+@renderer_classes([QRCodePNGRenderer, QRCodeSVGRenderer, QRCodeMatrixRenderer])
 @csrf_exempt
 def ticket_qr_code(request, ticket_id):
+    """QR code du ticket en PNG, SVG ou matrice compacte (?format= ou en-tête Accept)"""
     try:
-        from .models import Ticket
+        final_key = Ticket.objects.filter(id=ticket_id).values_list('final_key', flat=True).first()
 
-        ticket = Ticket.objects.get(id=ticket_id)
+        if final_key is None:
+            return HttpResponse('Ticket non trouvé', status=404)
 
         # Vérifier que la final_key existe
-        if not ticket.final_key:
+        if not final_key:
             return HttpResponse('Pas de final_key', status=500)
 
-        # Générer le QR code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(ticket.final_key)
-        qr.make(fit=True)
-
-        img = qr.make_image(fill_color="black", back_color="white")
+        qr_format = request.accepted_renderer.format
 
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
+        # La clé ne change jamais : le client peut revalider sans rien télécharger
+        etag = qr_etag(final_key, qr_format)
+        if etag_matches(request.META.get('HTTP_IF_NONE_MATCH'), etag):
+            response = HttpResponse(status=304)
+        else:
+            response = HttpResponse(get_qr_image(final_key, qr_format), content_type=QR_CONTENT_TYPES[qr_format])
 
-        return HttpResponse(buffer.getvalue(), content_type='image/png')
+        response['ETag'] = etag
+        response['Cache-Control'] = QR_CACHE_CONTROL
+        patch_vary_headers(response, ['Accept'])
+        return response
 
-    except Ticket.DoesNotExist:
-        return HttpResponse('Ticket non trouvé', status=404)
     except Exception as e:
         return HttpResponse(f'Erreur: {str(e)}', status=500)
 
@@ -85,6 +103,7 @@ class UserViewSet(viewsets.ModelViewSet):
             print("Échec auth. User exists?", User.objects.filter(email=email).exists())
             return Response({'error': 'Identifiants invalides'}, status=401)
 
+        last_logins.record(user)
         refresh = RefreshToken.for_user(user)
         return Response({
             'access': str(refresh.access_token),
@@ -113,6 +132,70 @@ class TicketOfferViewSet(viewsets.ModelViewSet):
             return [permissions.IsAdminUser()]
         return super().get_permissions()
 
+    def list(self, request, *args, **kwargs):
+        """Catalogue servi depuis le cache, en JSON déjà encodé (voir tickets.catalog)"""
+        catalog = offer_catalog.get_catalog()
+        if offer_catalog.not_modified(request, catalog):
+            response = HttpResponse(status=304)
+        else:
+            response = HttpResponse(catalog.body, content_type='application/json')
+        return offer_catalog.apply_headers(response, catalog)
+
+    def perform_create(self, serializer):
+        offer = serializer.save()
+        provision_stock(offer)
+
+    def perform_update(self, serializer):
+        offer = serializer.save()
+        if 'capacity' in serializer.validated_data:
+            provision_stock(offer)
+
+
+def admin_ticket_data(ticket):
+    return {
+        'ticket_id': ticket.id,
+        'user': {
+            'id': ticket.user.id,
+            'email': ticket.user.email,
+            'first_name': ticket.user.first_name,
+            'last_name': ticket.user.last_name,
+        },
+        'offer': {
+            'name': ticket.offer.name,
+            'type': ticket.offer.get_offer_type_display(),
+            'price': float(ticket.offer.price)
+        },
+        'purchase_date': ticket.purchase_date.isoformat(),
+        'is_used': ticket.is_used,
+        'final_key_preview': str(ticket.final_key)[:20] + '...' if ticket.final_key else None,
+        'qr_code_url': ticket.get_qr_code_url()
+    }
+
+
+class _Echo:
+    """Pseudo-fichier pour csv.writer : renvoie la ligne au lieu de l'écrire"""
+    def write(self, value):
+        return value
+
+
+def iter_admin_tickets_csv(tickets):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([
+        'ticket_id', 'user_id', 'email', 'first_name', 'last_name',
+        'offer', 'offer_type', 'price', 'purchase_date', 'is_used',
+    ])
+    for ticket in tickets:
+        yield writer.writerow([
+            ticket.id, ticket.user.id, ticket.user.email, ticket.user.first_name, ticket.user.last_name,
+            ticket.offer.name, ticket.offer.offer_type, ticket.offer.price,
+            ticket.purchase_date.isoformat(), ticket.is_used,
+        ])
+
+
+class OfferSoldOut(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Offre épuisée'
+
 
 class TicketViewSet(viewsets.ModelViewSet):
     serializer_class = TicketSerializer
@@ -121,102 +204,174 @@ class TicketViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         if self.request.user.is_staff:
-            return Ticket.objects.all()
-        return Ticket.objects.filter(user=self.request.user)
+            return Ticket.objects.select_related('offer')
+        return Ticket.objects.filter(user=self.request.user).select_related('offer')
+
+    @action(detail=False, methods=['get'])
+    def wallet(self, request):
+        """Tickets de l'utilisateur : une requête jointe, réponse en cache jusqu'au prochain achat ou validation
+
+        ?include=qr inclut les QR codes en data URI (?qr=svg par défaut, ou png).
+        """
+        qr_format = None
+        if 'qr' in request.query_params.get('include', '').split(','):
+            qr_format = request.query_params.get('qr', 'svg')
+            if qr_format not in ('svg', 'png'):
+                return Response({'error': 'Format de QR code invalide (svg ou png)'}, status=status.HTTP_400_BAD_REQUEST)
+
+        etag, body = get_wallet(request.user.id, request.build_absolute_uri('/'), qr_format)
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            response = HttpResponse(status=304)
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+    def admin_tickets_queryset(self, request):
+        """Tickets filtrés par offre, statut et période d'achat (lève ValueError si invalide)"""
+        tickets = Ticket.objects.select_related('user', 'offer').only(
+            'id', 'final_key', 'is_used', 'purchase_date',
+            'user__id', 'user__email', 'user__first_name', 'user__last_name',
+            'offer__name', 'offer__offer_type', 'offer__price',
+        )
+        params = request.query_params
+
+        if params.get('offer'):
+            tickets = tickets.filter(offer_id=int(params['offer']))
+        if params.get('is_used'):
+            tickets = tickets.filter(is_used=params['is_used'].lower() in ('true', '1'))
+        for param, lookup in (('purchased_after', 'purchase_date__gte'), ('purchased_before', 'purchase_date__lt')):
+            if params.get(param):
+                value = parse_datetime(params[param])
+                if value is None:
+                    raise ValueError(param)
+                tickets = tickets.filter(**{lookup: value})
 
+        return tickets.order_by('id')
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
     def admin_tickets(self, request):
-        """Route admin pour voir tous les tickets"""
-        tickets = Ticket.objects.select_related('user', 'offer').all()
-        tickets_data = []
-
-        for ticket in tickets:
-            tickets_data.append({
-                'ticket_id': ticket.id,
-                'user': {
-                    'id': ticket.user.id,
-                    'email': ticket.user.email,
-                    'first_name': ticket.user.first_name,
-                    'last_name': ticket.user.last_name,
-                },
-                'offer': {
-                    'name': ticket.offer.name,
-                    'type': ticket.offer.get_offer_type_display(),
-                    'price': float(ticket.offer.price)
-                },
-                'purchase_date': ticket.purchase_date.isoformat(),
-                'is_used': ticket.is_used,
-                'final_key_preview': str(ticket.final_key)[:20] + '...' if ticket.final_key else None,
-                'qr_code_url': ticket.qr_code.url if ticket.qr_code else None
-            })
+        """Route admin pour voir tous les tickets (pagination par curseur, export ndjson/csv en flux)"""
+        try:
+            tickets = self.admin_tickets_queryset(request)
+            cursor = int(request.query_params.get('cursor', 0))
+            limit = int(request.query_params.get('limit', settings.ADMIN_TICKETS_PAGE_SIZE))
+        except ValueError:
+            return Response({'error': 'Paramètres invalides'}, status=status.HTTP_400_BAD_REQUEST)
+
+        export = request.query_params.get('export')
+        if export:
+            # Export complet : itération par paquets, jamais toute la table en mémoire
+            rows = tickets.filter(id__gt=cursor).iterator(chunk_size=settings.ADMIN_TICKETS_EXPORT_CHUNK_SIZE)
+            if export == 'ndjson':
+                content = (json.dumps(admin_ticket_data(ticket)) + '\n' for ticket in rows)
+                return StreamingHttpResponse(content, content_type='application/x-ndjson')
+            if export == 'csv':
+                response = StreamingHttpResponse(iter_admin_tickets_csv(rows), content_type='text/csv')
+                response['Content-Disposition'] = 'attachment; filename="tickets.csv"'
+                return response
+            return Response({'error': 'Export inconnu (ndjson ou csv)'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Pagination par curseur (id) : coût constant quelle que soit la page
+        limit = max(1, min(limit, settings.ADMIN_TICKETS_MAX_PAGE_SIZE))
+        page = list(tickets.filter(id__gt=cursor)[:limit + 1])
+        next_cursor = page[limit - 1].id if len(page) > limit else None
 
-        return Response({'tickets': tickets_data})
+        return Response({
+            'tickets': [admin_ticket_data(ticket) for ticket in page[:limit]],
+            'next_cursor': next_cursor,
+        })
 
 
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    @idempotent
     def validate_ticket(self, request, pk=None):
         """Valider un ticket (marquer comme utilisé)"""
-        ticket = self.get_object()
+        # Un seul UPDATE conditionnel : deux portiques ne peuvent pas valider le même ticket
+        try:
+            ticket_id = int(pk)
+        except (TypeError, ValueError):
+            raise Http404
 
-        if ticket.is_used:
+        checked_in = check_in_ticket(ticket_id)
+        if checked_in is None:
+            get_object_or_404(Ticket.objects.only('id'), pk=pk)
             return Response({'error': 'Ticket déjà utilisé'}, status=status.HTTP_400_BAD_REQUEST)
 
-        ticket.is_used = True
-        ticket.save()
-
         return Response({
             'message': 'Ticket validé avec succès',
-            'ticket_id': ticket.id,
-            'user': f"{ticket.user.first_name} {ticket.user.last_name}",
-            'offer': ticket.offer.name
+            'ticket_id': checked_in.ticket_id,
+            'user': f"{checked_in.first_name} {checked_in.last_name}",
+            'offer': checked_in.offer_name
         })
 
 
     def perform_create(self, serializer):
-        offer = get_object_or_404(TicketOffer, id=self.request.data.get('offer_id'))
-
-
-        serializer.context.update({
-            'offer': offer,
-            'user': self.request.user,
-            'request': self.request
-        })
-
-
-        ticket = serializer.save()
-
-
-        stats, created = AdminStats.objects.get_or_create(offer=offer)
-        stats.sales_count += 1
-        stats.save()
-
-
-
+        """POST /api/tickets/ : même pipeline que purchase"""
+        try:
+            serializer.instance = purchase_tickets(self.request.user, {int(self.request.data.get('offer_id')): 1})[0]
+        except (TypeError, ValueError, OfferNotFound):
+            raise NotFound('Offre introuvable')
+        except SoldOut:
+            raise OfferSoldOut()
 
     @action(detail=False, methods=['post'])
+    @idempotent
+    @waiting_room_required
     def purchase(self, request):
+        """Achat d'un ticket : lecture de l'offre, INSERT ... RETURNING du ticket et
+        incrément des compteurs, dans une seule transaction (voir tickets.purchasing)"""
+        try:
+            offer_id = int(request.data.get('offer_id'))
+        except (TypeError, ValueError):
+            return Response({'error': 'offer_id invalide'}, status=status.HTTP_400_BAD_REQUEST)
 
-        offer = get_object_or_404(TicketOffer, id=request.data.get('offer_id'))
-
-
-        serializer = self.get_serializer(data={
-            'offer': offer.id,
-            'user': request.user.id
-        })
-        serializer.is_valid(raise_exception=True)
-
-
-        self.perform_create(serializer)
-        ticket = serializer.instance
+        try:
+            ticket, = purchase_tickets(request.user, {offer_id: 1})
+        except OfferNotFound as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except SoldOut:
+            return Response({'error': 'Offre épuisée'}, status=status.HTTP_409_CONFLICT)
 
         return Response({
             'status': 'purchased',
             'ticket_id': ticket.id,
             'qr_code_url': ticket.get_qr_code_url(),
             'final_key': ticket.final_key,
-            'offer': offer.name
+            'offer': ticket.offer.name
+        }, status=201)
+
+    @action(detail=False, methods=['post'], url_path='purchase-batch')
+    @idempotent
+    @waiting_room_required
+    def purchase_batch(self, request):
+        """Achat de plusieurs tickets en une commande : [{offer_id, quantity}]"""
+        data = request.data.get('items') if isinstance(request.data, dict) else request.data
+        try:
+            items = parse_items(data)
+            tickets = purchase_tickets(request.user, items)
+        except InvalidPurchase as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except OfferNotFound as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except SoldOut:
+            return Response({'error': 'Offre épuisée'}, status=status.HTTP_409_CONFLICT)
+
+        return Response({
+            'status': 'purchased',
+            'tickets': [
+                {
+                    'ticket_id': ticket.id,
+                    'qr_code_url': ticket.get_qr_code_url(),
+                    'final_key': ticket.final_key,
+                    'offer': ticket.offer.name,
+                }
+                for ticket in tickets
+            ],
+            'total': float(sum(ticket.offer.price for ticket in tickets)),
         }, status=201)
 
     '''@action(detail=False, methods=['post'])
@@ -251,33 +406,15 @@ class AdminTicketOfferViewSet(viewsets.ModelViewSet):
 
     def list(self, request):
         """Liste toutes les offres avec statistiques pour l'admin"""
-        offers = TicketOffer.objects.all().annotate(
-            ticket_count=Count('ticket')
-        )
-
-        offers_data = []
-        for offer in offers:
-            offers_data.append({
-                'id': offer.id,
-                'name': offer.name,
-                'offer_type': offer.offer_type,
-                'offer_type_display': offer.get_offer_type_display(),
-                'description': offer.description,
-                'price': float(offer.price),
-                'available': offer.available,
-                'ticket_count': offer.ticket_count,
-                'revenue': float(offer.price * offer.ticket_count),
-                'created_at': offer.created_at.isoformat(),
-                'updated_at': offer.updated_at.isoformat(),
-            })
-
-        return Response({'offers': offers_data})
+        offers = TicketOffer.objects.select_related('sales_rollup')
+        return Response({'offers': [admin_offer_data(offer) for offer in offers]})
 
     def create(self, request):
         """Créer une nouvelle offre"""
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            offer = serializer.save()
+            provision_stock(offer)
             return Response({
                 'message': 'Offre créée avec succès',
                 'offer': serializer.data
@@ -290,6 +427,8 @@ class AdminTicketOfferViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(offer, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            if 'capacity' in serializer.validated_data:
+                provision_stock(offer)
             return Response({
                 'message': 'Offre modifiée avec succès',
                 'offer': serializer.data
@@ -331,6 +470,49 @@ class AdminTicketOfferViewSet(viewsets.ModelViewSet):
         return Response({'message': f'Offre "{offer_name}" supprimée définitivement'})
 
 
+def offer_rollup(offer):
+    """Compteurs de l'offre (chargés via select_related('sales_rollup')), ou None"""
+    try:
+        return offer.sales_rollup
+    except SalesRollup.DoesNotExist:
+        return None
+
+
+def admin_offer_data(offer):
+    rollup = offer_rollup(offer)
+    return {
+        'id': offer.id,
+        'name': offer.name,
+        'offer_type': offer.offer_type,
+        'offer_type_display': offer.get_offer_type_display(),
+        'description': offer.description,
+        'price': float(offer.price),
+        'available': offer.available,
+        'capacity': offer.capacity,
+        'ticket_count': rollup.sales_count if rollup else 0,
+        'revenue': float(rollup.revenue) if rollup else 0,
+        'created_at': offer.created_at.isoformat(),
+        'updated_at': offer.updated_at.isoformat(),
+    }
+
+
+def global_sales_stats():
+    """Totaux sur toutes les offres, lus dans les compteurs (une ligne par offre)"""
+    total_stats = SalesRollup.objects.aggregate(
+        total_tickets=Sum('sales_count'),
+        total_revenue=Sum('revenue'),
+        used_tickets=Sum('used_count')
+    )
+    total_tickets = total_stats['total_tickets'] or 0
+    used_tickets = total_stats['used_tickets'] or 0
+    return {
+        'total_tickets': total_tickets,
+        'total_revenue': float(total_stats['total_revenue']) if total_stats['total_revenue'] else 0,
+        'used_tickets': used_tickets,
+        'available_tickets': total_tickets - used_tickets
+    }
+
+
 @api_view(['GET'])
 def admin_sales_stats(request):
     """Statistiques des ventes pour les graphiques"""
@@ -338,15 +520,10 @@ def admin_sales_stats(request):
         return Response({'error': 'Accès non autorisé'}, status=status.HTTP_403_FORBIDDEN)
 
     try:
-        # Statistiques détaillées par offre
-        sales_by_offer = Ticket.objects.values(
-            'offer__id',
-            'offer__name',
-            'offer__offer_type'
-        ).annotate(
-            total_sales=Count('id'),
-            total_revenue=Sum('offer__price')
-        ).order_by('-total_sales')
+        # Statistiques détaillées par offre, depuis les compteurs
+        sales_by_offer = SalesRollup.objects.select_related('offer').filter(
+            sales_count__gt=0
+        ).order_by('-sales_count')
 
         # Préparer les données pour le graphique
         chart_labels = []
@@ -354,37 +531,29 @@ def admin_sales_stats(request):
         chart_revenue_data = []
         offers_details = []
 
-        for stat in sales_by_offer:
-            offer_name = f"{stat['offer__name']} ({stat['offer__offer_type']})"
-            chart_labels.append(offer_name)
-            chart_sales_data.append(stat['total_sales'])
-            chart_revenue_data.append(float(stat['total_revenue']) if stat['total_revenue'] else 0)
+        for rollup in sales_by_offer:
+            offer = rollup.offer
+            chart_labels.append(f"{offer.name} ({offer.offer_type})")
+            chart_sales_data.append(rollup.sales_count)
+            chart_revenue_data.append(float(rollup.revenue))
 
             offers_details.append({
-                'id': stat['offer__id'],
-                'name': stat['offer__name'],
-                'type': stat['offer__offer_type'],
-                'type_display': dict(TicketOffer.OFFER_TYPES).get(stat['offer__offer_type'], stat['offer__offer_type']),
-                'total_sales': stat['total_sales'],
-                'total_revenue': float(stat['total_revenue']) if stat['total_revenue'] else 0,
-                'average_revenue_per_sale': float(stat['total_revenue'] / stat['total_sales']) if stat[
-                                                                                                      'total_sales'] > 0 else 0
+                'id': offer.id,
+                'name': offer.name,
+                'type': offer.offer_type,
+                'type_display': offer.get_offer_type_display(),
+                'total_sales': rollup.sales_count,
+                'total_revenue': float(rollup.revenue),
+                'average_revenue_per_sale': float(rollup.revenue / rollup.sales_count)
             })
 
-        # Statistiques globales
-        total_stats = Ticket.objects.aggregate(
-            total_tickets=Count('id'),
-            total_revenue=Sum('offer__price'),
-            used_tickets=Count('id', filter=models.Q(is_used=True))
-        )
-
-        # Statistiques par type d'offre
-        stats_by_type = Ticket.objects.values(
+        # Statistiques par type d'offre : somme des quelques lignes de compteurs
+        stats_by_type = SalesRollup.objects.values(
             'offer__offer_type'
         ).annotate(
-            total_sales=Count('id'),
-            total_revenue=Sum('offer__price')
-        )
+            total_sales=Sum('sales_count'),
+            total_revenue=Sum('revenue')
+        ).filter(total_sales__gt=0)
 
         type_stats = {}
         for stat in stats_by_type:
@@ -393,6 +562,11 @@ def admin_sales_stats(request):
                 'total_revenue': float(stat['total_revenue']) if stat['total_revenue'] else 0
             }
 
+        global_stats = global_sales_stats()
+        global_stats['usage_rate'] = (
+            global_stats['used_tickets'] / global_stats['total_tickets'] * 100
+        ) if global_stats['total_tickets'] > 0 else 0
+
         return Response({
             'chart_data': {
                 'labels': chart_labels,
@@ -400,14 +574,7 @@ def admin_sales_stats(request):
                 'revenue': chart_revenue_data,
             },
             'offers_details': offers_details,
-            'global_stats': {
-                'total_tickets': total_stats['total_tickets'],
-                'total_revenue': float(total_stats['total_revenue']) if total_stats['total_revenue'] else 0,
-                'used_tickets': total_stats['used_tickets'],
-                'available_tickets': total_stats['total_tickets'] - total_stats['used_tickets'],
-                'usage_rate': (total_stats['used_tickets'] / total_stats['total_tickets'] * 100) if total_stats[
-                                                                                                        'total_tickets'] > 0 else 0
-            },
+            'global_stats': global_stats,
             'type_stats': type_stats
         })
 
@@ -422,50 +589,20 @@ def admin_dashboard(request):
         return Response({'error': 'Accès non autorisé'}, status=status.HTTP_403_FORBIDDEN)
 
     try:
-        # Récupérer les offres avec statistiques
-        offers = TicketOffer.objects.all().annotate(
-            ticket_count=Count('ticket')
-        )
-
-        offers_data = []
-        for offer in offers:
-            offers_data.append({
-                'id': offer.id,
-                'name': offer.name,
-                'offer_type': offer.offer_type,
-                'offer_type_display': offer.get_offer_type_display(),
-                'description': offer.description,
-                'price': float(offer.price),
-                'available': offer.available,
-                'ticket_count': offer.ticket_count,
-                'revenue': float(offer.price * offer.ticket_count),
-                'created_at': offer.created_at.isoformat(),
-                'updated_at': offer.updated_at.isoformat(),
-            })
+        # Récupérer les offres avec leurs compteurs (jointure sur une ligne par offre)
+        offers = TicketOffer.objects.select_related('sales_rollup')
+        offers_data = [admin_offer_data(offer) for offer in offers]
 
         # Statistiques pour les graphiques
-        sales_by_offer = Ticket.objects.values(
-            'offer__name'
-        ).annotate(
-            total_sales=Count('id'),
-            total_revenue=Sum('offer__price')
-        ).order_by('-total_sales')
-
         chart_labels = []
         chart_sales_data = []
         chart_revenue_data = []
 
-        for stat in sales_by_offer:
-            chart_labels.append(stat['offer__name'])
-            chart_sales_data.append(stat['total_sales'])
-            chart_revenue_data.append(float(stat['total_revenue']) if stat['total_revenue'] else 0)
-
-        # Statistiques globales
-        total_stats = Ticket.objects.aggregate(
-            total_tickets=Count('id'),
-            total_revenue=Sum('offer__price'),
-            used_tickets=Count('id', filter=models.Q(is_used=True))
-        )
+        for offer in sorted(offers_data, key=lambda o: -o['ticket_count']):
+            if offer['ticket_count']:
+                chart_labels.append(offer['name'])
+                chart_sales_data.append(offer['ticket_count'])
+                chart_revenue_data.append(offer['revenue'])
 
         return Response({
             'offers': offers_data,
@@ -474,17 +611,103 @@ def admin_dashboard(request):
                 'sales': chart_sales_data,
                 'revenue': chart_revenue_data,
             },
-            'global_stats': {
-                'total_tickets': total_stats['total_tickets'] or 0,
-                'total_revenue': float(total_stats['total_revenue']) if total_stats['total_revenue'] else 0,
-                'used_tickets': total_stats['used_tickets'] or 0,
-                'available_tickets': (total_stats['total_tickets'] or 0) - (total_stats['used_tickets'] or 0)
-            }
+            'global_stats': global_sales_stats()
         })
 
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET'])
+def admin_sales_timeseries(request):
+    """Vitesse de vente par minute / heure / jour, lue dans les tranches pré-agrégées"""
+    if not request.user.is_authenticated or not (request.user.is_staff or request.user.is_superuser):
+        return Response({'error': 'Accès non autorisé'}, status=status.HTTP_403_FORBIDDEN)
+
+    params = request.query_params
+    granularity = params.get('granularity', SalesBucket.HOUR)
+    if granularity not in dict(SalesBucket.GRANULARITIES):
+        return Response({'error': 'Granularité invalide (minute, hour ou day)'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        # parse_datetime : None si le format est invalide, ValueError si la date est impossible
+        end = parse_datetime(params['to']) if params.get('to') else timezone.now()
+        if end is None:
+            raise ValueError('to')
+        start = parse_datetime(params['from']) if params.get('from') else end - timedelta(days=1)
+        if start is None:
+            raise ValueError('from')
+    except ValueError:
+        return Response({'error': 'Dates invalides (ISO 8601)'}, status=status.HTTP_400_BAD_REQUEST)
+    if timezone.is_naive(start):
+        start = timezone.make_aware(start)
+    if timezone.is_naive(end):
+        end = timezone.make_aware(end)
+    if start >= end:
+        return Response({'error': 'from doit précéder to'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        offer_id = int(params['offer']) if params.get('offer') else None
+    except ValueError:
+        return Response({'error': 'Offre invalide'}, status=status.HTTP_400_BAD_REQUEST)
+
+    points = sales_series(granularity, start, end, offer_id=offer_id)
+    return Response({
+        'granularity': granularity,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'points': [
+            {'t': bucket_start.isoformat(), 'sales': sales_count, 'revenue': float(revenue)}
+            for bucket_start, sales_count, revenue in points
+        ],
+    })
+
+
+@api_view(['GET'])
+def admin_hashing_stats(request):
+    """Métriques du pool de hachage des mots de passe, propres au worker qui répond"""
+    if not request.user.is_authenticated or not (request.user.is_staff or request.user.is_superuser):
+        return Response({'error': 'Accès non autorisé'}, status=status.HTTP_403_FORBIDDEN)
+
+    pool = get_hashing_pool()
+    return Response({
+        'workers': pool.workers,
+        'max_pending': pool.max_pending,
+        'pending': pool.pending,
+        **pool.metrics.snapshot(),
+    })
+
+
+def check_in_ticket(ticket_id):
+    """Valide le ticket et met à jour compteurs et portefeuille ; None s'il est absent ou déjà utilisé"""
+    with transaction.atomic():
+        checked_in = Ticket.objects.check_in(ticket_id)
+        if checked_in is not None:
+            record_check_ins([checked_in.offer_id])
+            invalidate_wallets([checked_in.user_id])
+    return checked_in
+
+
+def ticket_verification_data(ticket):
+    """Données affichées au portique pour un ticket (user et offer déjà joints)"""
+    user = ticket.user
+    return {
+        'ticket_id': ticket.id,
+        'valid': True,
+        'user': {
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'email': user.email
+        },
+        'offer': {
+            'name': ticket.offer.name,
+            'type': ticket.offer.get_offer_type_display(),
+            'price': float(ticket.offer.price)
+        },
+        'is_used': ticket.is_used,
+        'purchase_date': ticket.purchase_date.isoformat()
+    }
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAdminUser])
 def admin_verify_ticket(request):
@@ -494,29 +717,27 @@ def admin_verify_ticket(request):
         if not final_key:
             return Response({'error': 'Clé finale requise'}, status=status.HTTP_400_BAD_REQUEST)
 
+        # Clé signée (secret configuré) : authenticité et validité vérifiées localement
+        if settings.TICKET_SIGNING_KEY and is_signed_key(final_key):
+            try:
+                verify_ticket_key(settings_secret(), final_key)
+            except InvalidTicketKey as e:
+                return Response({
+                    'valid': False,
+                    'error': str(e)
+                }, status=status.HTTP_404_NOT_FOUND)
+
+        # Clé absente du filtre de Bloom : inconnue, inutile d'interroger la base
+        if not ticket_key_filter.might_contain(final_key):
+            return Response({
+                'valid': False,
+                'error': 'Ticket non trouvé'
+            }, status=status.HTTP_404_NOT_FOUND)
+
         try:
-            # Rechercher le ticket par la clé finale
+            # Rechercher le ticket par la clé finale (index unique)
             ticket = Ticket.objects.select_related('user', 'offer').get(final_key=final_key)
-            user = ticket.user
-
-            verification_data = {
-                'ticket_id': ticket.id,
-                'valid': True,
-                'user': {
-                    'first_name': user.first_name,
-                    'last_name': user.last_name,
-                    'email': user.email
-                },
-                'offer': {
-                    'name': ticket.offer.name,
-                    'type': ticket.offer.get_offer_type_display(),
-                    'price': float(ticket.offer.price)
-                },
-                'is_used': ticket.is_used,
-                'purchase_date': ticket.purchase_date.isoformat()
-            }
-
-            return Response(verification_data)
+            return Response(ticket_verification_data(ticket))
 
         except Ticket.DoesNotExist:
             return Response({
@@ -528,3 +749,183 @@ def admin_verify_ticket(request):
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAdminUser])
+def admin_verify_tickets_batch(request):
+    """Vérifier un lot de tickets en une requête (scanners de portique à haut débit)"""
+    try:
+        final_keys = request.data.get('final_keys')
+        if not isinstance(final_keys, list) or not final_keys or not all(isinstance(key, str) for key in final_keys):
+            return Response({'error': 'Liste de clés finales requise'}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_keys = settings.TICKET_VERIFY_BATCH_MAX
+        if len(final_keys) > max_keys:
+            return Response({'error': f'{max_keys} clés maximum par lot'}, status=status.HTTP_400_BAD_REQUEST)
+
+        validate = str(request.data.get('validate', request.query_params.get('validate', ''))).lower() in ('true', '1')
+
+        # Les clés inconnues du filtre de Bloom ne partent même pas dans la requête
+        candidates = {key for key in final_keys if ticket_key_filter.might_contain(key)}
+
+        # Une seule requête WHERE final_key IN (...) jointe à user et offer
+        tickets = Ticket.objects.select_related('user', 'offer').only(
+            'id', 'final_key', 'is_used', 'purchase_date',
+            'user__first_name', 'user__last_name', 'user__email',
+            'offer__name', 'offer__offer_type', 'offer__price',
+        ).filter(final_key__in=candidates)
+
+        if validate:
+            with transaction.atomic():
+                tickets = {ticket.final_key: ticket for ticket in tickets.select_for_update(of=('self',))}
+                to_validate = [ticket.id for ticket in tickets.values() if not ticket.is_used]
+                if to_validate:
+                    Ticket.objects.filter(id__in=to_validate).update(is_used=True, updated_at=timezone.now())
+                    record_check_ins([ticket.offer_id for ticket in tickets.values() if not ticket.is_used])
+                    invalidate_wallets(ticket.user_id for ticket in tickets.values() if not ticket.is_used)
+        else:
+            tickets = {ticket.final_key: ticket for ticket in tickets} if candidates else {}
+
+        results = []
+        seen = set()
+        for final_key in final_keys:
+            ticket = tickets.get(final_key)
+            if ticket is None:
+                results.append({'final_key': final_key, 'valid': False, 'error': 'Ticket non trouvé'})
+                continue
+
+            data = ticket_verification_data(ticket)
+            data['final_key'] = final_key
+            if validate:
+                # Une clé scannée deux fois dans le lot n'est validée qu'une fois
+                data['validated'] = not ticket.is_used and final_key not in seen
+                # État après la validation du lot : tout ticket trouvé est désormais utilisé
+                data['is_used'] = True
+            seen.add(final_key)
+            results.append(data)
+
+        return Response({'results': results})
+
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _gate_sync_tickets(request):
+    tickets = Ticket.objects.all()
+    offer_id = request.query_params.get('offer')
+    if offer_id:
+        tickets = tickets.filter(offer_id=int(offer_id))
+    return tickets
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def gate_sync_snapshot(request):
+    """Instantané (empreinte de clé + utilisé) pour précharger un portique, en flux"""
+    encoding = request.query_params.get('encoding', 'ndjson')
+    if encoding not in ('ndjson', 'binary'):
+        return Response({'error': 'Encodage inconnu (ndjson ou binary)'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        tickets = _gate_sync_tickets(request)
+    except ValueError:
+        return Response({'error': 'Offre invalide'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Les lignes modifiées après le filigrane seront renvoyées par le premier delta
+    cursor = encode_cursor(settled_watermark(), 0)
+    rows = tickets.order_by('id').values_list('final_key', 'is_used').iterator(chunk_size=2000)
+
+    if encoding == 'binary':
+        response = StreamingHttpResponse(iter_binary(rows), content_type='application/octet-stream')
+    else:
+        response = StreamingHttpResponse(iter_ndjson(rows), content_type='application/x-ndjson')
+    response['X-Sync-Cursor'] = cursor
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def gate_sync_delta(request):
+    """Tickets dont le statut a changé depuis le curseur de la dernière synchronisation"""
+    try:
+        since = decode_cursor(request.query_params.get('cursor'))
+        limit = int(request.query_params.get('limit', settings.GATE_SYNC_DELTA_LIMIT))
+        limit = max(1, min(limit, settings.GATE_SYNC_DELTA_LIMIT))
+        tickets = _gate_sync_tickets(request)
+    except InvalidCursor as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except ValueError:
+        return Response({'error': 'Paramètres invalides'}, status=status.HTTP_400_BAD_REQUEST)
+
+    since_at, since_id = since
+    watermark = settled_watermark()
+
+    # Parcours de l'index (updated_at, id) à partir du curseur
+    changes = list(
+        tickets.filter(models.Q(updated_at__gt=since_at) | models.Q(updated_at=since_at, id__gt=since_id))
+        .order_by('updated_at', 'id')
+        .values_list('id', 'final_key', 'is_used', 'updated_at')[:limit + 1]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    # Le curseur n'avance que sur des lignes antérieures au filigrane
+    next_cursor = since
+    for ticket_id, _, _, updated_at in changes:
+        if updated_at <= watermark:
+            next_cursor = (updated_at, ticket_id)
+
+    has_more = has_more and changes[-1][3] <= watermark
+    if not has_more:
+        next_cursor = max(next_cursor, (watermark, 0))
+
+    return Response({
+        'changes': [
+            {'k': key_digest(final_key).hex(), 'u': int(is_used)}
+            for _, final_key, is_used, _ in changes
+        ],
+        'cursor': encode_cursor(*next_cursor),
+        'has_more': has_more,
+    })
+
+
+def queue_status_data(queue):
+    return {
+        'position': queue.position,
+        'ahead': queue.ahead,
+        'admitted': queue.admitted and not queue.expired,
+        'expired': queue.expired,
+        'estimated_wait': round(queue.estimated_wait, 1) if queue.estimated_wait is not None else None,
+        # Intervalle de sondage conseillé au client
+        'poll_after': 0 if queue.admitted else min(max(1, round((queue.estimated_wait or 1) / 2)), 30),
+    }
+
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def waiting_room_join(request):
+    """Rejoindre la file d'achat. Ni authentification ni base de données."""
+    if not settings.WAITING_ROOM_ENABLED:
+        return Response({'enabled': False, 'admitted': True})
+
+    token, _ = issue_token()
+    return Response({'enabled': True, 'token': token, **queue_status_data(queue_status(token))}, status=201)
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def waiting_room_status(request):
+    """État d'un jeton de file : calculé depuis le jeton signé et les compteurs de la file."""
+    if not settings.WAITING_ROOM_ENABLED:
+        return Response({'enabled': False, 'admitted': True})
+
+    token = request.headers.get('X-Queue-Token') or request.query_params.get('token')
+    if not token:
+        return Response({'error': "Jeton de file d'attente requis"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        queue = queue_status(token)
+    except InvalidQueueToken as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({'enabled': True, **queue_status_data(queue)})
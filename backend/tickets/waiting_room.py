@@ -0,0 +1,243 @@
+"""Salle d'attente virtuelle devant l'achat de tickets.
+
+Lors d'une ouverture de vente, chaque client rejoint une file et reçoit un
+jeton signé portant sa position. Les positions sont admises à un débit fixe
+(WAITING_ROOM_RATE par seconde, réglé sur le débit d'achat mesuré, voir
+benchmarks/bench_offer_stock.py) : c'est un seau à jetons dont le niveau
+est « la dernière position admise ».
+
+Le statut se calcule à partir du jeton et de deux compteurs (positions
+distribuées, positions admises) : il ne touche jamais la base de données.
+Les compteurs vivent dans un backend interchangeable (WAITING_ROOM_BACKEND) :
+
+- MemoryBackend : propre au processus, pour les tests et un serveur à un worker ;
+- SQLiteBackend : fichier local partagé par les workers d'un même nœud.
+
+Un jeton admis sert de laissez-passer pour un achat tant que sa position
+reste dans les WAITING_ROOM_PASS_TTL dernières secondes d'admissions. Le
+laissez-passer est réservé pendant l'achat puis consommé s'il aboutit : un
+jeton partagé ou rejoué ne fait pas entrer une seconde commande.
+"""
+import math
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core import signing
+from django.utils.module_loading import import_string
+
+TOKEN_SALT = 'tickets.waiting_room'
+DEFAULT_QUEUE = 'purchase'
+
+QueueStatus = namedtuple('QueueStatus', ['queue', 'position', 'ahead', 'admitted', 'expired', 'estimated_wait'])
+
+
+class InvalidQueueToken(ValueError):
+    pass
+
+
+class BaseBackend:
+    """Deux compteurs par file : positions distribuées et horizon d'admission.
+
+    admit() fait avancer l'horizon de rate * (temps écoulé), plafonné à
+    burst par appel et au nombre de positions distribuées : une file restée
+    vide ne laisse pas entrer d'un coup toute la vague suivante.
+    """
+
+    def join(self, queue):
+        """Attribue la position suivante (à partir de 1)."""
+        raise NotImplementedError
+
+    def admit(self, queue, rate, burst, now):
+        """Fait avancer puis retourne l'horizon d'admission (dernière position admise)."""
+        raise NotImplementedError
+
+    def claim(self, queue, position, floor):
+        """Réserve le laissez-passer d'une position ; False s'il l'est déjà.
+
+        Les réservations des positions inférieures à floor, expirées, sont oubliées.
+        """
+        raise NotImplementedError
+
+    def release(self, queue, position):
+        """Rend un laissez-passer réservé (achat refusé ou en erreur)."""
+        raise NotImplementedError
+
+    @staticmethod
+    def advance(issued, admitted, last_tick, rate, burst, now):
+        if last_tick is None:
+            return min(float(issued), burst)
+        step = min(max(now - last_tick, 0.0) * rate, burst)
+        return min(float(issued), admitted + step)
+
+
+class MemoryBackend(BaseBackend):
+    def __init__(self):
+        self._queues = {}
+        self._claimed = {}
+        self._lock = threading.Lock()
+
+    def join(self, queue):
+        with self._lock:
+            state = self._queues.setdefault(queue, [0, 0.0, None])
+            state[0] += 1
+            return state[0]
+
+    def admit(self, queue, rate, burst, now):
+        with self._lock:
+            state = self._queues.setdefault(queue, [0, 0.0, None])
+            issued, admitted, last_tick = state
+            state[1] = self.advance(issued, admitted, last_tick, rate, burst, now)
+            state[2] = now
+            return state[1]
+
+    def claim(self, queue, position, floor):
+        with self._lock:
+            claimed = self._claimed.setdefault(queue, set())
+            if position in claimed:
+                return False
+            claimed.difference_update([p for p in claimed if p < floor])
+            claimed.add(position)
+            return True
+
+    def release(self, queue, position):
+        with self._lock:
+            self._claimed.get(queue, set()).discard(position)
+
+
+class SQLiteBackend(BaseBackend):
+    """Compteurs dans un fichier SQLite local (WAITING_ROOM_SQLITE_PATH)."""
+
+    def __init__(self, path=None):
+        self.path = str(path or settings.WAITING_ROOM_SQLITE_PATH)
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS waiting_room ('
+                ' queue TEXT PRIMARY KEY, issued INTEGER NOT NULL,'
+                ' admitted REAL NOT NULL, last_tick REAL)'
+            )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS waiting_room_pass ('
+                ' queue TEXT NOT NULL, position INTEGER NOT NULL, PRIMARY KEY (queue, position))'
+            )
+            self._local.connection = connection
+        return connection
+
+    def _transaction(self, queue, apply):
+        connection = self._connection()
+        # BEGIN IMMEDIATE : verrou d'écriture pris d'emblée, pas de lecture périmée
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute(
+                'INSERT OR IGNORE INTO waiting_room (queue, issued, admitted, last_tick) VALUES (?, 0, 0, NULL)',
+                (queue,),
+            )
+            row = connection.execute(
+                'SELECT issued, admitted, last_tick FROM waiting_room WHERE queue = ?', (queue,),
+            ).fetchone()
+            issued, admitted, last_tick, result = apply(*row)
+            connection.execute(
+                'UPDATE waiting_room SET issued = ?, admitted = ?, last_tick = ? WHERE queue = ?',
+                (issued, admitted, last_tick, queue),
+            )
+            connection.execute('COMMIT')
+            return result
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def join(self, queue):
+        return self._transaction(queue, lambda issued, admitted, last_tick: (issued + 1, admitted, last_tick, issued + 1))
+
+    def admit(self, queue, rate, burst, now):
+        def apply(issued, admitted, last_tick):
+            admitted = self.advance(issued, admitted, last_tick, rate, burst, now)
+            return issued, admitted, now, admitted
+        return self._transaction(queue, apply)
+
+    def claim(self, queue, position, floor):
+        connection = self._connection()
+        # Clé primaire : un seul INSERT réussit, même entre workers
+        claimed = connection.execute(
+            'INSERT OR IGNORE INTO waiting_room_pass (queue, position) VALUES (?, ?)', (queue, position),
+        ).rowcount == 1
+        if claimed:
+            connection.execute('DELETE FROM waiting_room_pass WHERE queue = ? AND position < ?', (queue, floor))
+        return claimed
+
+    def release(self, queue, position):
+        self._connection().execute(
+            'DELETE FROM waiting_room_pass WHERE queue = ? AND position = ?', (queue, position),
+        )
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = import_string(settings.WAITING_ROOM_BACKEND)()
+    return _backend
+
+
+def reset_backend():
+    global _backend
+    _backend = None
+
+
+def _rate():
+    return float(settings.WAITING_ROOM_RATE)
+
+
+def _burst():
+    return float(getattr(settings, 'WAITING_ROOM_BURST', None) or settings.WAITING_ROOM_RATE)
+
+
+def issue_token(queue=DEFAULT_QUEUE):
+    position = get_backend().join(queue)
+    return signing.dumps({'q': queue, 'p': position}, salt=TOKEN_SALT), position
+
+
+def read_token(token):
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT, max_age=settings.WAITING_ROOM_TOKEN_MAX_AGE)
+        return data['q'], int(data['p'])
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        raise InvalidQueueToken("Jeton de file d'attente invalide")
+
+
+def queue_status(token, now=None):
+    queue, position = read_token(token)
+    now = time.time() if now is None else now
+    rate = _rate()
+    horizon = get_backend().admit(queue, rate, _burst(), now)
+
+    admitted = position <= horizon
+    # Au-delà de PASS_TTL secondes d'admissions après la sienne, le laissez-passer expire
+    expired = admitted and horizon - position >= rate * settings.WAITING_ROOM_PASS_TTL
+    ahead = max(math.ceil(position - horizon), 0)
+    return QueueStatus(queue, position, ahead, admitted, expired, ahead / rate if rate else None)
+
+
+def claim_pass(queue, position):
+    """Réserve le laissez-passer d'une position admise ; False s'il a déjà servi."""
+    # Position admise : l'horizon l'a atteinte, les positions plus de PASS_TTL
+    # secondes d'admissions derrière elle ont expiré
+    floor = position - _rate() * settings.WAITING_ROOM_PASS_TTL
+    return get_backend().claim(queue, position, floor)
+
+
+def release_pass(queue, position):
+    get_backend().release(queue, position)
@@ -0,0 +1,96 @@
+"""Portefeuille de tickets d'un utilisateur, en une requête jointe et mis en cache.
+
+Même forme de réponse que la liste /api/tickets/ (offre imbriquée, URL
+absolue du QR code), mais construite depuis un seul values_list joint à
+l'offre, sans serializer. Le JSON encodé est gardé dans le cache Django par
+utilisateur jusqu'au prochain achat ou à la prochaine validation d'un de
+ses tickets, qui change sa génération (tickets.generations) ;
+WALLET_CACHE_TIMEOUT borne la durée de vie d'une entrée
+(modification d'une offre, écriture qui contourne l'invalidation).
+
+Avec ?include=qr, les QR codes des WALLET_INLINE_QR_MAX tickets les plus
+récents sont inclus en data URI (champ qr_code) : le portefeuille d'une
+famille s'affiche en une seule requête.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from . import generations
+from .models import Ticket
+from .tasks import get_qr_images
+from .qr import data_uri
+
+
+def cache_key(user_id):
+    """Clé de la génération du portefeuille : la supprimer suffit à l'invalider."""
+    return f'tickets:wallet:{user_id}'
+
+
+def wallet_rows(user_id):
+    return (
+        Ticket.objects.filter(user_id=user_id)
+        .order_by('-purchase_date', '-id')
+        .values_list(
+            'id', 'final_key', 'is_used', 'purchase_date',
+            'offer_id', 'offer__name', 'offer__offer_type', 'offer__price',
+        )
+    )
+
+
+def wallet_data(user_id, base_url, qr_format=None):
+    """base_url : préfixe absolu des URL de QR code, calculé une fois par requête.
+
+    qr_format ('svg' ou 'png') : QR codes inclus en data URI.
+    """
+    data = [
+        {
+            'id': ticket_id,
+            'offer': {
+                'id': offer_id,
+                'name': offer_name,
+                'offer_type': offer_type,
+                'price': float(price),
+            },
+            'purchase_date': purchase_date.isoformat(),
+            'qr_code_url': f'{base_url}api/tickets/{ticket_id}/qr-code/',
+            'is_used': is_used,
+            'final_key': final_key,
+        }
+        for ticket_id, final_key, is_used, purchase_date, offer_id, offer_name, offer_type, price
+        in wallet_rows(user_id)
+    ]
+    if qr_format:
+        inline = data[:settings.WALLET_INLINE_QR_MAX]
+        images = get_qr_images([item['final_key'] for item in inline], qr_format)
+        for item in inline:
+            item['qr_code'] = data_uri(images[item['final_key']], qr_format)
+    return data
+
+
+def get_wallet(user_id, base_url, qr_format=None):
+    """(etag, corps JSON encodé) du portefeuille, depuis le cache si possible.
+
+    L'entrée d'un utilisateur est indexée par (base_url, qr_format) :
+    l'invalidation n'a qu'une génération à changer, quels que soient l'hôte
+    par lequel l'API est servie et les variantes demandées.
+    """
+    key = f'{cache_key(user_id)}:{generations.current(cache, cache_key(user_id))}'
+    entries = cache.get(key) or {}
+    variant = (base_url, qr_format)
+    if variant not in entries:
+        body = JSONRenderer().render(wallet_data(user_id, base_url, qr_format))
+        entries[variant] = ('"%s"' % hashlib.sha256(body).hexdigest()[:32], body)
+        cache.set(key, entries, settings.WALLET_CACHE_TIMEOUT)
+    return entries[variant]
+
+
+def invalidate_wallets(user_ids):
+    # Après le commit, par changement de génération : un lecteur concurrent
+    # ne remet pas en cache l'état d'avant
+    keys = [cache_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        transaction.on_commit(lambda: generations.bump(cache, keys))
@@ -0,0 +1,182 @@
+"""Écritures différées : incréments cumulés en mémoire puis appliqués par lots.
+
+Plutôt qu'un UPDATE de la même ligne chaude à chaque achat, les incréments
+d'un processus sont fusionnés par clé et écrits toutes les
+SALES_COUNTER_FLUSH_MS millisecondes, ou dès SALES_COUNTER_FLUSH_EVENTS
+événements, par un thread dédié. Le tampon est vidé à l'arrêt du processus.
+
+Les incréments ne sont ajoutés qu'au commit de la transaction qui les
+produit (on_commit) : un achat annulé ne compte jamais. En contrepartie, un
+processus tué brutalement perd au plus un intervalle de compteurs, que
+rebuild_sales_rollups sait recalculer. SALES_COUNTER_STRICT revient aux
+UPDATE ... F() dans la transaction de l'achat.
+
+Les dates de dernière connexion passent par le même mécanisme (LastLoginBuffer).
+"""
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """Tampon clé -> valeur fusionnée, vidé périodiquement par write(batch)."""
+
+    # Secondes entre deux vidages, et nombre d'événements qui déclenche un vidage anticipé
+    flush_interval = 0.25
+    max_events = 500
+
+    def __init__(self):
+        self._pending = {}
+        self._events = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        atexit.register(self.flush)
+
+    def merge(self, current, value):
+        return current + value
+
+    def write(self, batch):
+        raise NotImplementedError
+
+    def add(self, key, value):
+        self.add_many([(key, value)])
+
+    def add_many(self, items):
+        with self._lock:
+            for key, value in items:
+                self._pending[key] = self.merge(self._pending[key], value) if key in self._pending else value
+            self._events += 1
+            full = self._events >= self.max_events
+            self._ensure_thread()
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Écrit les valeurs en attente. Retourne le nombre de clés écrites."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._events = 0
+            if not batch:
+                return 0
+            try:
+                self.write(batch)
+            except Exception:
+                logger.exception("Échec de l'écriture différée, nouvel essai au prochain passage")
+                with self._lock:
+                    for key, value in batch.items():
+                        self._pending[key] = self.merge(value, self._pending[key]) if key in self._pending else value
+                return 0
+            return len(batch)
+
+    def _ensure_thread(self):
+        # Démarré au premier événement : après le fork des workers gunicorn.
+        # Sans intervalle, le tampon n'est vidé que par flush() (tests, commandes)
+        if not self.flush_interval:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            close_old_connections()
+            self.flush()
+
+
+class SalesCounterBuffer(WriteBehindBuffer):
+    """Incréments de SalesRollup et des tranches minute de SalesBucket.
+
+    Clés : ('rollup', offer_id, champ) et ('bucket', offer_id, début de tranche, champ).
+    """
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'SALES_COUNTER_FLUSH_MS', 250) / 1000
+
+    @property
+    def max_events(self):
+        return getattr(settings, 'SALES_COUNTER_FLUSH_EVENTS', 500)
+
+    @property
+    def strict(self):
+        return getattr(settings, 'SALES_COUNTER_STRICT', False)
+
+    def record(self, items):
+        """À appeler dans la transaction de l'achat : ajouté au tampon au commit."""
+        items = list(items)
+        transaction.on_commit(lambda: self.add_many(items))
+
+    def write(self, batch):
+        from .models import SalesBucket
+        from .rollups import _increment
+        from .timeseries import add_to_bucket
+
+        rollups = defaultdict(dict)
+        buckets = defaultdict(lambda: {'sales_count': 0, 'revenue': 0})
+        for key, value in batch.items():
+            if key[0] == 'rollup':
+                _, offer_id, field = key
+                rollups[offer_id][field] = value
+            else:
+                _, offer_id, bucket_start, field = key
+                buckets[(offer_id, bucket_start)][field] = value
+
+        # Ordre fixe des lignes : pas d'interblocage entre workers qui vident en même temps
+        with transaction.atomic():
+            for offer_id in sorted(rollups):
+                _increment(offer_id, **rollups[offer_id])
+            for offer_id, bucket_start in sorted(buckets):
+                values = buckets[(offer_id, bucket_start)]
+                add_to_bucket(offer_id, SalesBucket.MINUTE, bucket_start, values['sales_count'], values['revenue'])
+
+
+class LastLoginBuffer(WriteBehindBuffer):
+    """Dates de dernière connexion, écrites par un seul UPDATE groupé (bulk_update).
+
+    Une connexion n'est retenue que si la date connue de l'utilisateur date de
+    plus de LAST_LOGIN_GRANULARITY secondes : pendant une vente, un même
+    utilisateur qui se reconnecte n'écrit qu'une fois par période.
+    """
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'LAST_LOGIN_FLUSH_SECONDS', 60)
+
+    @property
+    def max_events(self):
+        return getattr(settings, 'LAST_LOGIN_FLUSH_EVENTS', 1000)
+
+    def merge(self, current, value):
+        return max(current, value)
+
+    def record(self, user, now=None):
+        now = now or timezone.now()
+        granularity = timedelta(seconds=getattr(settings, 'LAST_LOGIN_GRANULARITY', 3600))
+        if user.last_login and now - user.last_login < granularity:
+            return
+        # L'instance courante reflète la connexion, même avant l'écriture
+        user.last_login = now
+        self.add(user.pk, now)
+
+    def write(self, batch):
+        from .models import User
+
+        users = [User(pk=pk, last_login=last_login) for pk, last_login in sorted(batch.items())]
+        User.objects.bulk_update(users, ['last_login'])
+
+
+sales_counters = SalesCounterBuffer()
+last_logins = LastLoginBuffer()
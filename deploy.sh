@@ -12,5 +12,9 @@ python manage.py migrate --noinput
 echo "=== Migration result ==="
 python manage.py showmigrations --list
 
-echo "=== Starting server ==="
+echo "=== Starting server (${SERVER_PROFILE:-sync}) ==="
+# SERVER_PROFILE=asgi : workers uvicorn, vues asynchrones pour connexion, scan et QR codes
+if [ "${SERVER_PROFILE:-sync}" = "asgi" ]; then
+    exec gunicorn config.asgi:application --worker-class uvicorn_worker.UvicornWorker --bind 0.0.0.0:$PORT
+fi
 exec gunicorn config.wsgi:application --bind 0.0.0.0:$PORT
\ No newline at end of file
@@ -20,7 +20,8 @@ export default function UserTicketsPage() {
   useEffect(() => {
     const fetchTickets = async () => {
       try {
-        const response = await api.get('/api/tickets/');
+        // Tickets et QR codes en une seule requête
+        const response = await api.get('/api/tickets/wallet/?include=qr');
         setTickets(response.data);
       } catch (error) {
         console.error("Erreur lors de la récupération des billets:", error);
@@ -77,7 +78,7 @@ export default function UserTicketsPage() {
                   <Typography variant="subtitle1">QR Code d'accès</Typography>
                   <CardMedia
                     component="img"
-                    image={ticket.qr_code_url || `${ticket.qr_code}`}
+                    image={ticket.qr_code || ticket.qr_code_url}
                     alt="QR Code du billet"
                     sx={{
                       width: 200,